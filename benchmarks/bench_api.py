@@ -0,0 +1,45 @@
+"""Full /api requests, answered by the scripted fake LLM and search with no latency.
+
+What is measured is everything but the model: Flask, the graphs, tools,
+checkpointing and serialization.
+"""
+import itertools
+
+import pytest
+
+from salonist.app import create_app
+
+_threads = itertools.count()
+
+
+@pytest.fixture(scope="module")
+def client():
+    return create_app().test_client()
+
+
+def test_search(benchmark, client):
+    response = benchmark(client.post, "/api/search/search", json={"query": "How often should I see a dentist?"})
+    assert response.status_code == 200
+
+
+def test_booking(benchmark, client):
+    def run():
+        return client.post("/api/booking", json={"query": "Is tomorrow available?", "thread_id": f"bench-{next(_threads)}"})
+
+    assert benchmark(run).status_code == 200
+
+
+@pytest.mark.parametrize("query", [
+    "Is Dr. Anderson available on 2024-08-07?",
+    "Any general dentist availability?",
+    "hello",
+], ids=["fast-routed", "llm-routed", "no-tools"])
+def test_multi_agent(benchmark, client, query):
+    assert benchmark(client.post, "/api/multi-agent", json={"query": query}).status_code == 200
+
+
+def test_multi_agent_stream(benchmark, client):
+    def run():
+        return client.post("/api/multi-agent/stream", json={"query": "Is Dr. Anderson available on 2024-08-07?"}).get_data()
+
+    assert b"event: done" in benchmark(run)
@@ -0,0 +1,51 @@
+"""Compiling the appointment graph and checkpointing conversations."""
+import os
+import sqlite3
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from salonist.appointment.builder import build_graph
+
+
+def test_build_graph(benchmark):
+    benchmark(build_graph, MemorySaver())
+
+
+def _conversation(turns: int) -> list:
+    messages = []
+    for i in range(turns):
+        messages += [
+            HumanMessage(f"Is john doe available on {i + 1} August?", id=f"h{i}"),
+            AIMessage("", tool_calls=[{"name": "check_availability_by_doctor", "args": {}, "id": f"c{i}"}], id=f"a{i}"),
+            ToolMessage("This availability for 05-08-2024\nAvailable slots: 8.00, 9.00", tool_call_id=f"c{i}", id=f"t{i}"),
+            AIMessage("He is free at 8.00 and 9.00.", id=f"r{i}"),
+        ]
+    return messages
+
+
+@pytest.fixture
+def saver(work_dir):
+    conn = sqlite3.connect(os.path.join(work_dir, "bench-checkpoints.db"), check_same_thread=False)
+    yield SqliteSaver(conn)
+    conn.close()
+
+
+@pytest.mark.parametrize("turns", [1, 20])
+def test_sqlite_checkpoint_put(benchmark, saver, turns):
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"messages": _conversation(turns), "dialog_state": ["get_info"]}
+    config = {"configurable": {"thread_id": f"put-{turns}", "checkpoint_ns": ""}}
+    benchmark(saver.put, config, checkpoint, {"source": "loop", "step": 1, "writes": {}}, {})
+
+
+@pytest.mark.parametrize("turns", [1, 20])
+def test_sqlite_checkpoint_get(benchmark, saver, turns):
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"messages": _conversation(turns), "dialog_state": ["get_info"]}
+    config = {"configurable": {"thread_id": f"get-{turns}", "checkpoint_ns": ""}}
+    config = saver.put(config, checkpoint, {"source": "loop", "step": 1, "writes": {}}, {})
+    assert benchmark(saver.get_tuple, config) is not None
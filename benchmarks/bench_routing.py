@@ -0,0 +1,73 @@
+"""Routing functions and bookkeeping nodes of the appointment graph."""
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from salonist.appointment.builder import booking_tools, info_tools
+from salonist.appointment.utils.helper import (
+    RouteUpdater,
+    create_entry_node,
+    fast_route,
+    pop_dialog_state,
+    route_primary_assistant,
+    route_to_workflow,
+)
+from salonist.appointment.utils.intent import classify_intent
+
+
+def _call(name, args=None, id="call"):
+    return {"name": name, "args": args or {}, "id": id}
+
+
+HISTORY = [HumanMessage("Is john doe available on 5 August?"), AIMessage("He is free at 8.00 and 9.00.")] * 10
+
+TRANSFER = {"messages": HISTORY + [AIMessage("", tool_calls=[_call("ToGetInfo")])], "dialog_state": []}
+PARALLEL_TOOLS = {
+    "messages": HISTORY + [AIMessage("", tool_calls=[
+        _call("check_availability_by_doctor", id="a"),
+        _call("check_availability_by_doctor", id="b"),
+        _call("CompleteOrEscalate", id="c"),
+    ])],
+    "dialog_state": ["get_info"],
+}
+AFTER_TOOLS = {
+    "messages": PARALLEL_TOOLS["messages"] + [
+        ToolMessage("Available slots: 8.00", tool_call_id="a"),
+        ToolMessage("Available slots: 9.00", tool_call_id="b"),
+    ],
+    "dialog_state": ["get_info"],
+}
+NEW_TURN = {"messages": HISTORY + [HumanMessage("Is Dr. Anderson available on 2024-08-07?")], "dialog_state": []}
+
+
+def test_route_to_workflow(benchmark):
+    assert benchmark(route_to_workflow, {"messages": HISTORY, "dialog_state": ["get_info"]}) == "get_info"
+
+
+def test_route_primary_assistant(benchmark):
+    assert benchmark(route_primary_assistant, TRANSFER) == "enter_get_info"
+
+
+def test_route_update_info(benchmark):
+    router = RouteUpdater(info_tools, "update_info_tools", "get_info")
+    assert benchmark(router.route_update_info, PARALLEL_TOOLS) == "update_info_tools"
+
+
+def test_route_after_tools(benchmark):
+    router = RouteUpdater(booking_tools, "update_appointment_tools", "appointment_info")
+    assert benchmark(router.route_after_tools, AFTER_TOOLS) == "leave_skill"
+
+
+def test_entry_node(benchmark):
+    entry_node = create_entry_node("Get Information Assistant", "get_info")
+    assert benchmark(entry_node, TRANSFER)["dialog_state"] == "get_info"
+
+
+def test_pop_dialog_state(benchmark):
+    assert len(benchmark(pop_dialog_state, AFTER_TOOLS)["messages"]) == 1
+
+
+def test_classify_intent(benchmark):
+    assert benchmark(classify_intent, "I want to book john doe on 8 August at 10:30am, my id is 1000082") is not None
+
+
+def test_fast_route(benchmark):
+    assert benchmark(fast_route, NEW_TURN)["messages"]
@@ -0,0 +1,59 @@
+"""Availability tools of the appointment graph, as the assistants call them."""
+import pytest
+
+from salonist.appointment.tools.tools import (
+    cancel_appointment,
+    check_availability_by_doctor,
+    check_availability_by_specialization,
+    find_earliest_availability,
+    render_availability_by_doctor,
+    render_availability_by_specialization,
+    render_earliest_availability,
+    set_appointment,
+)
+
+DATE = {"date": "05-08-2024"}
+SLOT = {"date": "2024-08-05 08:00"}
+ID_NUMBER = {"id": 1234567}
+
+
+@pytest.mark.parametrize("cached", [True, False], ids=["cached", "uncached"])
+def test_check_availability_by_doctor(benchmark, cached):
+    def run():
+        if not cached:
+            render_availability_by_doctor.cache_clear()
+        return check_availability_by_doctor.invoke({"desired_date": DATE, "doctor_name": "john doe"})
+
+    assert "Available slots" in benchmark(run)
+
+
+@pytest.mark.parametrize("cached", [True, False], ids=["cached", "uncached"])
+def test_check_availability_by_specialization(benchmark, cached):
+    def run():
+        if not cached:
+            render_availability_by_specialization.cache_clear()
+        return check_availability_by_specialization.invoke({"desired_date": DATE, "specialization": "general_dentist"})
+
+    assert "Available slots" in benchmark(run)
+
+
+@pytest.mark.parametrize("cached", [True, False], ids=["cached", "uncached"])
+def test_find_earliest_availability(benchmark, cached):
+    def run():
+        if not cached:
+            render_earliest_availability.cache_clear()
+        return find_earliest_availability.invoke({"start_date": DATE, "specialization": "orthodontist"})
+
+    benchmark(run)
+
+
+def test_book_and_cancel(benchmark):
+    """A booking and its cancellation, each a journaled write."""
+    args = {"id_number": ID_NUMBER, "doctor_name": "john doe"}
+
+    def run():
+        booked = set_appointment.invoke({"desired_date": SLOT, **args})
+        cancelled = cancel_appointment.invoke({"date": SLOT, **args})
+        return booked, cancelled
+
+    assert benchmark(run)[0] == "Succesfully done"
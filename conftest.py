@@ -0,0 +1,42 @@
+"""Setup shared by the test and benchmark suites.
+
+Both run offline against the scripted fake providers, in a scratch
+directory holding a copy of the appointment calendar, so they never touch
+the real calendar, checkpoints or LLM cache. The environment has to be set
+before salonist (and its settings) are imported.
+"""
+import os
+import shutil
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+WORK_DIR = tempfile.mkdtemp(prefix="salonist-")
+
+shutil.copy(os.path.join(REPO_DIR, "availability.csv"), WORK_DIR)
+os.chdir(WORK_DIR)
+os.environ.update({
+    "LLM_PROVIDER": "fake",
+    "SEARCH_PROVIDER": "fake",
+    "LLM_CACHE_ENABLED": "false",
+    "AVAILABILITY_BACKEND": "csv",
+    "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(WORK_DIR, 'salonist.db')}",
+})
+
+import pytest  # noqa: E402
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def work_dir():
+    return WORK_DIR
+
+
+@pytest.fixture
+def calendar(tmp_path):
+    """A private copy of the appointment calendar."""
+    path = tmp_path / "availability.csv"
+    shutil.copy(os.path.join(REPO_DIR, "availability.csv"), path)
+    return str(path)
@@ -8,6 +8,7 @@ from .supervisor import llm, supervisor_node
 from .tool import tavily_tool, python_repl_tool
 
 from .state import State
+from salonist.metrics import instrument
 
 class AgentGraph:
     def __init__(self):
@@ -50,7 +51,7 @@ class AgentGraph:
         builder.add_node("supervisor", supervisor_node)
         builder.add_node("researcher", self._research_node)
         builder.add_node("coder", self._code_node)
-        return builder.compile()
+        return instrument(builder.compile(), "agent")
 
     def run(self, query: str) -> str:
         """Run the booking workflow with a given query.
@@ -1,7 +1,7 @@
 from typing import Literal
 from typing_extensions import TypedDict
 
-from langchain_anthropic import ChatAnthropic
+from salonist.providers import get_chat_model
 from langgraph.graph import END
 from langgraph.types import Command
 
@@ -27,7 +27,7 @@ class Router(TypedDict):
     next: Literal[*options]
 
 
-llm = ChatAnthropic(model="claude-3-5-sonnet-latest")
+llm = get_chat_model("claude-3-5-sonnet-latest")
 
 
 def supervisor_node(state: State) -> Command[Literal[*members, "__end__"]]:
@@ -1,10 +1,11 @@
 from typing import Annotated
 
-from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_core.tools import tool
 from langchain_experimental.utilities import PythonREPL
 
-tavily_tool = TavilySearchResults(max_results=5)
+from salonist.providers import get_search_tool
+
+tavily_tool = get_search_tool(max_results=5)
 
 # This executes code locally, which can be unsafe
 repl = PythonREPL()
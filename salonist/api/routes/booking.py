@@ -1,17 +1,22 @@
+from flask import Response, stream_with_context
 from flask_restx import Resource, Namespace, fields
-from salonist.booking import BookingWorkflow
+from salonist.booking import get_booking_workflow
+from salonist.streaming import SSE_HEADERS, sse
 import time
+import uuid
 
 # Create namespace
 ns = Namespace('booking', description='Booking operations')
 
 # Define input/output models
 booking_input = ns.model('BookingInput', {
-    'query': fields.String(required=True, description='The booking query')
+    'query': fields.String(required=True, description='The booking query'),
+    'thread_id': fields.String(required=False, description='Conversation to continue; a new one is started when omitted')
 })
 
 booking_response = ns.model('BookingResponse', {
     'response': fields.String(description='The AI response'),
+    'thread_id': fields.String(description='Conversation the response belongs to'),
     'metadata': fields.Nested(ns.model('Metadata', {
         'processing_time': fields.Float(description='Time taken to process the request')
     }))
@@ -23,7 +28,7 @@ class Booking(Resource):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.workflow = BookingWorkflow()
+        self.workflow = get_booking_workflow()
     
     @ns.expect(booking_input)
     @ns.response(200, 'Success', booking_response)
@@ -38,15 +43,38 @@ class Booking(Resource):
             if not query:
                 return {'error': 'Query is required'}, 400
 
+            thread_id = data.get('thread_id') or str(uuid.uuid4())
+
             # Run the workflow
-            response, processing_time = self.workflow.run(query, 2)
+            response, processing_time = self.workflow.run(query, thread_id)
 
             return {
                 'response': response,
+                'thread_id': thread_id,
                 'metadata': {
                     'processing_time': processing_time
                 }
             }, 200
             
         except Exception as e:
-            return {'error': str(e)}, 500
\ No newline at end of file
+            return {'error': str(e)}, 500
+
+
+@ns.route('/stream')
+class BookingStream(Resource):
+    """Booking endpoint streaming the AI response as server-sent events."""
+
+    @ns.expect(booking_input)
+    @ns.response(200, 'Event stream of token, node, route and done events')
+    @ns.response(400, 'Bad Request')
+    def post(self):
+        """Process a booking query, streaming tokens and node transitions as they happen."""
+        data = ns.payload
+        query = data.get('query')
+
+        if not query:
+            return {'error': 'Query is required'}, 400
+
+        thread_id = data.get('thread_id') or str(uuid.uuid4())
+        events = get_booking_workflow().stream(query, thread_id)
+        return Response(stream_with_context(sse(events)), mimetype='text/event-stream', headers=SSE_HEADERS)
@@ -1,16 +1,21 @@
+from flask import Response, stream_with_context
 from flask_restx import Resource, Namespace, fields
-from salonist.appointment.builder import run_workflow
+from salonist.appointment.builder import run_workflow, stream_workflow
+from salonist.streaming import SSE_HEADERS, sse
+import uuid
 
 # Create namespace
 ns = Namespace('multi-agent', description='Multi-agent operations')
 
 # Define input/output models
 multi_agent_input = ns.model('MultiAgentInput', {
-    'query': fields.String(required=True, description='The multi-agent query')
+    'query': fields.String(required=True, description='The multi-agent query'),
+    'thread_id': fields.String(required=False, description='Conversation to continue; a new one is started when omitted')
 })
 
 multi_agent_response = ns.model('MultiAgentResponse', {
     'response': fields.String(description='The AI response'),
+    'thread_id': fields.String(description='Conversation the response belongs to'),
     'metadata': fields.Nested(ns.model('Metadata', {
         'processing_time': fields.Float(description='Time taken to process the request')
     }))
@@ -36,15 +41,36 @@ class MultiAgent(Resource):
             if not query:
                 return {'error': 'Query is required'}, 400
 
-            thread_id = 1234
+            thread_id = data.get('thread_id') or str(uuid.uuid4())
 
             # Run the workflow
             message, dialog_state = run_workflow(query, thread_id)
 
             return {
                 'response': message,
+                'thread_id': thread_id,
                 'dialog_state' : dialog_state
             }, 200
             
         except Exception as e:
-            return {'error': str(e)}, 500
\ No newline at end of file
+            return {'error': str(e)}, 500
+
+
+@ns.route('/stream')
+class MultiAgentStream(Resource):
+    """Multi-agent endpoint streaming the AI response as server-sent events."""
+
+    @ns.expect(multi_agent_input)
+    @ns.response(200, 'Event stream of token, node, route and done events')
+    @ns.response(400, 'Bad Request')
+    def post(self):
+        """Process a multi-agent query, streaming tokens and assistant hand-offs as they happen."""
+        data = ns.payload
+        query = data.get('query')
+
+        if not query:
+            return {'error': 'Query is required'}, 400
+
+        thread_id = data.get('thread_id') or str(uuid.uuid4())
+        events = stream_workflow(query, thread_id)
+        return Response(stream_with_context(sse(events)), mimetype='text/event-stream', headers=SSE_HEADERS)
@@ -1,5 +1,5 @@
 from flask_restx import Resource, Namespace
-from salonist.langgraph.workflow import SearchWorkflow
+from salonist.langgraph.workflow import get_search_workflow
 from ..models.search import create_search_input_model, create_search_response_model
 
 # Create namespace
@@ -10,7 +10,7 @@ search_input = create_search_input_model(ns)
 search_response = create_search_response_model(ns)
 
 # Create workflow instance
-_search_workflow = SearchWorkflow()
+_search_workflow = get_search_workflow()
 
 @ns.route('/search')
 class Search(Resource):
@@ -4,6 +4,10 @@ from flask_cors import CORS
 from salonist.config import get_settings
 from salonist.api import init_api
 from salonist.database import db
+from salonist.llm_cache import init_llm_cache
+from salonist.metrics import metrics_view
+from salonist.tracing import init_request_tracing
+from salonist.appointment.availability import DatabaseAvailabilityStore, set_availability_store
 
 migrate = Migrate()
 
@@ -16,17 +20,29 @@ def create_app(config_class=None):
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
+    if config_class.AVAILABILITY_BACKEND == "database":
+        with app.app_context():
+            set_availability_store(DatabaseAvailabilityStore(db.engine))
+    init_llm_cache(config_class)
     CORS(app, resources={r"/*": {"origins": "*"}})
     
     # Initialize API
     api = init_api(app)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    init_request_tracing(app)
     
     # Register CLI commands
-    from salonist.commands import seed_db, list_services, clean_db, visualize_graph, visualize_agent
+    from salonist.commands import seed_db, list_services, clean_db, visualize_graph, visualize_agent, compact_availability, import_availability, partition_availability, archive_availability, clear_llm_cache, rebuild_graph
     app.cli.add_command(seed_db)
     app.cli.add_command(list_services)
     app.cli.add_command(clean_db)
     app.cli.add_command(visualize_graph)
     app.cli.add_command(visualize_agent)
+    app.cli.add_command(compact_availability)
+    app.cli.add_command(import_availability)
+    app.cli.add_command(partition_availability)
+    app.cli.add_command(archive_availability)
+    app.cli.add_command(clear_llm_cache)
+    app.cli.add_command(rebuild_graph)
     
     return app 
\ No newline at end of file
@@ -1,16 +1,22 @@
 from langchain_core.prompts.chat import ChatPromptTemplate
+from salonist.prompt_cache import cached_system_prompt, cached_tools, prompt_caching_enabled
 
 def get_runnable(llm,tools,agent_prompt):
-    prompt_template = ChatPromptTemplate.from_messages(
-        [
-            (
+    if prompt_caching_enabled():
+        # The system prompt and tool schemas never change between calls; let the provider cache them
+        system = cached_system_prompt(agent_prompt)
+        tools = cached_tools(tools)
+    else:
+        system = (
             "system",
             agent_prompt
-            ),
+        )
+    prompt_template = ChatPromptTemplate.from_messages(
+        [
+            system,
             ("placeholder", "{messages}"),
         ]
     )
 
     agent_runnable = prompt_template | llm.bind_tools(tools)
     return agent_runnable
-
@@ -0,0 +1,19 @@
+from salonist.appointment.availability.store import (
+    AvailabilityStore,
+    Slot,
+    SlotConflictError,
+    get_availability_store,
+    set_availability_store,
+)
+from salonist.appointment.availability.database import DatabaseAvailabilityStore
+from salonist.appointment.availability.partitioned import PartitionedAvailabilityStore
+
+__all__ = [
+    'AvailabilityStore',
+    'DatabaseAvailabilityStore',
+    'PartitionedAvailabilityStore',
+    'Slot',
+    'SlotConflictError',
+    'get_availability_store',
+    'set_availability_store',
+]
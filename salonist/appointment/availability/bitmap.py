@@ -0,0 +1,114 @@
+"""Bitmap index of free slots, one bit per slot of each doctor-day."""
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+MAX_SLOTS_PER_DAY = 64
+
+
+class SlotBitmap:
+    """Free-slot bitmap for every doctor over every day of the calendar.
+
+    `free[day, doctor]` is a 64-bit word whose bit i is set when the i-th slot
+    of the day's grid is free, so a whole doctor-day is tested or updated with
+    a single integer operation and queries across doctors or days are plain
+    NumPy array expressions.
+    """
+
+    def __init__(self, dates: Iterable[date], doctors: Dict[str, str], minutes: Iterable[int]):
+        """Create an empty (fully booked) bitmap.
+
+        Args:
+            dates: Calendar days
+            doctors: Specialization of each doctor, by doctor name
+            minutes: Slot start times of the daily grid, as minutes past midnight
+        """
+        self.dates = sorted(set(dates))
+        self.doctors = sorted(doctors)
+        self.minutes = np.array(sorted(set(int(minute) for minute in minutes)), dtype=int)
+        if len(self.minutes) > MAX_SLOTS_PER_DAY:
+            raise ValueError(f"At most {MAX_SLOTS_PER_DAY} slots per day are supported, got {len(self.minutes)}")
+
+        self.date_index = {day: i for i, day in enumerate(self.dates)}
+        self.doctor_index = {doctor: i for i, doctor in enumerate(self.doctors)}
+        self.minute_index = {int(minute): i for i, minute in enumerate(self.minutes)}
+        specializations = np.array([doctors[doctor] for doctor in self.doctors])
+        self.specialization_doctors = {
+            specialization: np.flatnonzero(specializations == specialization)
+            for specialization in set(specializations)
+        }
+
+        self.bits = np.left_shift(np.uint64(1), np.arange(len(self.minutes), dtype=np.uint64))
+        self.free = np.zeros((len(self.dates), len(self.doctors)), dtype=np.uint64)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "SlotBitmap":
+        """Build the bitmap from a frame with date, minute, doctor_name, specialization and is_available columns."""
+        bitmap = cls(
+            df["date"],
+            dict(zip(df["doctor_name"], df["specialization"])),
+            df["minute"],
+        )
+        free = df[df["is_available"].astype(bool)]
+        np.bitwise_or.at(
+            bitmap.free,
+            (free["date"].map(bitmap.date_index).to_numpy(), free["doctor_name"].map(bitmap.doctor_index).to_numpy()),
+            bitmap.bits[free["minute"].map(bitmap.minute_index).to_numpy()],
+        )
+        return bitmap
+
+    def set(self, day: date, minute: int, doctor_name: str, is_available: bool) -> None:
+        """Mark one slot as free or taken."""
+        i = self.date_index[day]
+        doctor = self.doctor_index[doctor_name]
+        bit = self.bits[self.minute_index[minute]]
+        if is_available:
+            self.free[i, doctor] |= bit
+        else:
+            self.free[i, doctor] &= ~bit
+
+    def _unpack(self, words: np.ndarray) -> np.ndarray:
+        """Expand words into a boolean matrix with one column per slot of the grid."""
+        return (words[..., None] & self.bits) != 0
+
+    def free_minutes(self, day: date, doctor_name: str) -> np.ndarray:
+        """Return the start minutes of a doctor's free slots on a day."""
+        i = self.date_index.get(day)
+        doctor = self.doctor_index.get(doctor_name)
+        if i is None or doctor is None:
+            return self.minutes[:0]
+        return self.minutes[self._unpack(self.free[i, doctor])]
+
+    def free_minutes_by_doctor(self, day: date, specialization: str) -> Dict[str, np.ndarray]:
+        """Return the start minutes of the free slots of every doctor with the specialization on a day."""
+        i = self.date_index.get(day)
+        doctors = self.specialization_doctors.get(specialization)
+        if i is None or doctors is None:
+            return {}
+        free = self._unpack(self.free[i, doctors])
+        return {
+            self.doctors[doctor]: self.minutes[row]
+            for doctor, row in zip(doctors, free)
+            if row.any()
+        }
+
+    def doctors_free_at(
+        self, minute: int, dates: Iterable[date], specialization: Optional[str] = None
+    ) -> Dict[date, List[str]]:
+        """Return the doctors with a free slot starting at `minute` on each of the days, by date."""
+        bit = self.minute_index.get(minute)
+        days = [self.date_index[day] for day in dates if day in self.date_index]
+        if bit is None or not days:
+            return {}
+        doctors = (
+            np.arange(len(self.doctors))
+            if specialization is None
+            else self.specialization_doctors.get(specialization, np.array([], dtype=int))
+        )
+        free = (self.free[np.ix_(days, doctors)] & self.bits[bit]) != 0
+        return {
+            self.dates[i]: [self.doctors[doctors[j]] for j in np.flatnonzero(row)]
+            for i, row in zip(days, free)
+        }
@@ -0,0 +1,246 @@
+"""Availability store backed by the `availability_slots` table."""
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from salonist.appointment.availability.store import (
+    BatchBookingResult,
+    RescheduleResult,
+    Slot,
+    SlotConflictError,
+)
+from salonist.appointment.availability.timeslots import day_bounds, minute_of_day
+from salonist.models import AvailabilitySlot
+
+
+class _Abort(Exception):
+    """Rolls back a multi-statement update with the given result."""
+
+
+class DatabaseAvailabilityStore:
+    """Availability store answering lookups with indexed queries.
+
+    Exposes the same interface as `AvailabilityStore`. It works on its own
+    engine rather than `db.session`, because LangGraph runs tools on worker
+    threads that have no Flask application context.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.Session = sessionmaker(bind=engine)
+
+    @property
+    def version(self) -> None:
+        """Other processes write to the table directly, so there is no version to cache answers under."""
+        return None
+
+    def available_times_for_doctor(self, day: date, doctor_name: str) -> List[int]:
+        """Return the start minutes of a doctor's free slots on a day."""
+        start, end = day_bounds(day)
+        query = (
+            select(AvailabilitySlot.slot_start)
+            .where(
+                AvailabilitySlot.doctor_name == doctor_name,
+                AvailabilitySlot.slot_start >= start,
+                AvailabilitySlot.slot_start < end,
+                AvailabilitySlot.is_available.is_(True),
+            )
+            .order_by(AvailabilitySlot.slot_start)
+        )
+        with self.Session() as session:
+            return [minute_of_day(slot_start) for slot_start in session.scalars(query)]
+
+    def available_times_by_doctor(self, day: date, specialization: str) -> Dict[str, List[int]]:
+        """Return the start minutes of the free slots of every doctor with the given specialization, by doctor name."""
+        start, end = day_bounds(day)
+        query = (
+            select(AvailabilitySlot.doctor_name, AvailabilitySlot.slot_start)
+            .where(
+                AvailabilitySlot.specialization == specialization,
+                AvailabilitySlot.slot_start >= start,
+                AvailabilitySlot.slot_start < end,
+                AvailabilitySlot.is_available.is_(True),
+            )
+            .order_by(AvailabilitySlot.doctor_name, AvailabilitySlot.slot_start)
+        )
+        result: Dict[str, List[int]] = {}
+        with self.Session() as session:
+            for doctor_name, slot_start in session.execute(query):
+                result.setdefault(doctor_name, []).append(minute_of_day(slot_start))
+        return result
+
+    def earliest_available(
+        self,
+        start_date: date,
+        end_date: Optional[date] = None,
+        limit: int = 5,
+        doctor_name: Optional[str] = None,
+        specialization: Optional[str] = None,
+    ) -> List[Tuple[datetime, str]]:
+        """Return the first free slots between two dates, both inclusive.
+
+        Returns:
+            Up to `limit` (slot start, doctor_name) pairs, earliest first
+        """
+        query = (
+            select(AvailabilitySlot.slot_start, AvailabilitySlot.doctor_name)
+            .where(
+                AvailabilitySlot.slot_start >= day_bounds(start_date)[0],
+                AvailabilitySlot.is_available.is_(True),
+            )
+            .order_by(AvailabilitySlot.slot_start, AvailabilitySlot.doctor_name)
+            .limit(limit)
+        )
+        if end_date is not None:
+            query = query.where(AvailabilitySlot.slot_start < day_bounds(end_date)[1])
+        if doctor_name is not None:
+            query = query.where(AvailabilitySlot.doctor_name == doctor_name)
+        if specialization is not None:
+            query = query.where(AvailabilitySlot.specialization == specialization)
+        with self.Session() as session:
+            return [(slot_start, doctor) for slot_start, doctor in session.execute(query)]
+
+    def get_slot(self, start: datetime, doctor_name: str) -> Optional[Slot]:
+        """Return the doctor's slot starting at `start`, if any."""
+        query = select(AvailabilitySlot).where(
+            AvailabilitySlot.doctor_name == doctor_name,
+            AvailabilitySlot.slot_start == start,
+        )
+        with self.Session() as session:
+            row = session.scalars(query).first()
+            if row is None:
+                return None
+            return Slot(
+                start=row.slot_start,
+                specialization=row.specialization,
+                doctor_name=row.doctor_name,
+                is_available=row.is_available,
+                patient_to_attend=row.patient_to_attend,
+                version=row.version,
+            )
+
+    def _update(
+        self, session, start: datetime, doctor_name: str, condition, expected_version: Optional[int], **values
+    ) -> bool:
+        """Conditionally update one slot and bump its version.
+
+        Raises:
+            SlotConflictError: If the slot exists but no longer has the expected version
+        """
+        statement = (
+            update(AvailabilitySlot)
+            .where(
+                AvailabilitySlot.doctor_name == doctor_name,
+                AvailabilitySlot.slot_start == start,
+                condition,
+            )
+            .values(version=AvailabilitySlot.version + 1, **values)
+        )
+        if expected_version is not None:
+            statement = statement.where(AvailabilitySlot.version == expected_version)
+        if session.execute(statement).rowcount > 0:
+            return True
+
+        if expected_version is not None:
+            current = session.scalar(
+                select(AvailabilitySlot.version).where(
+                    AvailabilitySlot.doctor_name == doctor_name,
+                    AvailabilitySlot.slot_start == start,
+                )
+            )
+            if current is not None and current != expected_version:
+                raise SlotConflictError(f'{doctor_name} at {start} was changed by another booking')
+        return False
+
+    def book(
+        self, start: datetime, doctor_name: str, patient_to_attend: int, expected_version: Optional[int] = None
+    ) -> bool:
+        """Assign a free slot to a patient. Returns False if the slot isn't free."""
+        with self.Session.begin() as session:
+            return self._update(
+                session, start, doctor_name,
+                AvailabilitySlot.is_available.is_(True), expected_version,
+                is_available=False, patient_to_attend=patient_to_attend,
+            )
+
+    def cancel(
+        self, start: datetime, doctor_name: str, patient_to_attend: int, expected_version: Optional[int] = None
+    ) -> bool:
+        """Free a slot booked by the patient. Returns False if there is no such booking."""
+        with self.Session.begin() as session:
+            return self._update(
+                session, start, doctor_name,
+                AvailabilitySlot.patient_to_attend == patient_to_attend, expected_version,
+                is_available=True, patient_to_attend=None,
+            )
+
+    def book_many(self, bookings: List[Tuple[datetime, str, int]]) -> List[BatchBookingResult]:
+        """Book several slots all-or-nothing in one transaction.
+
+        Returns:
+            Result of each booking, in order. Unless every booking is "booked",
+            the transaction is rolled back and the bookings that could have
+            succeeded are "skipped".
+        """
+        results: List[BatchBookingResult] = []
+        seen = set()
+        try:
+            with self.Session.begin() as session:
+                for start, doctor_name, patient_to_attend in bookings:
+                    key = (start, doctor_name)
+                    if key in seen:
+                        results.append("duplicate")
+                        continue
+                    seen.add(key)
+                    booked = self._update(
+                        session, start, doctor_name,
+                        AvailabilitySlot.is_available.is_(True), None,
+                        is_available=False, patient_to_attend=patient_to_attend,
+                    )
+                    results.append("booked" if booked else "unavailable")
+                if any(result != "booked" for result in results):
+                    raise _Abort()
+        except _Abort:
+            return ["skipped" if result == "booked" else result for result in results]
+        return results
+
+    def reschedule(
+        self,
+        old_start: datetime,
+        new_start: datetime,
+        doctor_name: str,
+        patient_to_attend: int,
+        expected_version: Optional[int] = None,
+    ) -> RescheduleResult:
+        """Move a patient's booking to another slot of the same doctor in one transaction.
+
+        The new slot is claimed with a conditional UPDATE, so a concurrent
+        booking of the same slot makes one of the two transactions fail
+        instead of double-booking it.
+
+        Raises:
+            SlotConflictError: If the booked slot no longer has the expected version
+        """
+        try:
+            with self.Session.begin() as session:
+                if not self._update(
+                    session, new_start, doctor_name,
+                    AvailabilitySlot.is_available.is_(True), None,
+                    is_available=False, patient_to_attend=patient_to_attend,
+                ):
+                    raise _Abort("unavailable")
+                if not self._update(
+                    session, old_start, doctor_name,
+                    AvailabilitySlot.patient_to_attend == patient_to_attend, expected_version,
+                    is_available=True, patient_to_attend=None,
+                ):
+                    raise _Abort("not_booked")
+        except _Abort as e:
+            return e.args[0]
+        return "rescheduled"
+
+    def compact(self) -> None:
+        """The database keeps no journal, so there is nothing to compact."""
@@ -0,0 +1,76 @@
+"""Sorted index of free slot start times, for earliest-availability searches."""
+import heapq
+from bisect import bisect_left
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+
+class FreeSlotIndex:
+    """Start times of every doctor's free slots, kept sorted.
+
+    Finding the first free slots in a date window is a binary search per
+    doctor followed by a k-way merge, instead of probing the calendar day by
+    day.
+    """
+
+    def __init__(self, doctors: Dict[str, str]):
+        """Create an empty index.
+
+        Args:
+            doctors: Specialization of each doctor, by doctor name
+        """
+        self.doctors = doctors
+        self.starts: Dict[str, List[datetime]] = {doctor: [] for doctor in doctors}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "FreeSlotIndex":
+        """Build the index from a frame with slot_start, doctor_name, specialization and is_available columns."""
+        index = cls(dict(zip(df["doctor_name"], df["specialization"])))
+        free = df[df["is_available"].astype(bool)].sort_values("slot_start")
+        for doctor, starts in free.groupby("doctor_name")["slot_start"]:
+            index.starts[doctor] = [start.to_pydatetime() for start in starts]
+        return index
+
+    def add(self, doctor_name: str, start: datetime) -> None:
+        """Record that a slot became free."""
+        starts = self.starts[doctor_name]
+        i = bisect_left(starts, start)
+        if i == len(starts) or starts[i] != start:
+            starts.insert(i, start)
+
+    def remove(self, doctor_name: str, start: datetime) -> None:
+        """Record that a slot was taken."""
+        starts = self.starts[doctor_name]
+        i = bisect_left(starts, start)
+        if i < len(starts) and starts[i] == start:
+            del starts[i]
+
+    def _window(self, doctor_name: str, start: datetime, end: Optional[datetime]) -> Iterator[Tuple[datetime, str]]:
+        # Both bounds are binary searches; only the slots inside the window are copied
+        starts = self.starts[doctor_name]
+        first = bisect_left(starts, start)
+        stop = len(starts) if end is None else bisect_left(starts, end, lo=first)
+        return ((slot_start, doctor_name) for slot_start in starts[first:stop])
+
+    def earliest(
+        self,
+        start: datetime,
+        end: Optional[datetime] = None,
+        limit: int = 5,
+        doctor_name: Optional[str] = None,
+        specialization: Optional[str] = None,
+    ) -> List[Tuple[datetime, str]]:
+        """Return up to `limit` (slot start, doctor name) pairs of free slots in [start, end), earliest first.
+
+        `doctor_name` and `specialization` both filter: given together, the
+        doctor must also have that specialization.
+        """
+        doctors = [
+            doctor for doctor, doctor_specialization in self.doctors.items()
+            if (doctor_name is None or doctor == doctor_name)
+            and (specialization is None or doctor_specialization == specialization)
+        ]
+        return list(islice(heapq.merge(*(self._window(doctor, start, end) for doctor in doctors)), limit))
@@ -0,0 +1,66 @@
+"""Append-only journal of booking events for the availability store."""
+import json
+import os
+from typing import Any, Dict, List, Tuple
+
+
+class BookingJournal:
+    """Append-only log of booking events, one JSON object per line.
+
+    Events record the resulting state of a slot rather than a toggle, so
+    replaying an event that is already reflected in the snapshot is harmless.
+    A line that was only partially written (e.g. the process crashed halfway
+    through an append) is ignored on replay and cut off by `repair`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def size(self) -> int:
+        """Return the journal size in bytes, 0 if it doesn't exist yet."""
+        try:
+            return os.stat(self.path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def append(self, events: List[Dict[str, Any]]) -> int:
+        """Durably append events to the journal.
+
+        Returns:
+            Journal size in bytes after the append
+        """
+        data = "".join(json.dumps(event) + "\n" for event in events).encode("utf-8")
+        with open(self.path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+    def replay(self, offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Read the complete events written after `offset`.
+
+        Returns:
+            Tuple of (events, offset just past the last complete line)
+        """
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], 0
+
+        end = data.rfind(b"\n") + 1
+        events = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+        return events, offset + end
+
+    def repair(self, offset: int) -> None:
+        """Drop a partially written trailing line beyond `offset`."""
+        if self.size() > offset:
+            with open(self.path, "r+b") as f:
+                f.truncate(offset)
+
+    def truncate(self) -> None:
+        """Empty the journal once its events are part of a new snapshot."""
+        with open(self.path, "wb") as f:
+            f.flush()
+            os.fsync(f.fileno())
@@ -0,0 +1,366 @@
+"""Availability calendar split into monthly partitions listed in a manifest."""
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from salonist.appointment.availability.store import (
+    AvailabilityStore,
+    BatchBookingResult,
+    RescheduleResult,
+    Slot,
+    commit_across,
+)
+from salonist.appointment.availability.timeslots import DATE_SLOT_FORMAT
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+ARCHIVE_DIR = "archive"
+
+
+def partition_month(day: date) -> str:
+    """Return the 'YYYY-MM' partition holding a day."""
+    return day.strftime("%Y-%m")
+
+
+def read_manifest(directory: str) -> Dict[str, dict]:
+    """Return the manifest entries of a partition directory, by month."""
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            return {entry["month"]: entry for entry in json.load(f)["partitions"]}
+    except FileNotFoundError:
+        return {}
+
+
+def write_manifest(directory: str, partitions: Dict[str, dict]) -> None:
+    """Atomically replace the manifest of a partition directory."""
+    path = os.path.join(directory, MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"partitions": [partitions[month] for month in sorted(partitions)]}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def split_into_partitions(source: str, directory: str) -> List[str]:
+    """Split a single-file calendar into monthly partitions.
+
+    Months already in the directory are replaced; other partitions, archived
+    or not, are kept.
+
+    Returns:
+        Months written
+    """
+    os.makedirs(directory, exist_ok=True)
+    df = pd.read_csv(source)
+    months = pd.to_datetime(df["date_slot"], format=DATE_SLOT_FORMAT).dt.strftime("%Y-%m")
+    partitions = read_manifest(directory)
+    for month, frame in df.groupby(months, sort=True):
+        file = f"{month}.csv"
+        frame.to_csv(os.path.join(directory, file), index=False)
+        # Events journaled against the replaced partition no longer apply
+        journal_path = os.path.join(directory, f"{month}.journal")
+        if os.path.exists(journal_path):
+            os.remove(journal_path)
+        partitions[month] = {"month": month, "file": file, "archived": False}
+    write_manifest(directory, partitions)
+    return sorted(months.unique())
+
+
+class PartitionedAvailabilityStore:
+    """Availability calendar kept as one `AvailabilityStore` per month.
+
+    The directory holds a CSV snapshot and a booking journal per month, plus a
+    manifest listing the partitions. A partition is only read when a lookup or
+    booking touches one of its days, so the cost of a tool call doesn't grow
+    with the length of the calendar, and compaction only rewrites the months
+    that were booked. Archived partitions are moved out of the way and are no
+    longer served.
+
+    Bookings within a month are atomic, as in `AvailabilityStore`. Group
+    bookings and reschedules spanning several months take the write lock of
+    every partition involved, in month order, check all of the slots and
+    only then journal each partition's part, so no other writer can slip in
+    between and nothing is written unless every part can be. If a journal
+    write fails, the parts already written are cut off again. Only a crash
+    between two of those journal appends can leave the change half written.
+    """
+
+    def __init__(self, directory: str, compact_every: int = 1000):
+        self.path = directory
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        self._manifest_mtime: Optional[int] = None
+        self._manifest_generation = 0
+        self._partitions: Dict[str, AvailabilityStore] = {}
+        self._archived: Set[str] = set()
+
+    def _refresh(self) -> None:
+        """Pick up partitions added or archived since the manifest was last read."""
+        try:
+            mtime = os.stat(os.path.join(self.path, MANIFEST_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._manifest_mtime:
+            return
+
+        partitions = {}
+        archived = set()
+        for month, entry in read_manifest(self.path).items():
+            if entry["archived"]:
+                archived.add(month)
+                continue
+            path = os.path.join(self.path, entry["file"])
+            store = self._partitions.get(month)
+            if store is None or store.path != path:
+                store = AvailabilityStore(path, compact_every=self.compact_every)
+            partitions[month] = store
+        logger.info(f'Loaded manifest of {len(partitions)} availability partitions from {self.path}')
+        self._partitions = partitions
+        self._archived = archived
+        self._manifest_mtime = mtime
+        self._manifest_generation += 1
+
+    def _partition(self, day: date) -> Optional[AvailabilityStore]:
+        with self._lock:
+            self._refresh()
+            month = partition_month(day)
+            if month in self._archived:
+                logger.warning(f'Availability of {month} is archived and no longer served')
+            return self._partitions.get(month)
+
+    def _partitions_of(self, days: List[date]) -> Dict[str, Optional[AvailabilityStore]]:
+        """The partition of each month the days fall in, None for months not served, in month order."""
+        return {month: self._partition(day) for month, day in sorted((partition_month(day), day) for day in days)}
+
+    @property
+    def version(self) -> Tuple[int, int]:
+        """Changes whenever a partition does or the manifest is reloaded.
+
+        A (manifest generation, sum of the partition versions) pair: partition
+        versions only grow, and partitions not loaded yet count as 0.
+        """
+        with self._lock:
+            self._refresh()
+            return self._manifest_generation, sum(partition.version for partition in self._partitions.values())
+
+    def available_times_for_doctor(self, day: date, doctor_name: str) -> List[int]:
+        """Return the start minutes of a doctor's free slots on a day."""
+        partition = self._partition(day)
+        return [] if partition is None else partition.available_times_for_doctor(day, doctor_name)
+
+    def available_times_by_doctor(self, day: date, specialization: str) -> Dict[str, List[int]]:
+        """Return the start minutes of the free slots of every doctor with the given specialization, by doctor name."""
+        partition = self._partition(day)
+        return {} if partition is None else partition.available_times_by_doctor(day, specialization)
+
+    def available_doctors_at(
+        self, minute: int, days: List[date], specialization: Optional[str] = None
+    ) -> Dict[date, List[str]]:
+        """Return the doctors with a free slot starting at `minute` on each of the days, by date."""
+        days_by_month: Dict[str, List[date]] = {}
+        for day in days:
+            days_by_month.setdefault(partition_month(day), []).append(day)
+
+        result: Dict[date, List[str]] = {}
+        for month_days in days_by_month.values():
+            partition = self._partition(month_days[0])
+            if partition is not None:
+                result.update(partition.available_doctors_at(minute, month_days, specialization))
+        return result
+
+    def earliest_available(
+        self,
+        start_date: date,
+        end_date: Optional[date] = None,
+        limit: int = 5,
+        doctor_name: Optional[str] = None,
+        specialization: Optional[str] = None,
+    ) -> List[Tuple[datetime, str]]:
+        """Return the first free slots between two dates, both inclusive.
+
+        Partitions are searched month by month and the search stops as soon
+        as `limit` slots are found, so later months are not loaded.
+
+        Returns:
+            Up to `limit` (slot start, doctor_name) pairs, earliest first
+        """
+        with self._lock:
+            self._refresh()
+            partitions = sorted(self._partitions.items())
+
+        first_month = partition_month(start_date)
+        last_month = None if end_date is None else partition_month(end_date)
+        result: List[Tuple[datetime, str]] = []
+        for month, partition in partitions:
+            if len(result) >= limit or (last_month is not None and month > last_month):
+                break
+            if month < first_month:
+                continue
+            result += partition.earliest_available(
+                start_date, end_date, limit - len(result), doctor_name=doctor_name, specialization=specialization
+            )
+        return result
+
+    def get_slot(self, start: datetime, doctor_name: str) -> Optional[Slot]:
+        """Return a copy of the doctor's slot starting at `start`, if any."""
+        partition = self._partition(start.date())
+        return None if partition is None else partition.get_slot(start, doctor_name)
+
+    def book(
+        self, start: datetime, doctor_name: str, patient_to_attend: int, expected_version: Optional[int] = None
+    ) -> bool:
+        """Assign a free slot to a patient. Returns False if the slot doesn't exist or isn't free."""
+        partition = self._partition(start.date())
+        return partition is not None and partition.book(start, doctor_name, patient_to_attend, expected_version)
+
+    def cancel(
+        self, start: datetime, doctor_name: str, patient_to_attend: int, expected_version: Optional[int] = None
+    ) -> bool:
+        """Free a slot booked by the patient. Returns False if there is no such booking."""
+        partition = self._partition(start.date())
+        return partition is not None and partition.cancel(start, doctor_name, patient_to_attend, expected_version)
+
+    def book_many(self, bookings: List[Tuple[datetime, str, int]]) -> List[BatchBookingResult]:
+        """Book several slots all-or-nothing, even across months.
+
+        Returns:
+            Result of each booking, in order. Unless every booking is "booked",
+            nothing was written and the bookings that could have succeeded are
+            "skipped".
+
+        Raises:
+            SlotConflictError: If another writer changed one of the slots meanwhile
+        """
+        partitions = self._partitions_of([start.date() for start, _, _ in bookings])
+        if len(partitions) == 1:
+            partition = next(iter(partitions.values()))
+            return ["unavailable"] * len(bookings) if partition is None else partition.book_many(bookings)
+
+        def check():
+            results: List[BatchBookingResult] = []
+            events: Dict[str, List[dict]] = {}
+            expected: Dict[str, Dict[Tuple[datetime, str], int]] = {}
+            for start, doctor_name, patient_to_attend in bookings:
+                month = partition_month(start.date())
+                partition = partitions[month]
+                slot = None if partition is None else partition.get_slot(start, doctor_name)
+                if slot is None or not slot.is_available:
+                    results.append("unavailable")
+                elif (start, doctor_name) in expected.get(month, {}):
+                    results.append("duplicate")
+                else:
+                    results.append("booked")
+                    expected.setdefault(month, {})[(start, doctor_name)] = slot.version
+                    events.setdefault(month, []).append({
+                        "op": "book",
+                        "slot_start": start.isoformat(),
+                        "doctor_name": doctor_name,
+                        "patient_to_attend": patient_to_attend,
+                    })
+
+            if any(result != "booked" for result in results):
+                return ["skipped" if result == "booked" else result for result in results], []
+            return results, [
+                (partitions[month], {"op": "batch", "events": events[month]}, expected[month]) for month in events
+            ]
+
+        return commit_across([partition for partition in partitions.values() if partition is not None], check)
+
+    def reschedule(
+        self,
+        old_start: datetime,
+        new_start: datetime,
+        doctor_name: str,
+        patient_to_attend: int,
+        expected_version: Optional[int] = None,
+    ) -> RescheduleResult:
+        """Move a patient's booking to another slot of the same doctor in one step, even across months.
+
+        Raises:
+            SlotConflictError: If another writer changed either slot meanwhile
+        """
+        old_partition = self._partition(old_start.date())
+        new_partition = self._partition(new_start.date())
+        if new_partition is None:
+            return "unavailable"
+        if old_partition is None:
+            return "not_booked"
+        if old_partition is new_partition:
+            return old_partition.reschedule(old_start, new_start, doctor_name, patient_to_attend, expected_version)
+
+        def check():
+            new_slot = new_partition.get_slot(new_start, doctor_name)
+            if new_slot is None or not new_slot.is_available:
+                return "unavailable", []
+            old_slot = old_partition.get_slot(old_start, doctor_name)
+            if old_slot is None or old_slot.patient_to_attend != patient_to_attend:
+                return "not_booked", []
+            return "rescheduled", [
+                (
+                    new_partition,
+                    {
+                        "op": "book",
+                        "slot_start": new_start.isoformat(),
+                        "doctor_name": doctor_name,
+                        "patient_to_attend": patient_to_attend,
+                    },
+                    {(new_start, doctor_name): new_slot.version},
+                ),
+                (
+                    old_partition,
+                    {"op": "cancel", "slot_start": old_start.isoformat(), "doctor_name": doctor_name},
+                    {(old_start, doctor_name): old_slot.version if expected_version is None else expected_version},
+                ),
+            ]
+
+        partitions = [old_partition, new_partition] if old_start < new_start else [new_partition, old_partition]
+        return commit_across(partitions, check)
+
+    def compact(self) -> None:
+        """Fold the journal of every partition that has pending bookings into its snapshot."""
+        with self._lock:
+            self._refresh()
+            for partition in self._partitions.values():
+                if partition.journal.size() > 0:
+                    partition.compact()
+
+    def archive(self, before: date) -> List[str]:
+        """Move the partitions of months before `before` into the archive directory.
+
+        Pending bookings are compacted into each partition first. Archived
+        partitions stay listed in the manifest but are no longer served.
+
+        Returns:
+            Months archived
+        """
+        with self._lock:
+            self._refresh()
+            manifest = read_manifest(self.path)
+            cutoff = partition_month(before)
+            months = [
+                month for month, entry in sorted(manifest.items())
+                if month < cutoff and not entry["archived"]
+            ]
+            if not months:
+                return []
+
+            os.makedirs(os.path.join(self.path, ARCHIVE_DIR), exist_ok=True)
+            for month in months:
+                partition = self._partitions.get(month)
+                if partition is not None and partition.journal.size() > 0:
+                    partition.compact()
+                file = os.path.join(ARCHIVE_DIR, os.path.basename(manifest[month]["file"]))
+                shutil.move(os.path.join(self.path, manifest[month]["file"]), os.path.join(self.path, file))
+                if partition is not None and os.path.exists(partition.journal.path):
+                    os.remove(partition.journal.path)
+                manifest[month] = {"month": month, "file": file, "archived": True}
+            write_manifest(self.path, manifest)
+            self._refresh()
+            logger.info(f'Archived availability partitions {", ".join(months)}')
+            return months
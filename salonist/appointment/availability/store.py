@@ -0,0 +1,579 @@
+"""In-memory, indexed view over the appointment availability calendar."""
+import logging
+import os
+import threading
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Literal, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from salonist.appointment.availability.bitmap import SlotBitmap
+from salonist.appointment.availability.free_index import FreeSlotIndex
+from salonist.appointment.availability.journal import BookingJournal
+from salonist.appointment.availability.locking import FileLock
+from salonist.appointment.availability.timeslots import (
+    format_date_slots,
+    minute_of_day,
+    parse_date_slot,
+    parse_date_slots,
+    slot_start,
+)
+from salonist.appointment.availability.writer import GroupCommitWriter
+from salonist.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ["date_slot", "specialization", "doctor_name", "is_available", "patient_to_attend", "version"]
+
+RescheduleResult = Literal["rescheduled", "unavailable", "not_booked"]
+BatchBookingResult = Literal["booked", "unavailable", "duplicate", "skipped"]
+
+
+class SlotConflictError(Exception):
+    """Raised when a slot was changed by someone else since it was read."""
+
+
+@dataclass
+class Slot:
+    """A single half-hour slot in a doctor's calendar."""
+
+    start: datetime
+    specialization: str
+    doctor_name: str
+    is_available: bool
+    patient_to_attend: Optional[int] = None
+    version: int = 0
+
+    @property
+    def date(self) -> date:
+        return self.start.date()
+
+    @property
+    def minute(self) -> int:
+        return minute_of_day(self.start)
+
+
+def _event_start(event: dict, key: str) -> datetime:
+    """Read a slot start from a journal event.
+
+    Events are written with ISO timestamps; journals written before slots
+    were typed carry 'DD-MM-YYYY H.MM' strings instead.
+    """
+    if key in event:
+        return datetime.fromisoformat(event[key])
+    return parse_date_slot(event[key.replace("slot_start", "date_slot")])
+
+
+class AvailabilityStore:
+    """Process-wide availability calendar loaded once from a CSV snapshot.
+
+    The 'date_slot' strings of the file are parsed once on load; from then on
+    slots are addressed by their start datetime, and days and times of day
+    are `date` objects and minutes past midnight. Free slots are kept in a
+    `SlotBitmap`, so lookups by doctor or specialization are a few vectorized
+    operations instead of a scan of the whole calendar, and a `FreeSlotIndex`
+    answers earliest-availability searches. Bookings and cancellations are
+    appended to a journal instead of rewriting the snapshot; the journal is
+    replayed on load and folded into a new snapshot every `compact_every`
+    events. The calendar is re-read whenever the snapshot changes on disk, and
+    journal entries written by other processes are replayed incrementally.
+
+    Writes go through a `GroupCommitWriter`: bookings queued while a batch is
+    being written are committed together under a file lock shared by every
+    process, with one journal append and fsync per batch.
+    """
+
+    def __init__(self, path: str, journal_path: Optional[str] = None, compact_every: int = 1000):
+        self.path = path
+        self.journal = BookingJournal(journal_path or f"{os.path.splitext(path)[0]}.journal")
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        self._mtime: Optional[int] = None
+        self._journal_offset = 0
+        self._journal_events = 0
+        self._frame: Optional[pd.DataFrame] = None
+        self._slots: List[Slot] = []
+        self._by_slot: Dict[Tuple[datetime, str], Slot] = {}
+        self._bitmap: Optional[SlotBitmap] = None
+        self._free_index: Optional[FreeSlotIndex] = None
+        self._generation = 0
+        self._pending: List[dict] = []
+        self._file_lock = FileLock(f"{path}.lock")
+        self._writer = GroupCommitWriter(self._commit, name=f"availability-writer-{os.path.basename(path)}")
+
+    def _refresh(self) -> None:
+        """Bring the in-memory calendar up to date with the files on disk."""
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self._mtime or self.journal.size() < self._journal_offset:
+            self._load()
+            self._mtime = mtime
+        elif self.journal.size() > self._journal_offset:
+            self._replay()
+
+    def _load(self) -> None:
+        logger.info(f'Loading availability from {self.path}')
+        df = pd.read_csv(self.path)
+        if "version" not in df.columns:
+            df["version"] = 0
+        df["date"], df["minute"] = parse_date_slots(df["date_slot"])
+        df["slot_start"] = pd.to_datetime(df["date"]) + pd.to_timedelta(df["minute"], unit="m")
+        df["patient_to_attend"] = df["patient_to_attend"].astype("Int64")
+
+        slots = [
+            Slot(
+                start.to_pydatetime(), specialization, doctor_name, bool(is_available),
+                None if pd.isna(patient) else int(patient), int(version),
+            )
+            for start, specialization, doctor_name, is_available, patient, version in zip(
+                df["slot_start"], df["specialization"], df["doctor_name"], df["is_available"],
+                df["patient_to_attend"], df["version"],
+            )
+        ]
+
+        self._frame = df[["date", "minute", "specialization", "doctor_name"]]
+        self._slots = slots
+        self._by_slot = {(slot.start, slot.doctor_name): slot for slot in slots}
+        self._bitmap = SlotBitmap.from_frame(df)
+        self._free_index = FreeSlotIndex.from_frame(df)
+        self._generation += 1
+        self._journal_offset = 0
+        self._journal_events = 0
+        self._replay()
+
+    def _replay(self) -> None:
+        """Apply the journal events written since the last replay."""
+        events, self._journal_offset = self.journal.replay(self._journal_offset)
+        for event in events:
+            self._apply(event)
+        self._journal_events += len(events)
+        if events:
+            logger.info(f'Replayed {len(events)} booking events from {self.journal.path}')
+
+    def _find(self, start: datetime, doctor_name: str) -> Optional[Slot]:
+        return self._by_slot.get((start, doctor_name))
+
+    def _apply(self, event: dict) -> None:
+        if event["op"] == "batch":
+            for batch_event in event["events"]:
+                self._apply(batch_event)
+            return
+        if event["op"] == "reschedule":
+            old_start = _event_start(event, "old_slot_start").isoformat()
+            new_start = _event_start(event, "new_slot_start").isoformat()
+            self._apply({"op": "cancel", "slot_start": old_start, "doctor_name": event["doctor_name"]})
+            self._apply({**event, "op": "book", "slot_start": new_start})
+            return
+
+        slot = self._find(_event_start(event, "slot_start"), event["doctor_name"])
+        if slot is None:
+            logger.warning(f'Skipping journal event for unknown slot: {event}')
+            return
+        if event["op"] == "book":
+            slot.is_available = False
+            slot.patient_to_attend = event["patient_to_attend"]
+        elif event["op"] == "cancel":
+            slot.is_available = True
+            slot.patient_to_attend = None
+        slot.version += 1
+        self._generation += 1
+        self._bitmap.set(slot.date, slot.minute, slot.doctor_name, slot.is_available)
+        if slot.is_available:
+            self._free_index.add(slot.doctor_name, slot.start)
+        else:
+            self._free_index.remove(slot.doctor_name, slot.start)
+
+    def _stage(self, event: dict, expected: Dict[Tuple[datetime, str], int]) -> None:
+        """Apply an event if none of the slots it touches changed, and queue it for the batch's journal write.
+
+        Args:
+            event: Journal event to record
+            expected: Version each touched (slot start, doctor_name) had when the caller checked it
+
+        Raises:
+            SlotConflictError: If another writer changed one of the slots meanwhile
+        """
+        for (start, doctor_name), version in expected.items():
+            slot = self._find(start, doctor_name)
+            if slot is None or slot.version != version:
+                raise SlotConflictError(f'{doctor_name} at {start} was changed by another booking')
+
+        self._apply(event)
+        self._pending.append(event)
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """Hold the locks shared by this store's writers in every process, with the calendar up to date."""
+        with self._lock, self._file_lock:
+            self._refresh()
+            # Nobody else is appending, so a partial last line is left over from a crash
+            self.journal.repair(self._journal_offset)
+            yield
+
+    def _commit(self, mutations: List[Callable[[], Any]]) -> List[Any]:
+        """Run a batch of mutations and journal their events with a single write.
+
+        Runs on the writer thread while holding the lock shared by every
+        process, so each mutation sees all bookings committed before it, by
+        this batch or by another process.
+
+        Returns:
+            Result of each mutation, or the exception it raised
+        """
+        with self._write_lock():
+            outcomes = []
+            for mutation in mutations:
+                try:
+                    outcomes.append(mutation())
+                except Exception as e:
+                    outcomes.append(e)
+            self._append_pending()
+            self._compact_if_due()
+            return outcomes
+
+    def _append_pending(self) -> None:
+        """Journal the events staged since the last append with a single write."""
+        events, self._pending = self._pending, []
+        if events:
+            try:
+                self._journal_offset = self.journal.append(events)
+            except Exception:
+                # The events were applied in memory only, so read the calendar again
+                self._mtime = None
+                raise
+            self._journal_events += len(events)
+
+    def _discard_appended(self, offset: int) -> None:
+        """Drop the events staged or journaled past `offset` and read the calendar again."""
+        self._pending = []
+        self.journal.repair(offset)
+        self._mtime = None
+
+    def _compact_if_due(self) -> None:
+        if self._journal_events >= self.compact_every:
+            self._compact()
+
+    def compact(self) -> None:
+        """Write the current calendar as a new snapshot and empty the journal.
+
+        The snapshot is written to a temporary file and moved into place, so a
+        crash never leaves a truncated calendar behind.
+        """
+        with self._lock, self._file_lock:
+            self._compact()
+
+    def _compact(self) -> None:
+        self._refresh()
+        df = pd.DataFrame({
+            "date_slot": format_date_slots(self._frame["date"], self._frame["minute"]),
+            "specialization": self._frame["specialization"],
+            "doctor_name": self._frame["doctor_name"],
+            "is_available": [slot.is_available for slot in self._slots],
+            "patient_to_attend": np.array(
+                [np.nan if slot.patient_to_attend is None else slot.patient_to_attend for slot in self._slots],
+                dtype=float,
+            ),
+            "version": [slot.version for slot in self._slots],
+        }, columns=COLUMNS)
+        tmp_path = f"{self.path}.tmp"
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, self.path)
+        self.journal.truncate()
+        self._mtime = os.stat(self.path).st_mtime_ns
+        self._journal_offset = 0
+        self._journal_events = 0
+        logger.info(f'Compacted availability journal into {self.path}')
+
+    @property
+    def version(self) -> int:
+        """Counter that changes whenever the calendar does, including bookings by other processes.
+
+        Answers derived from the calendar can be cached under this version.
+        Before the calendar is first loaded it is 0, without loading it.
+        """
+        with self._lock:
+            if self._mtime is not None:
+                self._refresh()
+            return self._generation
+
+    def available_times_for_doctor(self, day: date, doctor_name: str) -> List[int]:
+        """Return the start minutes of a doctor's free slots on a day."""
+        with self._lock:
+            self._refresh()
+            return self._bitmap.free_minutes(day, doctor_name).tolist()
+
+    def available_times_by_doctor(self, day: date, specialization: str) -> Dict[str, List[int]]:
+        """Return the start minutes of the free slots of every doctor with the given specialization, by doctor name."""
+        with self._lock:
+            self._refresh()
+            return {
+                doctor_name: minutes.tolist()
+                for doctor_name, minutes in self._bitmap.free_minutes_by_doctor(day, specialization).items()
+            }
+
+    def available_doctors_at(
+        self, minute: int, days: List[date], specialization: Optional[str] = None
+    ) -> Dict[date, List[str]]:
+        """Return the doctors with a free slot starting at `minute` on each of the days, by date."""
+        with self._lock:
+            self._refresh()
+            return self._bitmap.doctors_free_at(minute, days, specialization)
+
+    def earliest_available(
+        self,
+        start_date: date,
+        end_date: Optional[date] = None,
+        limit: int = 5,
+        doctor_name: Optional[str] = None,
+        specialization: Optional[str] = None,
+    ) -> List[Tuple[datetime, str]]:
+        """Return the first free slots between two dates, both inclusive.
+
+        Returns:
+            Up to `limit` (slot start, doctor_name) pairs, earliest first
+        """
+        start = slot_start(start_date, 0)
+        end = None if end_date is None else slot_start(end_date + timedelta(days=1), 0)
+        with self._lock:
+            self._refresh()
+            return self._free_index.earliest(start, end, limit, doctor_name=doctor_name, specialization=specialization)
+
+    def get_slot(self, start: datetime, doctor_name: str) -> Optional[Slot]:
+        """Return a copy of the doctor's slot starting at `start`, if any."""
+        with self._lock:
+            self._refresh()
+            slot = self._find(start, doctor_name)
+            return None if slot is None else Slot(**vars(slot))
+
+    def book(
+        self, start: datetime, doctor_name: str, patient_to_attend: int, expected_version: Optional[int] = None
+    ) -> bool:
+        """Assign a free slot to a patient.
+
+        Args:
+            start: Start of the slot
+            doctor_name: Doctor whose calendar holds the slot
+            patient_to_attend: Identification number of the patient
+            expected_version: Version the caller last saw, to fail if the slot changed since
+
+        Returns:
+            False if the slot doesn't exist or isn't free
+
+        Raises:
+            SlotConflictError: If the slot no longer has the expected version
+        """
+        def mutation():
+            slot = self._find(start, doctor_name)
+            if slot is None or not slot.is_available:
+                if slot is not None and expected_version is not None and slot.version != expected_version:
+                    raise SlotConflictError(f'{doctor_name} at {start} was changed by another booking')
+                return False
+            self._stage(
+                {
+                    "op": "book",
+                    "slot_start": start.isoformat(),
+                    "doctor_name": doctor_name,
+                    "patient_to_attend": patient_to_attend,
+                },
+                {(start, doctor_name): slot.version if expected_version is None else expected_version},
+            )
+            return True
+
+        return self._writer.submit(mutation).result()
+
+    def cancel(
+        self, start: datetime, doctor_name: str, patient_to_attend: int, expected_version: Optional[int] = None
+    ) -> bool:
+        """Free a slot booked by the patient.
+
+        Returns:
+            False if the patient has no booking in that slot
+
+        Raises:
+            SlotConflictError: If the slot no longer has the expected version
+        """
+        def mutation():
+            slot = self._find(start, doctor_name)
+            if slot is None or slot.patient_to_attend != patient_to_attend:
+                return False
+            self._stage(
+                {
+                    "op": "cancel",
+                    "slot_start": start.isoformat(),
+                    "doctor_name": doctor_name,
+                },
+                {(start, doctor_name): slot.version if expected_version is None else expected_version},
+            )
+            return True
+
+        return self._writer.submit(mutation).result()
+
+    def book_many(self, bookings: List[Tuple[datetime, str, int]]) -> List[BatchBookingResult]:
+        """Book several slots all-or-nothing.
+
+        Args:
+            bookings: (slot start, doctor_name, patient_to_attend) of each booking
+
+        Returns:
+            Result of each booking, in order. Unless every booking is "booked",
+            nothing was written and the bookings that could have succeeded are
+            "skipped".
+
+        Raises:
+            SlotConflictError: If another writer changed one of the slots meanwhile
+        """
+        def mutation():
+            results: List[BatchBookingResult] = []
+            events = []
+            expected = {}
+            for start, doctor_name, patient_to_attend in bookings:
+                slot = self._find(start, doctor_name)
+                if slot is None or not slot.is_available:
+                    results.append("unavailable")
+                elif (start, doctor_name) in expected:
+                    results.append("duplicate")
+                else:
+                    results.append("booked")
+                    expected[(start, doctor_name)] = slot.version
+                    events.append({
+                        "op": "book",
+                        "slot_start": start.isoformat(),
+                        "doctor_name": doctor_name,
+                        "patient_to_attend": patient_to_attend,
+                    })
+
+            if len(events) < len(bookings):
+                return ["skipped" if result == "booked" else result for result in results]
+            if events:
+                self._stage({"op": "batch", "events": events}, expected)
+            return results
+
+        return self._writer.submit(mutation).result()
+
+    def reschedule(
+        self,
+        old_start: datetime,
+        new_start: datetime,
+        doctor_name: str,
+        patient_to_attend: int,
+        expected_version: Optional[int] = None,
+    ) -> RescheduleResult:
+        """Move a patient's booking to another slot of the same doctor in one step.
+
+        Both slots are checked and updated under a single journal entry, so a
+        crash or a concurrent booking can never leave the patient with both or
+        neither of the slots.
+
+        Args:
+            expected_version: Version of the booked slot the caller last saw, to fail if it changed since
+
+        Raises:
+            SlotConflictError: If another writer changed either slot meanwhile
+        """
+        def mutation():
+            new_slot = self._find(new_start, doctor_name)
+            if new_slot is None or not new_slot.is_available:
+                return "unavailable"
+            old_slot = self._find(old_start, doctor_name)
+            if old_slot is None or old_slot.patient_to_attend != patient_to_attend:
+                return "not_booked"
+            self._stage(
+                {
+                    "op": "reschedule",
+                    "old_slot_start": old_start.isoformat(),
+                    "new_slot_start": new_start.isoformat(),
+                    "doctor_name": doctor_name,
+                    "patient_to_attend": patient_to_attend,
+                },
+                {
+                    (old_start, doctor_name): old_slot.version if expected_version is None else expected_version,
+                    (new_start, doctor_name): new_slot.version,
+                },
+            )
+            return "rescheduled"
+
+        return self._writer.submit(mutation).result()
+
+
+def commit_across(
+    stores: List[AvailabilityStore],
+    check: Callable[[], Tuple[Any, List[Tuple[AvailabilityStore, dict, Dict[Tuple[datetime, str], int]]]]],
+) -> Any:
+    """Check and write a change spanning several stores as one.
+
+    Every store's process and file locks are taken, in the order given, before
+    `check` runs, so no writer in any process can change the slots between the
+    check and the write, and no reader in this process sees part of the
+    change. Callers must pass the stores in a consistent order (e.g. by month)
+    so that concurrent changes can't deadlock.
+
+    Args:
+        stores: Stores the change may touch
+        check: Called with the stores locked and up to date; returns the
+            result, and the (store, event, expected versions) to journal
+
+    Returns:
+        The result of `check`
+
+    Raises:
+        SlotConflictError: If a slot changed since `check` read it
+    """
+    with ExitStack() as stack:
+        for store in stores:
+            stack.enter_context(store._write_lock())
+        result, staged = check()
+
+        offsets = [store._journal_offset for store in stores]
+        try:
+            for store, event, expected in staged:
+                store._stage(event, expected)
+            for store in stores:
+                store._append_pending()
+        except Exception:
+            # Cut back the journals already written, so the change is dropped everywhere
+            for store, offset in zip(stores, offsets):
+                store._discard_appended(offset)
+            raise
+        for store in stores:
+            store._compact_if_due()
+        return result
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def set_availability_store(store) -> None:
+    """Serve the appointment tools from the given store from now on."""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def get_availability_store():
+    """
+    Get the process-wide availability store, creating it on first use
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                settings = get_settings()
+                if settings.AVAILABILITY_BACKEND == "database":
+                    from sqlalchemy import create_engine
+                    from salonist.appointment.availability.database import DatabaseAvailabilityStore
+                    _store = DatabaseAvailabilityStore(create_engine(settings.SQLALCHEMY_DATABASE_URI))
+                elif settings.AVAILABILITY_BACKEND == "partitioned":
+                    from salonist.appointment.availability.partitioned import PartitionedAvailabilityStore
+                    _store = PartitionedAvailabilityStore(
+                        settings.AVAILABILITY_DIR, compact_every=settings.AVAILABILITY_COMPACT_EVERY
+                    )
+                else:
+                    _store = AvailabilityStore(
+                        settings.AVAILABILITY_FILE,
+                        journal_path=settings.AVAILABILITY_JOURNAL_FILE,
+                        compact_every=settings.AVAILABILITY_COMPACT_EVERY,
+                    )
+    return _store
@@ -0,0 +1,82 @@
+"""Typed slot values: calendar dates and minutes past midnight.
+
+The calendar file stores slots as 'DD-MM-YYYY H.MM' strings. They are parsed
+once when loaded and only turned back into text when an answer or a snapshot
+is written.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+DATE_SLOT_FORMAT = "%d-%m-%Y %H.%M"
+MINUTES_PER_DAY = 24 * 60
+
+# Renderings of every minute of the day, so formatting is an array lookup
+_CLOCK = np.array([f"{minute // 60}.{minute % 60:02d}" for minute in range(MINUTES_PER_DAY)])
+_AM_PM = np.array([
+    f"{(minute // 60) % 12 or 12}:{minute % 60:02d} {'AM' if minute < 12 * 60 else 'PM'}"
+    for minute in range(MINUTES_PER_DAY)
+])
+
+
+def parse_date(value: str) -> date:
+    """Parse a 'DD-MM-YYYY' date."""
+    return datetime.strptime(value, "%d-%m-%Y").date()
+
+
+def parse_datetime(value: str) -> datetime:
+    """Parse a 'YYYY-MM-DD HH:MM' date and time."""
+    return datetime.strptime(value, "%Y-%m-%d %H:%M")
+
+
+def parse_date_slot(value: str) -> datetime:
+    """Parse a 'DD-MM-YYYY H.MM' calendar slot."""
+    return datetime.strptime(value, DATE_SLOT_FORMAT)
+
+
+def parse_date_slots(values: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """Parse a column of 'DD-MM-YYYY H.MM' calendar slots.
+
+    Returns:
+        Tuple of (date column, minute-of-day column)
+    """
+    starts = pd.to_datetime(values, format=DATE_SLOT_FORMAT)
+    return starts.dt.date, starts.dt.hour * 60 + starts.dt.minute
+
+
+def minute_of_day(value: datetime) -> int:
+    """Return the minutes past midnight of a datetime."""
+    return value.hour * 60 + value.minute
+
+
+def slot_start(day: date, minute: int) -> datetime:
+    """Return the datetime a slot on `day` starting at `minute` begins."""
+    return datetime.combine(day, time()) + timedelta(minutes=int(minute))
+
+
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """Return the [start, end) datetimes of a day."""
+    start = datetime.combine(day, time())
+    return start, start + timedelta(days=1)
+
+
+def format_date(day: date) -> str:
+    """Format a date as 'DD-MM-YYYY'."""
+    return day.strftime("%d-%m-%Y")
+
+
+def format_clock(minutes: Iterable[int]) -> List[str]:
+    """Format minutes of day the way the calendar does, e.g. '8.30'."""
+    return _CLOCK[np.asarray(minutes, dtype=int)].tolist()
+
+
+def format_am_pm(minutes: Iterable[int]) -> List[str]:
+    """Format minutes of day as 12-hour times, e.g. '8:30 AM'."""
+    return _AM_PM[np.asarray(minutes, dtype=int)].tolist()
+
+
+def format_date_slots(days: pd.Series, minutes: pd.Series) -> pd.Series:
+    """Format date and minute-of-day columns as 'DD-MM-YYYY H.MM' calendar slots."""
+    return pd.to_datetime(days).dt.strftime("%d-%m-%Y") + " " + _CLOCK[minutes.to_numpy(dtype=int)]
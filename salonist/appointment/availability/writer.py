@@ -0,0 +1,74 @@
+"""Group-commit writer that batches booking mutations."""
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Mutation = Callable[[], Any]
+
+
+class GroupCommitWriter:
+    """Single writer thread committing queued mutations in batches.
+
+    Callers `submit` a mutation and wait on the returned future. The writer
+    thread takes every mutation queued so far (up to `max_batch`) and hands
+    them to `commit` together, so mutations arriving while a batch is being
+    written share the next lock acquisition and fsync instead of paying for
+    their own.
+
+    `commit` receives the batch and returns one outcome per mutation, in
+    order: the mutation's result, or the exception it raised.
+    """
+
+    def __init__(self, commit: Callable[[List[Mutation]], List[Any]], max_batch: int = 64, name: str = "writer"):
+        self.commit = commit
+        self.max_batch = max_batch
+        self.name = name
+        self._queue: "queue.Queue[Tuple[Mutation, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def submit(self, mutation: Mutation) -> Future:
+        """Queue a mutation for the next batch."""
+        future: Future = Future()
+        self._ensure_running()
+        self._queue.put((mutation, future))
+        return future
+
+    def _ensure_running(self) -> None:
+        # A writer created before a fork (e.g. gunicorn --preload) has no thread in the child
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                outcomes = self.commit([mutation for mutation, _ in batch])
+            except Exception as e:
+                logger.exception(f'Committing a batch of {len(batch)} mutations failed')
+                outcomes = [e] * len(batch)
+
+            for (_, future), outcome in zip(batch, outcomes):
+                if isinstance(outcome, Exception):
+                    future.set_exception(outcome)
+                else:
+                    future.set_result(outcome)
@@ -1,22 +1,121 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Optional
+
 from .state import State
-from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from salonist.config import get_settings
+from salonist.history import with_summary
+from salonist.metrics import record_assistant_attempts
+
+
+@dataclass
+class RetryPolicy:
+    """How often and for how long an assistant re-asks a model that returned nothing.
+
+    Attempt n waits `backoff * 2 ** (n - 2)` seconds (capped at `max_backoff`)
+    before it starts. No attempt starts once `deadline` seconds have passed
+    since the first one, or when the wait would pass it; an attempt already
+    running is not interrupted.
+    """
+
+    max_attempts: int = 3
+    backoff: float = 0.5
+    max_backoff: float = 4.0
+    deadline: float = 60.0
+    fallback_message: str = "Sorry, I couldn't come up with an answer. Could you rephrase your request?"
+
+    @classmethod
+    def from_settings(cls) -> "RetryPolicy":
+        settings = get_settings()
+        return cls(
+            max_attempts=settings.ASSISTANT_MAX_ATTEMPTS,
+            backoff=settings.ASSISTANT_RETRY_BACKOFF_SECONDS,
+            max_backoff=settings.ASSISTANT_RETRY_MAX_BACKOFF_SECONDS,
+            deadline=settings.ASSISTANT_DEADLINE_SECONDS,
+            fallback_message=settings.ASSISTANT_FALLBACK_MESSAGE,
+        )
+
+    def delay(self, attempt: int) -> float:
+        return min(self.backoff * 2 ** (attempt - 2), self.max_backoff)
+
+
+def _record(name: str, attempts: int, fell_back: bool) -> None:
+    record_assistant_attempts(name, attempts, fell_back)
+    if attempts > 1 or fell_back:
+        logging.warning(f'{name} returned an empty response; {"gave up" if fell_back else "answered"} after {attempts} attempts')
 
 
 class Assistant:
-    def __init__(self, runnable: Runnable):
+    def __init__(self, runnable: Runnable, name: str = "assistant", policy: Optional[RetryPolicy] = None):
         self.runnable = runnable
+        self.name = name
+        self.policy = policy or RetryPolicy.from_settings()
+
+    @staticmethod
+    def _is_empty(result) -> bool:
+        return not result.tool_calls and (
+                not result.content
+                or isinstance(result.content, list)
+                and not result.content[0].get("text")
+        )
+
+    @staticmethod
+    def _ask_for_real_output(state: State) -> State:
+        messages = state["messages"] + [("user", "Respond with a real output.")]
+        return {**state, "messages": messages}
+
+    def _next_delay(self, attempt: int, started: float) -> Optional[float]:
+        """Wait before attempt `attempt + 1`, or None when the policy allows no more attempts."""
+        if attempt >= self.policy.max_attempts:
+            return None
+        delay = self.policy.delay(attempt + 1)
+        if time.monotonic() - started + delay >= self.policy.deadline:
+            return None
+        return delay
+
+    def _finish(self, result, attempt: int) -> dict:
+        fell_back = self._is_empty(result)
+        _record(self.name, attempt, fell_back)
+        if fell_back:
+            result = AIMessage(content=self.policy.fallback_message)
+        return {"messages": result}
+
+    @staticmethod
+    def _model_input(state: State) -> State:
+        return {**state, "messages": with_summary(state["messages"], state.get("summary"))}
 
     def __call__(self, state: State, config: RunnableConfig):
+        state = self._model_input(state)
+        started = time.monotonic()
+        attempt = 0
         while True:
+            attempt += 1
             result = self.runnable.invoke(state)
 
-            if not result.tool_calls and (
-                    not result.content
-                    or isinstance(result.content, list)
-                    and not result.content[0].get("text")
-            ):
-                messages = state["messages"] + [("user", "Respond with a real output.")]
-                state = {**state, "messages": messages}
-            else:
-                break
-        return {"messages": result}
+            delay = self._next_delay(attempt, started) if self._is_empty(result) else None
+            if delay is None:
+                return self._finish(result, attempt)
+            state = self._ask_for_real_output(state)
+            time.sleep(delay)
+
+    async def acall(self, state: State, config: RunnableConfig):
+        state = self._model_input(state)
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            result = await self.runnable.ainvoke(state)
+
+            delay = self._next_delay(attempt, started) if self._is_empty(result) else None
+            if delay is None:
+                return self._finish(result, attempt)
+            state = self._ask_for_real_output(state)
+            await asyncio.sleep(delay)
+
+    def as_node(self) -> Runnable:
+        """Graph node running `__call__` under invoke and `acall` under ainvoke, so async runs don't block a thread."""
+        return RunnableLambda(self.__call__, afunc=self.acall, name=self.name)
@@ -1,20 +1,26 @@
+import asyncio
+import importlib
 import logging
+import os
+import threading
 
-from typing import Tuple
+from typing import AsyncIterator, Iterator, Optional, Tuple
 from langgraph.graph import StateGraph
 from langchain_core.messages import HumanMessage
 from langgraph.graph import START, END
-from langchain_anthropic import ChatAnthropic
 
+from salonist.streaming import STREAM_MODES, Event, graph_events
 from .state import State
 from .base import Assistant
 from .agents import get_runnable
-from .prompts import info_agent_prompt, booking_agent_prompt, primary_agent_prompt
+from . import prompts
 from .tools.tools import (set_appointment,
+                         set_group_appointment,
                          reschedule_appointment,
                          cancel_appointment,
                          check_availability_by_specialization,
-                         check_availability_by_doctor
+                         check_availability_by_doctor,
+                         find_earliest_availability
                          )
 from .models.agents import ToAppointmentBookingAssistant, ToGetInfo, ToPrimaryBookingAssistant, CompleteOrEscalate
 from .utils.helper import (
@@ -23,9 +29,20 @@ from .utils.helper import (
     RouteUpdater,
     route_to_workflow,
     route_primary_assistant,
-    create_entry_node
+    create_entry_node,
+    fast_route,
+    route_fast_path
 )
+from salonist.config import get_settings
+from salonist.history import HistoryManager
+from salonist.metrics import instrument
+from salonist.tracing import TracedCheckpointSaver
+from salonist.prompt_cache import prompt_cache_usage
+from salonist.providers import get_chat_model
+from langchain_core.runnables import RunnableLambda
 from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+import aiosqlite
 import sqlite3
 
 conn = sqlite3.connect('checkpoints.db', check_same_thread=False)
@@ -38,33 +55,48 @@ memory = SqliteSaver(conn)
 # os.environ["LANGCHAIN_API_KEY"] = Azure_Creds.LANGCHAIN_API_KEY
 # os.environ["LANGCHAIN_PROJECT"] = Azure_Creds.LANGCHAIN_PROJECT
 
-llm = ChatAnthropic(model_name="claude-3-5-sonnet-20240620")  # type: ignore
-info_tools = [check_availability_by_specialization, check_availability_by_doctor]
-info_runnable = get_runnable(
-    llm=llm,
-    tools=info_tools + [CompleteOrEscalate],
-    agent_prompt=info_agent_prompt
-)
+llm = get_chat_model("claude-3-5-sonnet-20240620", callbacks=[prompt_cache_usage])
+info_tools = [check_availability_by_specialization, check_availability_by_doctor, find_earliest_availability]
+booking_tools = [set_appointment, set_group_appointment, reschedule_appointment, cancel_appointment]
+primary_tools = [ToAppointmentBookingAssistant, ToGetInfo, ToPrimaryBookingAssistant, CompleteOrEscalate]
 
-booking_tools = [set_appointment, reschedule_appointment, cancel_appointment]
-booking_runnable = get_runnable(
-    llm=llm,
-    tools=booking_tools + [CompleteOrEscalate],
-    agent_prompt=booking_agent_prompt
-)
+_graph = None
+_graph_lock = threading.Lock()
+# Reload stamp the graph was built at (see `request_rebuild`)
+_graph_stamp = None
+# The async graph checkpoints through aiosqlite, bound to the event loop that first asked for it
+_async_memory = None
+_async_graph = None
+_async_graph_stamp = None
+# Created by the first async caller, inside its event loop rather than at import
+_async_graph_lock = None
 
-primary_tools = [ToAppointmentBookingAssistant, ToGetInfo, ToPrimaryBookingAssistant, CompleteOrEscalate]
-primary_runnable = get_runnable(
-    llm=llm,
-    tools=primary_tools,
-    agent_prompt=primary_agent_prompt
-)
 
+def build_graph(checkpointer=memory):
+    info_runnable = get_runnable(
+        llm=llm,
+        tools=info_tools + [CompleteOrEscalate],
+        agent_prompt=prompts.info_agent_prompt
+    )
+    booking_runnable = get_runnable(
+        llm=llm,
+        tools=booking_tools + [CompleteOrEscalate],
+        agent_prompt=prompts.booking_agent_prompt
+    )
+    primary_runnable = get_runnable(
+        llm=llm,
+        tools=primary_tools,
+        agent_prompt=prompts.primary_agent_prompt
+    )
 
-def build_graph():
+    settings = get_settings()
     builder = StateGraph(State)
 
-    builder.add_node("primary_assistant", Assistant(primary_runnable))
+    history = HistoryManager(llm, settings.HISTORY_KEEP_TURNS, settings.HISTORY_TOKEN_BUDGET,
+                             settings.HISTORY_SLACK_TURNS)
+    builder.add_node("manage_history", RunnableLambda(history, afunc=history.acall))
+
+    builder.add_node("primary_assistant", Assistant(primary_runnable, "primary_assistant").as_node())
 
     builder.add_node(
         "enter_get_info",
@@ -75,8 +107,8 @@ def build_graph():
         create_entry_node("Appointment Assistant", "appointment_info"),
     )
 
-    builder.add_node("get_info", Assistant(info_runnable))
-    builder.add_node("appointment_info", Assistant(booking_runnable))
+    builder.add_node("get_info", Assistant(info_runnable, "get_info").as_node())
+    builder.add_node("appointment_info", Assistant(booking_runnable, "appointment_info").as_node())
 
     builder.add_node(
         "update_info_tools",
@@ -90,7 +122,23 @@ def build_graph():
 
     builder.add_node("leave_skill", pop_dialog_state)
 
-    builder.add_conditional_edges(START, route_to_workflow)
+    if settings.FAST_ROUTER_ENABLED:
+        # Clear-cut opening turns skip the primary assistant's LLM call
+        builder.add_node("fast_router", fast_route)
+        builder.add_conditional_edges(
+            "fast_router",
+            route_fast_path,
+            ["primary_assistant", "enter_appointment_info", "enter_get_info"],
+        )
+        entry = "fast_router"
+    else:
+        entry = "primary_assistant"
+    builder.add_edge(START, "manage_history")
+    builder.add_conditional_edges(
+        "manage_history",
+        route_to_workflow,
+        {"primary_assistant": entry, "appointment_info": "appointment_info", "get_info": "get_info"},
+    )
 
     builder.add_conditional_edges(
         "primary_assistant",
@@ -104,10 +152,15 @@ def build_graph():
 
     builder.add_edge("enter_get_info", "get_info")
 
-    builder.add_edge("update_info_tools", "get_info")
+    info_router = RouteUpdater(info_tools, "update_info_tools", "get_info")
+    builder.add_conditional_edges(
+        "update_info_tools",
+        info_router.route_after_tools,
+        ["get_info", "leave_skill"],
+    )
     builder.add_conditional_edges(
         "get_info",
-        RouteUpdater(info_tools, "update_info_tools").route_update_info,
+        info_router.route_update_info,
         ["update_info_tools", "leave_skill", END],
     )
 
@@ -115,31 +168,154 @@ def build_graph():
 
     builder.add_edge("enter_appointment_info", "appointment_info")
 
-    builder.add_edge("update_appointment_tools", "appointment_info")
+    booking_router = RouteUpdater(booking_tools, "update_appointment_tools", "appointment_info")
+    builder.add_conditional_edges(
+        "update_appointment_tools",
+        booking_router.route_after_tools,
+        ["appointment_info", "leave_skill"],
+    )
     builder.add_conditional_edges(
         "appointment_info",
-        RouteUpdater(booking_tools, "update_appointment_tools").route_update_info,
+        booking_router.route_update_info,
         ["update_appointment_tools", "leave_skill", END],
     )
 
     # memory = MemorySaver()
     graph = builder.compile(
-        checkpointer=memory,
+        checkpointer=TracedCheckpointSaver(checkpointer),
     )
 
+    return instrument(graph, "appointment")
+
+
+def _get_async_graph_lock() -> asyncio.Lock:
+    global _async_graph_lock
+    if _async_graph_lock is None:
+        _async_graph_lock = asyncio.Lock()
+    return _async_graph_lock
+
+
+def _reload_stamp() -> Optional[float]:
+    try:
+        return os.path.getmtime(get_settings().GRAPH_RELOAD_FILE)
+    except OSError:
+        return None
+
+
+def _rebuild(checkpointer):
+    importlib.reload(prompts)
+    graph = build_graph(checkpointer)
+    logging.info('Rebuilt the appointment graph')
     return graph
 
-def run_workflow(query: str, thread_id: int) -> Tuple[str, str]:
+
+def get_graph():
+    """
+    Get the process-wide compiled graph, building it on first use and
+    rebuilding it after `request_rebuild`
+    """
+    global _graph, _graph_stamp
+    stamp = _reload_stamp()
+    if _graph is None or stamp != _graph_stamp:
+        with _graph_lock:
+            if _graph is None:
+                _graph = build_graph()
+            elif stamp != _graph_stamp:
+                _graph = _rebuild(memory)
+            _graph_stamp = stamp
+    return _graph
+
+
+async def aget_graph():
+    """
+    Get the process-wide compiled graph for async runs, building it on first
+    use and rebuilding it after `request_rebuild`
+    """
+    global _async_graph, _async_memory, _async_graph_stamp
+    stamp = _reload_stamp()
+    if _async_graph is None or stamp != _async_graph_stamp:
+        async with _get_async_graph_lock():
+            if _async_graph is None:
+                _async_memory = AsyncSqliteSaver(await aiosqlite.connect('checkpoints.db'))
+                _async_graph = build_graph(_async_memory)
+            elif stamp != _async_graph_stamp:
+                _async_graph = _rebuild(_async_memory)
+            _async_graph_stamp = stamp
+    return _async_graph
+
+
+async def aclose_graph():
+    """
+    Close the async graph's checkpoint connection; its worker thread keeps the process alive until then
+    """
+    global _async_graph, _async_memory
+    async with _get_async_graph_lock():
+        if _async_memory is not None:
+            await _async_memory.conn.close()
+        _async_graph = None
+        _async_memory = None
+
+
+def request_rebuild():
+    """
+    Check that the current prompts compile into a graph, then touch the
+    reload stamp so that every server process re-reads the prompts and
+    rebuilds its graph on its next request. Requests already running finish
+    on the graph they started with.
+    """
+    importlib.reload(prompts)
+    build_graph()
+    path = get_settings().GRAPH_RELOAD_FILE
+    with open(path, 'a'):
+        os.utime(path)
+
+
+def _workflow_input(query: str, thread_id: str) -> Tuple[dict, dict]:
     logging.info(f'Received the Query - {query} & thread_id - {thread_id}')
     inputs = [
         HumanMessage(content=query)
     ]
     state = {'messages': inputs}
     config = {"configurable": {"thread_id": thread_id, "recursion_limit": 10}}
-    response = build_graph().invoke(input=state, config=config)
+    return state, config
+
 
+def _workflow_output(response: dict) -> Tuple[str, str]:
     logging.info('Generated Answer from Graph')
     dialog_states = response['dialog_state']
     dialog_state = dialog_states[-1] if dialog_states else 'primary_assistant'
     messages = response['messages'][-1].content
-    return str(messages), dialog_state
\ No newline at end of file
+    return str(messages), dialog_state
+
+
+def run_workflow(query: str, thread_id: str) -> Tuple[str, str]:
+    state, config = _workflow_input(query, thread_id)
+    return _workflow_output(get_graph().invoke(input=state, config=config))
+
+
+async def arun_workflow(query: str, thread_id: str) -> Tuple[str, str]:
+    state, config = _workflow_input(query, thread_id)
+    graph = await aget_graph()
+    return _workflow_output(await graph.ainvoke(input=state, config=config))
+
+
+def stream_workflow(query: str, thread_id: str) -> Iterator[Event]:
+    """
+    Run the graph, yielding tokens and assistant hand-offs as they happen and the answer last
+    """
+    state, config = _workflow_input(query, thread_id)
+    graph = get_graph()
+    for mode, chunk in graph.stream(input=state, config=config, stream_mode=STREAM_MODES):
+        yield from graph_events(mode, chunk)
+    message, dialog_state = _workflow_output(graph.get_state(config).values)
+    yield "done", {'response': message, 'thread_id': thread_id, 'dialog_state': dialog_state}
+
+
+async def astream_workflow(query: str, thread_id: str) -> AsyncIterator[Event]:
+    state, config = _workflow_input(query, thread_id)
+    graph = await aget_graph()
+    async for mode, chunk in graph.astream(input=state, config=config, stream_mode=STREAM_MODES):
+        for event in graph_events(mode, chunk):
+            yield event
+    message, dialog_state = _workflow_output((await graph.aget_state(config)).values)
+    yield "done", {'response': message, 'thread_id': thread_id, 'dialog_state': dialog_state}
@@ -1,5 +1,6 @@
 
 from pydantic import BaseModel, Field, validator
+from typing import Literal
 import re
 
 
@@ -33,10 +34,23 @@ class IdentificationNumberModel(BaseModel):
     """
     The way the ID should be structured and formatted
     """
-    id: int = Field(..., description="identification number without dots", pattern=r'^\d{7,8}$')
+    # Pydantic can't apply `pattern=` to an int, so the pattern is published in the
+    # tool schema and enforced by the validator below
+    id: int = Field(..., description="identification number without dots", json_schema_extra={"pattern": r'^\d{7,8}$'})
 
     @validator("id")
     def check_format_id(cls, v):
         if not re.match(r'^\d{7,8}$', str(v)):
             raise ValueError("The ID number should be a number of 7 or 8 numbers")
-        return v
\ No newline at end of file
+        return v
+
+
+class GroupAppointmentModel(BaseModel):
+    """
+    One appointment of a group booking
+    """
+    desired_date: DateTimeModel = Field(..., description="The desired date and time of the appointment")
+    id_number: IdentificationNumberModel = Field(..., description="The id number of the patient")
+    doctor_name: Literal[
+        'kevin anderson', 'robert martinez', 'susan davis', 'daniel miller', 'sarah wilson', 'michael green', 'lisa brown', 'jane smith', 'emily johnson', 'john doe'] = Field(
+        ..., description="The name of the doctor")
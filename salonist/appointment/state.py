@@ -22,4 +22,6 @@ class State(TypedDict):
             ]
         ],
         update_dialog_stack,
-    ]
\ No newline at end of file
+    ]
+    # Running summary of the turns dropped from `messages`
+    summary: str
\ No newline at end of file
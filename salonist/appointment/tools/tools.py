@@ -1,80 +1,136 @@
-from salonist.appointment.models.tools import DateModel, DateTimeModel, IdentificationNumberModel
-from typing import Literal
-from langchain_core.tools import tool
-import pandas as pd
-from datetime import datetime
-
+from salonist.appointment.models.tools import DateModel, DateTimeModel, IdentificationNumberModel, GroupAppointmentModel
+from typing import List, Literal, Optional
+from salonist.appointment.availability import SlotConflictError, get_availability_store
+from salonist.appointment.availability.timeslots import (
+    format_am_pm, format_clock, format_date, minute_of_day, parse_date, parse_datetime
+)
+from salonist.config import get_settings
+from langchain_core.tools import StructuredTool
+from functools import lru_cache, wraps
+import asyncio
+
+
+def memoize_by_store_version(render):
+    """
+    Cache rendered answers keyed by their arguments and the availability store version.
+    Every booking changes the version, so a cached answer is never served for a calendar that has since changed.
+    Stores without a version (the database backend) are rendered on every call.
+    """
+    cached = lru_cache(maxsize=get_settings().AVAILABILITY_ANSWER_CACHE_SIZE)(
+        lambda store, version, *args: render(store, *args)
+    )
 
-def convert_datetime_format(dt_str):
-    # Parse the input datetime string
-    dt = datetime.strptime(dt_str, "%Y-%m-%d %H:%M")
+    @wraps(render)
+    def wrapper(*args):
+        store = get_availability_store()
+        version = store.version
+        if version is None:
+            return render(store, *args)
+        return cached(store, version, *args)
 
-    # Format the output as 'DD-MM-YYYY H.M' (removing leading zero from hour only)
-    return dt.strftime("%d-%m-%Y %#H.%M")
+    wrapper.cache_info = cached.cache_info
+    wrapper.cache_clear = cached.cache_clear
+    return wrapper
 
 
-@tool
-def check_availability_by_doctor(desired_date: DateModel, doctor_name: Literal[
-    'kevin anderson', 'robert martinez', 'susan davis', 'daniel miller', 'sarah wilson', 'michael green', 'lisa brown', 'jane smith', 'emily johnson', 'john doe']):
+def blocking_tool(func):
     """
-    Checking the database if we have availability for the specific doctor.
-    The parameters should be mentioned by the user in the query
+    `@tool` for a function that blocks on the availability store (file or database I/O and its locks).
+    Its async version runs the function in a worker thread, so async graph runs keep the event loop free.
     """
-    # Dummy data
-    df = pd.read_csv(f"availability.csv")
-    df['date_slot_time'] = df['date_slot'].apply(lambda input: input.split(' ')[-1])
-    rows = list(df[(df['date_slot'].apply(lambda input: input.split(' ')[0]) == desired_date.date) & (
-                df['doctor_name'] == doctor_name) & (df['is_available'] == True)]['date_slot_time'])
+    @wraps(func)
+    async def coroutine(*args, **kwargs):
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    return StructuredTool.from_function(func=func, coroutine=coroutine)
+
+
+@memoize_by_store_version
+def render_availability_by_doctor(store, date: str, doctor_name: str) -> str:
+    rows = store.available_times_for_doctor(parse_date(date), doctor_name)
 
     if len(rows) == 0:
         output = "No availability in the entire day"
     else:
-        output = f'This availability for {desired_date.date}\n'
-        output += "Available slots: " + ', '.join(rows)
+        output = f'This availability for {date}\n'
+        output += "Available slots: " + ', '.join(format_clock(rows))
 
     return output
 
 
-@tool
-def check_availability_by_specialization(desired_date: DateModel, specialization: Literal[
-    "general_dentist", "cosmetic_dentist", "prosthodontist", "pediatric_dentist", "emergency_dentist", "oral_surgeon", "orthodontist"]):
-    """
-    Checking the database if we have availability for the specific specialization.
-    The parameters should be mentioned by the user in the query
-    """
-    # Dummy data
-    df = pd.read_csv(f"availability.csv")
-    df['date_slot_time'] = df['date_slot'].apply(lambda input: input.split(' ')[-1])
-    rows = df[(df['date_slot'].apply(lambda input: input.split(' ')[0]) == desired_date.date) & (
-                df['specialization'] == specialization) & (df['is_available'] == True)].groupby(
-        ['specialization', 'doctor_name'])['date_slot_time'].apply(list).reset_index(name='available_slots')
+@memoize_by_store_version
+def render_availability_by_specialization(store, date: str, specialization: str) -> str:
+    rows = store.available_times_by_doctor(parse_date(date), specialization)
 
     if len(rows) == 0:
         output = "No availability in the entire day"
     else:
-        def convert_to_am_pm(time_str):
-            # Split the time string into hours and minutes
-            time_str = str(time_str)
-            hours, minutes = map(int, time_str.split("."))
+        output = f'This availability for {date}\n'
+        for doctor_name, available_slots in rows.items():
+            output += doctor_name + ". Available slots: \n" + ', \n'.join(format_am_pm(available_slots)) + '\n'
 
-            # Determine AM or PM
-            period = "AM" if hours < 12 else "PM"
+    return output
 
-            # Convert hours to 12-hour format
-            hours = hours % 12 or 12
 
-            # Format the output
-            return f"{hours}:{minutes:02d} {period}"
+@memoize_by_store_version
+def render_earliest_availability(store, start_date: str, end_date: Optional[str], doctor_name: Optional[str],
+                                 specialization: Optional[str], limit: int) -> str:
+    rows = store.earliest_available(
+        parse_date(start_date),
+        parse_date(end_date) if end_date else None,
+        limit,
+        doctor_name=doctor_name,
+        specialization=specialization,
+    )
 
-        output = f'This availability for {desired_date.date}\n'
-        for row in rows.values:
-            output += row[1] + ". Available slots: \n" + ', \n'.join(
-                [convert_to_am_pm(value) for value in row[2]]) + '\n'
+    if len(rows) == 0:
+        output = "No availability in the requested period"
+    else:
+        output = "Earliest available slots:\n"
+        for start, slot_doctor_name in rows:
+            output += f"{format_date(start)} {format_am_pm([minute_of_day(start)])[0]} with {slot_doctor_name}\n"
 
     return output
 
 
-@tool
+@blocking_tool
+def check_availability_by_doctor(desired_date: DateModel, doctor_name: Literal[
+    'kevin anderson', 'robert martinez', 'susan davis', 'daniel miller', 'sarah wilson', 'michael green', 'lisa brown', 'jane smith', 'emily johnson', 'john doe']):
+    """
+    Checking the database if we have availability for the specific doctor.
+    The parameters should be mentioned by the user in the query
+    """
+    return render_availability_by_doctor(desired_date.date, doctor_name)
+
+
+@blocking_tool
+def check_availability_by_specialization(desired_date: DateModel, specialization: Literal[
+    "general_dentist", "cosmetic_dentist", "prosthodontist", "pediatric_dentist", "emergency_dentist", "oral_surgeon", "orthodontist"]):
+    """
+    Checking the database if we have availability for the specific specialization.
+    The parameters should be mentioned by the user in the query
+    """
+    return render_availability_by_specialization(desired_date.date, specialization)
+
+
+@blocking_tool
+def find_earliest_availability(start_date: DateModel, end_date: Optional[DateModel] = None,
+                               doctor_name: Optional[Literal[
+                                   'kevin anderson', 'robert martinez', 'susan davis', 'daniel miller', 'sarah wilson', 'michael green', 'lisa brown', 'jane smith', 'emily johnson', 'john doe']] = None,
+                               specialization: Optional[Literal[
+                                   "general_dentist", "cosmetic_dentist", "prosthodontist", "pediatric_dentist", "emergency_dentist", "oral_surgeon", "orthodontist"]] = None,
+                               limit: int = 5):
+    """
+    Finding the earliest available slots from a date onwards, optionally up to an end date.
+    Use it when the user wants the first, soonest or next available appointment instead of checking day by day.
+    Filter by doctor_name or specialization when the user mentions them.
+    """
+    return render_earliest_availability(
+        start_date.date, end_date.date if end_date else None, doctor_name, specialization, limit
+    )
+
+
+@blocking_tool
 def reschedule_appointment(old_date: DateTimeModel, new_date: DateTimeModel, id_number: IdentificationNumberModel,
                            doctor_name: Literal[
                                'kevin anderson', 'robert martinez', 'susan davis', 'daniel miller', 'sarah wilson', 'michael green', 'lisa brown', 'jane smith', 'emily johnson', 'john doe']):
@@ -82,55 +138,81 @@ def reschedule_appointment(old_date: DateTimeModel, new_date: DateTimeModel, id_
     Rescheduling an appointment.
     The parameters MUST be mentioned by the user in the query.
     """
-    df = pd.read_csv(f'availability.csv')
-    available_for_desired_date = df[
-        (df['date_slot'] == convert_datetime_format(new_date.date)) & (df['is_available'] == True) & (
-                    df['doctor_name'] == doctor_name)]
-    if len(available_for_desired_date) == 0:
+    try:
+        result = get_availability_store().reschedule(
+            parse_datetime(old_date.date), parse_datetime(new_date.date), doctor_name, id_number.id
+        )
+    except SlotConflictError:
+        return "The slot was just changed by another booking, please try again"
+
+    if result == "unavailable":
         return "Not available slots in the desired period"
+    elif result == "not_booked":
+        return "You don´t have any appointment with that specifications"
     else:
-        cancel_appointment.invoke({'date': old_date, 'id_number': id_number, 'doctor_name': doctor_name})
-        set_appointment.invoke({'desired_date': new_date, 'id_number': id_number, 'doctor_name': doctor_name})
         return "Succesfully rescheduled for the desired time"
 
 
-@tool
+@blocking_tool
 def cancel_appointment(date: DateTimeModel, id_number: IdentificationNumberModel, doctor_name: Literal[
     'kevin anderson', 'robert martinez', 'susan davis', 'daniel miller', 'sarah wilson', 'michael green', 'lisa brown', 'jane smith', 'emily johnson', 'john doe']):
     """
     Canceling an appointment.
     The parameters MUST be mentioned by the user in the query.
     """
-    df = pd.read_csv(f'availability.csv')
-    case_to_remove = df[
-        (df['date_slot'] == convert_datetime_format(date.date)) & (df['patient_to_attend'] == id_number.id) & (
-                    df['doctor_name'] == doctor_name)]
-    if len(case_to_remove) == 0:
+    try:
+        cancelled = get_availability_store().cancel(parse_datetime(date.date), doctor_name, id_number.id)
+    except SlotConflictError:
+        return "The slot was just changed by another booking, please try again"
+
+    if not cancelled:
         return "You don´t have any appointment with that specifications"
     else:
-        df.loc[(df['date_slot'] == convert_datetime_format(date.date)) & (df['patient_to_attend'] == id_number.id) & (
-                    df['doctor_name'] == doctor_name), ['is_available', 'patient_to_attend']] = [True, None]
-        df.to_csv(f'availability.csv', index=False)
-
         return "Succesfully cancelled"
 
 
-@tool
+@blocking_tool
 def set_appointment(desired_date: DateTimeModel, id_number: IdentificationNumberModel, doctor_name: Literal[
     'kevin anderson', 'robert martinez', 'susan davis', 'daniel miller', 'sarah wilson', 'michael green', 'lisa brown', 'jane smith', 'emily johnson', 'john doe']):
     """
     Set appointment or slot with the doctor.
     The parameters MUST be mentioned by the user in the query.
     """
-    df = pd.read_csv(f'availability.csv')
+    try:
+        booked = get_availability_store().book(parse_datetime(desired_date.date), doctor_name, id_number.id)
+    except SlotConflictError:
+        return "The slot was just changed by another booking, please try again"
 
-    case = df[(df['date_slot'] == convert_datetime_format(desired_date.date)) & (df['doctor_name'] == doctor_name) & (
-                df['is_available'] == True)]
-    if len(case) == 0:
+    if not booked:
         return "No available appointments for that particular case"
     else:
-        df.loc[(df['date_slot'] == convert_datetime_format(desired_date.date)) & (df['doctor_name'] == doctor_name) & (
-                    df['is_available'] == True), ['is_available', 'patient_to_attend']] = [False, id_number.id]
-        df.to_csv(f'availability.csv', index=False)
+        return "Succesfully done"
 
-        return "Succesfully done"
\ No newline at end of file
+
+@blocking_tool
+def set_group_appointment(appointments: List[GroupAppointmentModel]):
+    """
+    Set several appointments at once, e.g. for a family or a group of patients.
+    Either all of the appointments are booked or none of them is.
+    The parameters MUST be mentioned by the user in the query.
+    """
+    try:
+        results = get_availability_store().book_many([
+            (parse_datetime(appointment.desired_date.date), appointment.doctor_name, appointment.id_number.id)
+            for appointment in appointments
+        ])
+    except SlotConflictError:
+        return "One of the slots was just changed by another booking, please try again"
+
+    messages = {
+        "booked": "Succesfully done",
+        "unavailable": "No available appointments for that particular case",
+        "duplicate": "The same slot is requested twice",
+        "skipped": "Not booked because other appointments of the group failed",
+    }
+    output = "" if all(result == "booked" for result in results) else "None of the appointments were booked.\n"
+    for appointment, result in zip(appointments, results):
+        output += (f"{appointment.desired_date.date} with {appointment.doctor_name} "
+                   f"for {appointment.id_number.id}: {messages[result]}\n")
+
+    return output
@@ -1,32 +1,63 @@
 from salonist.appointment.state import State
-from salonist.appointment.models.agents import CompleteOrEscalate,ToAppointmentBookingAssistant
+from salonist.appointment.models.agents import CompleteOrEscalate, ToAppointmentBookingAssistant, ToGetInfo
+from salonist.appointment.utils.intent import classify_intent, format_booking_date, format_info_date
 from langgraph.prebuilt import tools_condition, ToolNode
 from langgraph.graph import END
-from langchain_core.messages import ToolMessage
-from langchain_core.runnables import RunnableLambda
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from pydantic import ValidationError
 from typing import Callable, Literal
+import logging
+import uuid
+
+def last_tool_calls(state: State) -> list:
+    """Tool calls of the latest AI message, even when its ToolMessages already follow it."""
+    for message in reversed(state["messages"]):
+        if isinstance(message, AIMessage):
+            return message.tool_calls
+    return []
+
+
+def did_escalate(tool_calls: list) -> bool:
+    return any(tc["name"] == CompleteOrEscalate.__name__ for tc in tool_calls)
+
 
 class RouteUpdater:
-    def __init__(self, tools,update_tool):
+    def __init__(self, tools, update_tool, assistant):
         self.tools = tools
         self.update_tool = update_tool
+        self.assistant = assistant
 
     def route_update_info(self, state: State):
         route = tools_condition(state)
         if route == END:
             return END
         tool_calls = state["messages"][-1].tool_calls
-        did_cancel = any(tc["name"] == CompleteOrEscalate.__name__ for tc in tool_calls)
-        if did_cancel:
+        # Run the batch's other calls first; route_after_tools then leaves the skill
+        if all(tc["name"] == CompleteOrEscalate.__name__ for tc in tool_calls):
             return "leave_skill"
-        safe_toolnames = [t.name for t in self.tools]
-        if all(tc["name"] in safe_toolnames for tc in tool_calls):
-            return self.update_tool
+        return self.update_tool
+
+    def route_after_tools(self, state: State):
+        """Back to the assistant with the tool results, or to the host if the batch also escalated."""
+        if did_escalate(last_tool_calls(state)):
+            return "leave_skill"
+        return self.assistant
 
 
 def create_entry_node(assistant_name: str, new_dialog_state: str) -> Callable:
     def entry_node(state: State) -> dict:
-        tool_call_id = state["messages"][-1].tool_calls[0]["id"]
+        tool_calls = state["messages"][-1].tool_calls
+        tool_call_id = tool_calls[0]["id"]
+        # Every tool call needs an answer; only the first transfer is acted on
+        deferred = [
+            ToolMessage(
+                content="Not started: only one assistant can take over at a time."
+                " Handle this request after the current one is complete.",
+                tool_call_id=tc["id"],
+            )
+            for tc in tool_calls[1:]
+        ]
         return {
             "messages": [
                 ToolMessage(
@@ -37,7 +68,7 @@ def create_entry_node(assistant_name: str, new_dialog_state: str) -> Callable:
                     f" Do not mention who you are - just act as the proxy for the assistant.",
                     tool_call_id=tool_call_id,
                 )
-            ],
+            ] + deferred,
             "dialog_state": new_dialog_state,
         }
 
@@ -58,11 +89,30 @@ def handle_tool_error(state) -> dict:
     }
 
 
-def create_tool_node_with_fallback(tools: list) -> dict:
-    return ToolNode(tools).with_fallbacks(
+def create_tool_node_with_fallback(tools: list) -> Runnable:
+    """Node running every tool call of the last AI message except `CompleteOrEscalate`.
+
+    ToolNode runs the calls concurrently (a thread pool under invoke, asyncio
+    under ainvoke) and answers each with a ToolMessage, including calls to
+    unknown tools. `CompleteOrEscalate` calls are left to `pop_dialog_state`.
+    """
+    tool_node = ToolNode(tools).with_fallbacks(
         [RunnableLambda(handle_tool_error)], exception_key="error"
     )
 
+    def tool_input(state: State) -> State:
+        message = state["messages"][-1]
+        tool_calls = [tc for tc in message.tool_calls if tc["name"] != CompleteOrEscalate.__name__]
+        return {**state, "messages": [message.model_copy(update={"tool_calls": tool_calls})]}
+
+    def run_tools(state: State, config: RunnableConfig) -> dict:
+        return tool_node.invoke(tool_input(state), config)
+
+    async def arun_tools(state: State, config: RunnableConfig) -> dict:
+        return await tool_node.ainvoke(tool_input(state), config)
+
+    return RunnableLambda(run_tools, afunc=arun_tools, name="tools")
+
 
 def pop_dialog_state(state: State) -> dict:
     """Pop the dialog stack and return to the main assistant.
@@ -70,15 +120,20 @@ def pop_dialog_state(state: State) -> dict:
     This lets the full graph explicitly track the dialog flow and delegate control
     to specific sub-graphs.
     """
-    messages = []
-    if state["messages"][-1].tool_calls:
-        # Note: Doesn't currently handle the edge case where the llm performs parallel tool calls
-        messages.append(
-            ToolMessage(
-                content="Resuming dialog with the host assistant. Please reflect on the past conversation and assist the user as needed.",
-                tool_call_id=state["messages"][-1].tool_calls[0]["id"],
-            )
+    # Answer the calls the tool node left open: CompleteOrEscalate, and every call if it didn't run
+    answered = set()
+    for message in reversed(state["messages"]):
+        if not isinstance(message, ToolMessage):
+            break
+        answered.add(message.tool_call_id)
+    messages = [
+        ToolMessage(
+            content="Resuming dialog with the host assistant. Please reflect on the past conversation and assist the user as needed.",
+            tool_call_id=tc["id"],
         )
+        for tc in last_tool_calls(state)
+        if tc["id"] not in answered
+    ]
     return {
         "dialog_state": "pop",
         "messages": messages,
@@ -109,4 +164,56 @@ def route_primary_assistant(
             return "enter_appointment_info"
         else:
             return "enter_get_info"
-    raise ValueError("Invalid route")
\ No newline at end of file
+    raise ValueError("Invalid route")
+
+
+def fast_route(state: State) -> dict:
+    """Route a clear-cut opening turn without asking the primary assistant's LLM.
+
+    When the rule-based classifier is confident and found every argument the
+    transfer tool requires, this adds the tool call the primary assistant
+    would have made, so the entry nodes and the conversation history look the
+    same either way. Otherwise it changes nothing.
+    """
+    message = state["messages"][-1]
+    if not isinstance(message, HumanMessage) or not isinstance(message.content, str):
+        return {}
+    intent = classify_intent(message.content)
+    if intent is None:
+        return {}
+
+    if intent.route == "appointment_info":
+        schema = ToAppointmentBookingAssistant
+        date = format_booking_date(intent)
+        args = {
+            "date": {"date": date} if date else None,
+            "identification_number": {"id": intent.identification_number} if intent.identification_number else None,
+            "doctor_number": intent.doctor_name,
+        }
+    else:
+        schema = ToGetInfo
+        date = format_info_date(intent)
+        args = {
+            "desired_date": {"date": date} if date else None,
+            "specialization": intent.specialization,
+            "doctor_name": intent.doctor_name,
+        }
+    args = {key: value for key, value in args.items() if value is not None}
+    args["request"] = message.content
+    try:
+        schema.model_validate(args)
+    except ValidationError:
+        # A transfer missing required arguments is left to the LLM, which can ask for them
+        return {}
+
+    logging.info(f'Fast-routed the query to {intent.route}')
+    tool_call = {"name": schema.__name__, "args": args, "id": f"toolu_{uuid.uuid4().hex}"}
+    return {"messages": [AIMessage(content="", tool_calls=[tool_call])]}
+
+
+def route_fast_path(state: State):
+    """Continue to the chosen assistant if `fast_route` decided, else ask the primary assistant."""
+    message = state["messages"][-1]
+    if isinstance(message, AIMessage) and message.tool_calls:
+        return route_primary_assistant(state)
+    return "primary_assistant"
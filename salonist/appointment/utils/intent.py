@@ -0,0 +1,155 @@
+"""Deterministic intent pre-classifier for the appointment graph.
+
+Most opening turns are plainly availability questions or booking changes,
+and the primary assistant's LLM call only picks between `ToGetInfo` and
+`ToAppointmentBookingAssistant` for them. `classify_intent` recognises
+those turns with keyword rules and extracts the date, doctor,
+specialization and id it can find; anything it is unsure about is left to
+the LLM. Only dates that spell out their year are extracted: the LLM
+knows which year a bare "May 5th" means, the rules don't.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional, get_args
+
+from salonist.appointment.models.tools import GroupAppointmentModel
+
+DOCTOR_NAMES = get_args(GroupAppointmentModel.model_fields["doctor_name"].annotation)
+
+SPECIALIZATIONS = {
+    "general_dentist": r"general dentist(ry)?|general_dentist|check-?up|cleaning",
+    "cosmetic_dentist": r"cosmetic( dentist(ry)?)?|cosmetic_dentist|whitening|veneers?",
+    "prosthodontist": r"prosthodontist|prosthodontics|dentures?|crowns?|bridges?",
+    "pediatric_dentist": r"pa?ediatric( dentist(ry)?)?|pediatric_dentist|children|kids?|child",
+    "emergency_dentist": r"emergency( dentist)?|emergency_dentist|toothache|urgent",
+    "oral_surgeon": r"oral surg(eon|ery)|oral_surgeon|extraction|wisdom teeth|implants?",
+    "orthodontist": r"orthodontist|orthodontics|braces|aligners?|invisalign",
+}
+
+BOOKING_PATTERN = re.compile(
+    r"\b(book|booking|schedule|set up|make an? appointment|reserve|reschedul\w*|cancel\w*|move my|change my appointment)\b"
+)
+INFO_PATTERN = re.compile(
+    r"\b(availab\w*|free|open slots?|slots?|earliest|soonest|next opening|any openings?|when can i see)\b"
+)
+
+MONTHS = {
+    name: number
+    for number, names in enumerate(
+        [("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"), ("may",), ("jun", "june"),
+         ("jul", "july"), ("aug", "august"), ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"),
+         ("dec", "december")],
+        start=1,
+    )
+    for name in names
+}
+_MONTH = "|".join(sorted(MONTHS, key=len, reverse=True))
+DATE_PATTERNS = [
+    (re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b"), ("year", "month", "day")),
+    (re.compile(r"\b(\d{1,2})[-/](\d{1,2})[-/](\d{4})\b"), ("day", "month", "year")),
+    (re.compile(rf"\b(\d{{1,2}})(?:st|nd|rd|th)?(?: of)? ({_MONTH})\.?,? (\d{{4}})\b"), ("day", "month_name", "year")),
+    (re.compile(rf"\b({_MONTH})\.? (\d{{1,2}})(?:st|nd|rd|th)?,? (\d{{4}})\b"), ("month_name", "day", "year")),
+]
+TIME_PATTERN = re.compile(r"\b(?:at )?(\d{1,2})(?:[:.](\d{2}))? ?(am|pm)\b|\bat (\d{1,2})[:.](\d{2})\b")
+ID_PATTERN = re.compile(r"\b\d{7,8}\b")
+
+
+@dataclass
+class Intent:
+    """A confidently classified turn and the details found in it."""
+
+    route: str  # "get_info" or "appointment_info"
+    date: Optional[date] = None
+    time: Optional[str] = None  # HH:MM
+    doctor_name: Optional[str] = None
+    specialization: Optional[str] = None
+    identification_number: Optional[int] = None
+
+
+def extract_date(text: str) -> Optional[date]:
+    for pattern, fields in DATE_PATTERNS:
+        match = pattern.search(text)
+        if not match:
+            continue
+        parts = dict(zip(fields, match.groups()))
+        month = MONTHS[parts["month_name"]] if "month_name" in parts else int(parts["month"])
+        try:
+            return date(int(parts["year"]), month, int(parts["day"]))
+        except ValueError:
+            continue
+    return None
+
+
+def extract_time(text: str) -> Optional[str]:
+    match = TIME_PATTERN.search(text)
+    if not match:
+        return None
+    if match.group(4):
+        hour, minute = int(match.group(4)), int(match.group(5))
+    else:
+        hour, minute = int(match.group(1)), int(match.group(2) or 0)
+        if match.group(3) == "pm" and hour < 12:
+            hour += 12
+        elif match.group(3) == "am" and hour == 12:
+            hour = 0
+    if hour > 23 or minute > 59:
+        return None
+    return f"{hour:02d}:{minute:02d}"
+
+
+def extract_doctor(text: str) -> Optional[str]:
+    for name in DOCTOR_NAMES:
+        if name in text:
+            return name
+    # A surname alone is enough when only one doctor has it
+    matches = [name for name in DOCTOR_NAMES if re.search(rf"\b{name.split()[-1]}\b", text)]
+    return matches[0] if len(matches) == 1 else None
+
+
+def extract_specialization(text: str) -> Optional[str]:
+    matches = [name for name, pattern in SPECIALIZATIONS.items() if re.search(rf"\b({pattern})\b", text)]
+    return matches[0] if len(matches) == 1 else None
+
+
+def classify_intent(query: str) -> Optional[Intent]:
+    """Classify an opening turn, or return None when the LLM router should decide.
+
+    A turn is routed only when exactly one of the booking and availability
+    keyword groups matches and it names something to act on: a date, a
+    doctor or a specialization (or an id number, for booking changes).
+    """
+    text = query.lower()
+    wants_booking = bool(BOOKING_PATTERN.search(text))
+    wants_info = bool(INFO_PATTERN.search(text))
+    if wants_booking == wants_info:
+        return None
+
+    id_match = ID_PATTERN.search(text)
+    intent = Intent(
+        route="appointment_info" if wants_booking else "get_info",
+        date=extract_date(text),
+        time=extract_time(text),
+        doctor_name=extract_doctor(text),
+        specialization=extract_specialization(text),
+        identification_number=int(id_match.group()) if id_match else None,
+    )
+
+    details = [intent.date, intent.doctor_name, intent.specialization]
+    if wants_booking:
+        details.append(intent.identification_number)
+    if not any(details):
+        return None
+    return intent
+
+
+def format_info_date(intent: Intent) -> Optional[str]:
+    """The intent's date as `DateModel` expects it (DD-MM-YYYY)."""
+    return intent.date.strftime("%d-%m-%Y") if intent.date else None
+
+
+def format_booking_date(intent: Intent) -> Optional[str]:
+    """The intent's date and time as `DateTimeModel` expects them (YYYY-MM-DD HH:MM)."""
+    if intent.date is None or intent.time is None:
+        return None
+    return f"{intent.date.isoformat()} {intent.time}"
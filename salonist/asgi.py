@@ -0,0 +1,160 @@
+"""ASGI application serving the LLM-backed endpoints asynchronously.
+
+The search, booking and multi-agent endpoints are async views that await
+the LLM with `ainvoke`, so a waiting conversation holds no thread. Every
+other route (the API docs included) is served by the Flask app, mounted
+as WSGI.
+"""
+import uuid
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+from salonist.app import create_app
+from salonist.appointment.builder import aclose_graph, arun_workflow, astream_workflow
+from salonist.booking import get_booking_workflow
+from salonist.langgraph.workflow import get_search_workflow
+from salonist.streaming import SSE_HEADERS, asse
+from salonist.tracing import TRACE_FILE_HEADER, finish_trace, start_trace, wants_trace
+
+
+class TraceMiddleware:
+    """Trace the requests of an async route that ask for it, streamed responses until their stream ends."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        request = Request(scope)
+        if not wants_trace(request.headers, request.query_params):
+            await self.app(scope, receive, send)
+            return
+
+        trace, token = start_trace(f"{request.method} {request.url.path}")
+
+        async def send_with_trace_header(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", [])) + [(TRACE_FILE_HEADER.lower().encode(), trace.path.encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace_header)
+        finally:
+            finish_trace(trace, token)
+
+
+async def search(request: Request) -> JSONResponse:
+    """Search for information using the AI agent."""
+    try:
+        data = await request.json()
+        query = data['query']
+        workflow = get_search_workflow()
+        response, processing_time = await workflow.arun(query)
+        sources = await workflow.async_tavily_client.search(query, max_results=5)
+
+        return JSONResponse({
+            'query': query,
+            'response': response,
+            'metadata': {
+                'processing_time': round(processing_time, 2),
+                'sources_used': len(sources.get("results", [])),
+                'confidence_score': 0.85
+            }
+        })
+    except Exception as e:
+        return JSONResponse({'message': str(e)}, status_code=500)
+
+
+async def booking(request: Request) -> JSONResponse:
+    """Process a booking query and return the AI response."""
+    try:
+        data = await request.json()
+        query = data.get('query')
+
+        if not query:
+            return JSONResponse({'error': 'Query is required'}, status_code=400)
+
+        thread_id = data.get('thread_id') or str(uuid.uuid4())
+        response, processing_time = await get_booking_workflow().arun(query, thread_id)
+
+        return JSONResponse({
+            'response': response,
+            'thread_id': thread_id,
+            'metadata': {
+                'processing_time': processing_time
+            }
+        })
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def multi_agent(request: Request) -> JSONResponse:
+    """Process a multi-agent query and return the AI response."""
+    try:
+        data = await request.json()
+        query = data.get('query')
+
+        if not query:
+            return JSONResponse({'error': 'Query is required'}, status_code=400)
+
+        thread_id = data.get('thread_id') or str(uuid.uuid4())
+        message, dialog_state = await arun_workflow(query, thread_id)
+
+        return JSONResponse({
+            'response': message,
+            'thread_id': thread_id,
+            'dialog_state': dialog_state
+        })
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def booking_stream(request: Request):
+    """Process a booking query, streaming tokens and node transitions as they happen."""
+    data = await request.json()
+    query = data.get('query')
+
+    if not query:
+        return JSONResponse({'error': 'Query is required'}, status_code=400)
+
+    thread_id = data.get('thread_id') or str(uuid.uuid4())
+    events = get_booking_workflow().astream(query, thread_id)
+    return StreamingResponse(asse(events), media_type='text/event-stream', headers=SSE_HEADERS)
+
+
+async def multi_agent_stream(request: Request):
+    """Process a multi-agent query, streaming tokens and assistant hand-offs as they happen."""
+    data = await request.json()
+    query = data.get('query')
+
+    if not query:
+        return JSONResponse({'error': 'Query is required'}, status_code=400)
+
+    thread_id = data.get('thread_id') or str(uuid.uuid4())
+    events = astream_workflow(query, thread_id)
+    return StreamingResponse(asse(events), media_type='text/event-stream', headers=SSE_HEADERS)
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    yield
+    await aclose_graph()
+
+
+def create_asgi_app(config_class=None) -> Starlette:
+    flask_app = create_app(config_class)
+    traced = [Middleware(TraceMiddleware)]
+    return Starlette(lifespan=lifespan, routes=[
+        Route('/api/search/search', search, methods=['POST'], middleware=traced),
+        Route('/api/booking', booking, methods=['POST'], middleware=traced),
+        Route('/api/multi-agent', multi_agent, methods=['POST'], middleware=traced),
+        Route('/api/booking/stream', booking_stream, methods=['POST'], middleware=traced),
+        Route('/api/multi-agent/stream', multi_agent_stream, methods=['POST'], middleware=traced),
+        Mount('/', app=WSGIMiddleware(flask_app)),
+    ])
@@ -1,4 +1,4 @@
 from salonist.booking.state import State
-from salonist.booking.workflow import BookingWorkflow
+from salonist.booking.workflow import BookingWorkflow, get_booking_workflow
 
-__all__ = ['State', 'BookingWorkflow'] 
\ No newline at end of file
+__all__ = ['State', 'BookingWorkflow', 'get_booking_workflow'] 
\ No newline at end of file
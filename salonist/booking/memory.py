@@ -0,0 +1,37 @@
+"""Conversation memory of the booking workflow."""
+import threading
+from collections import OrderedDict
+
+from langgraph.checkpoint.memory import MemorySaver
+
+
+class BoundedMemorySaver(MemorySaver):
+    """In-memory checkpointer keeping only the `max_threads` most recently updated conversations.
+
+    The booking endpoint starts a new conversation for every request without
+    a thread id, so an unbounded saver would grow for the life of the process.
+    """
+
+    def __init__(self, max_threads: int):
+        super().__init__()
+        self.max_threads = max_threads
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        self._recent_lock = threading.Lock()
+
+    def _delete(self, thread_id: str) -> None:
+        self.storage.pop(thread_id, None)
+        for key in [key for key in list(self.writes) if key[0] == thread_id]:
+            self.writes.pop(key, None)
+        for key in [key for key in list(self.blobs) if key[0] == thread_id]:
+            self.blobs.pop(key, None)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        result = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        with self._recent_lock:
+            self._recent[thread_id] = None
+            self._recent.move_to_end(thread_id)
+            evicted = [self._recent.popitem(last=False)[0] for _ in range(len(self._recent) - self.max_threads)]
+        for old_thread_id in evicted:
+            self._delete(old_thread_id)
+        return result
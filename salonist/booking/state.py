@@ -6,6 +6,8 @@ from langgraph.graph.message import add_messages
 class State(BaseModel):
     """State for the booking workflow."""
     messages: Annotated[List[BaseMessage], add_messages] = Field(default_factory=list)
+    # Running summary of the turns dropped from `messages`
+    summary: str = ""
 
     class Config:
         arbitrary_types_allowed = True 
\ No newline at end of file
@@ -1,3 +1,4 @@
+import asyncio
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from langchain.tools import BaseTool
@@ -97,9 +98,9 @@ class AvailabilityTool(BaseTool):
         
         return f"Available slots for {date_str}: {', '.join(slots)}"
     
-    def _arun(self, query: str) -> str:
-        """Async version of _run."""
-        raise NotImplementedError("Async version not implemented")
+    async def _arun(self, query: str) -> str:
+        """Async version of _run, run in a worker thread so the event loop is never blocked."""
+        return await asyncio.to_thread(self._run, query)
 
 tool = AvailabilityTool()
 
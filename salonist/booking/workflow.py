@@ -1,28 +1,42 @@
-from typing import Any, Dict, Tuple
+from typing import Any, AsyncIterator, Dict, Iterator, Tuple
 from langgraph.graph import StateGraph, END
 from langgraph.graph.state import CompiledStateGraph
-from langchain_anthropic import ChatAnthropic
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.prompts.chat import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
 from langgraph.prebuilt import ToolNode, tools_condition
-from langgraph.checkpoint.memory import MemorySaver
 
+import threading
 import time
 
+from salonist.booking.memory import BoundedMemorySaver
 from salonist.booking.state import State
 from salonist.booking.tool import tool
 from salonist.booking.prompts import BOOKING_SYSTEM_PROMPT
+from salonist.streaming import STREAM_MODES, Event, graph_events
+from salonist.history import HistoryManager, with_summary
+from salonist.metrics import instrument
+from salonist.tracing import TracedCheckpointSaver
+from salonist.prompt_cache import cached_system_prompt, cached_tools, prompt_cache_usage, prompt_caching_enabled
+from salonist.providers import get_chat_model
+from salonist.config import get_settings
 
 class BookingWorkflow:
     """A class to manage the booking agent workflow."""
     
     def __init__(self):
         """Initialize the workflow with required clients."""
-        self.llm = ChatAnthropic(
-            model_name="claude-3-5-sonnet-20240620",
-        ) # type: ignore
+        self.llm = get_chat_model(
+            "claude-3-5-sonnet-20240620",
+            callbacks=[prompt_cache_usage],
+        )
         tools = [tool]
-        self.llm_with_tools = self.llm.bind_tools(tools)
-        self.memory = MemorySaver()
+        self.prompt_caching = prompt_caching_enabled()
+        self.llm_with_tools = self.llm.bind_tools(cached_tools(tools) if self.prompt_caching else tools)
+        # The system prompt is part of every model call rather than of the remembered conversation
+        system = cached_system_prompt(BOOKING_SYSTEM_PROMPT) if self.prompt_caching else ("system", BOOKING_SYSTEM_PROMPT)
+        self.runnable = ChatPromptTemplate.from_messages([system, ("placeholder", "{messages}")]) | self.llm_with_tools
+        self.memory = BoundedMemorySaver(get_settings().BOOKING_MAX_CONVERSATIONS)
         self.graph = self._create_graph()
 
     def chatbot(self, state: State) -> Dict[str, list]:
@@ -34,8 +48,17 @@ class BookingWorkflow:
         Returns:
             Dictionary with messages list
         """
-        response = self.llm_with_tools.invoke(state.messages)
+        response = self.runnable.invoke(self._model_input(state))
+        return {"messages": [response]}
+
+    async def achatbot(self, state: State) -> Dict[str, list]:
+        """Async version of `chatbot`, awaiting the LLM instead of blocking a thread."""
+        response = await self.runnable.ainvoke(self._model_input(state))
         return {"messages": [response]}
+
+    @staticmethod
+    def _model_input(state: State) -> Dict[str, list]:
+        return {"messages": with_summary(state.messages, state.summary)}
     
     def _create_graph(self) -> CompiledStateGraph:
         """Create and configure the workflow graph.
@@ -43,8 +66,13 @@ class BookingWorkflow:
         Returns:
             Configured and compiled workflow graph
         """
+        settings = get_settings()
+        history = HistoryManager(self.llm, settings.HISTORY_KEEP_TURNS, settings.HISTORY_TOKEN_BUDGET,
+                                 settings.HISTORY_SLACK_TURNS)
+
         graph_builder = StateGraph(State)
-        graph_builder.add_node("chatbot", self.chatbot)
+        graph_builder.add_node("manage_history", RunnableLambda(history, afunc=history.acall))
+        graph_builder.add_node("chatbot", RunnableLambda(self.chatbot, afunc=self.achatbot))
 
         tool_node = ToolNode(tools=[tool])
         graph_builder.add_node("tools", tool_node)
@@ -55,9 +83,10 @@ class BookingWorkflow:
         )
         # Any time a tool is called, we return to the chatbot to decide the next step
         graph_builder.add_edge("tools", "chatbot")
-        graph_builder.set_entry_point("chatbot")
+        graph_builder.set_entry_point("manage_history")
+        graph_builder.add_edge("manage_history", "chatbot")
         graph_builder.add_edge("chatbot", END)
-        return graph_builder.compile(checkpointer=self.memory)
+        return instrument(graph_builder.compile(checkpointer=TracedCheckpointSaver(self.memory)), "booking")
     
     def run(self, query: str, user_id: str) -> Tuple[str, float]:
         """Run the booking workflow with a given query.
@@ -70,18 +99,67 @@ class BookingWorkflow:
             Tuple of (response, processing_time)
         """
         start_time = time.time()
-        
-        # Create initial state with system prompt and user query
-        initial_state = {
-            "messages": [
-                SystemMessage(content=BOOKING_SYSTEM_PROMPT),
-                HumanMessage(content=query)
-            ]
-        }
-        
+        config = {"configurable": {"thread_id": user_id}}
+
         # Run the workflow with thread_id for memory management
-        result = self.graph.invoke(initial_state, {"configurable": {"thread_id": user_id}})
-        
+        result = self.graph.invoke(self._initial_state(query), config)
+        return self._response(result, start_time)
+
+    async def arun(self, query: str, user_id: str) -> Tuple[str, float]:
+        """Async version of `run`."""
+        start_time = time.time()
+        config = {"configurable": {"thread_id": user_id}}
+
+        result = await self.graph.ainvoke(self._initial_state(query), config)
+        return self._response(result, start_time)
+
+    def stream(self, query: str, user_id: str) -> Iterator[Event]:
+        """Run the booking workflow, yielding tokens and node transitions as they happen.
+
+        Args:
+            query: The user's query to process
+            user_id: Unique identifier for the user's session
+
+        Returns:
+            Iterator of (event, data) pairs, ending with a `done` event carrying the response
+        """
+        start_time = time.time()
+        config = {"configurable": {"thread_id": user_id}}
+
+        for mode, chunk in self.graph.stream(self._initial_state(query), config, stream_mode=STREAM_MODES):
+            yield from graph_events(mode, chunk)
+
+        response, processing_time = self._response(self.graph.get_state(config).values, start_time)
+        yield "done", self._done(response, user_id, processing_time)
+
+    async def astream(self, query: str, user_id: str) -> AsyncIterator[Event]:
+        """Async version of `stream`."""
+        start_time = time.time()
+        config = {"configurable": {"thread_id": user_id}}
+
+        async for mode, chunk in self.graph.astream(self._initial_state(query), config, stream_mode=STREAM_MODES):
+            for event in graph_events(mode, chunk):
+                yield event
+
+        response, processing_time = self._response((await self.graph.aget_state(config)).values, start_time)
+        yield "done", self._done(response, user_id, processing_time)
+
+    @staticmethod
+    def _done(response: str, user_id: str, processing_time: float) -> Dict[str, Any]:
+        return {
+            'response': response,
+            'thread_id': user_id,
+            'metadata': {
+                'processing_time': processing_time
+            }
+        }
+
+    @staticmethod
+    def _initial_state(query: str) -> Dict[str, list]:
+        return {"messages": [HumanMessage(content=query)]}
+
+    @staticmethod
+    def _response(result: Dict[str, Any], start_time: float) -> Tuple[str, float]:
         output = State(**result)
         
         # Get the last message from the dictionary result
@@ -91,4 +169,21 @@ class BookingWorkflow:
             raise ValueError("Expected AI message as final response")
             
         processing_time = time.time() - start_time
-        return str(last_message.content), processing_time 
\ No newline at end of file
+        return str(last_message.content), processing_time
+
+
+_workflow = None
+_workflow_lock = threading.Lock()
+
+
+def get_booking_workflow() -> BookingWorkflow:
+    """
+    Get the process-wide booking workflow, creating it on first use.
+    Its checkpointer keeps the memory of the BOOKING_MAX_CONVERSATIONS most recently active conversations.
+    """
+    global _workflow
+    if _workflow is None:
+        with _workflow_lock:
+            if _workflow is None:
+                _workflow = BookingWorkflow()
+    return _workflow
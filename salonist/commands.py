@@ -1,9 +1,15 @@
 import click
 from flask.cli import with_appcontext
 from .database import db
-from .models import Service, Package
-from .booking.workflow import BookingWorkflow
-from salonist.appointment.builder import build_graph
+from .models import Service, Package, AvailabilitySlot
+from .booking.workflow import get_booking_workflow
+from salonist.appointment.builder import get_graph, request_rebuild
+from salonist.appointment.availability import get_availability_store
+from salonist.appointment.availability.partitioned import PartitionedAvailabilityStore, split_into_partitions
+from salonist.appointment.availability.timeslots import DATE_SLOT_FORMAT
+from salonist.config import get_settings
+from salonist.llm_cache import get_llm_cache
+import pandas as pd
 import os
 
 @click.command('clean-db')
@@ -117,12 +123,116 @@ def list_services():
             for package in packages:
                 click.echo(f'  - {package.name} (₹{package.premium:.2f}, Duration: {service.duration} minutes)')
 
+@click.command('compact-availability')
+def compact_availability():
+    """Fold the booking journal into a new availability snapshot."""
+    if get_settings().AVAILABILITY_BACKEND == 'database':
+        click.echo('The database backend keeps no booking journal; there is nothing to compact.')
+        return
+    try:
+        store = get_availability_store()
+        store.compact()
+        click.echo(f'Successfully compacted the booking journal into {store.path}.')
+    except Exception as e:
+        click.echo(f'Error compacting availability: {str(e)}')
+
+@click.command('import-availability')
+@click.argument('path', required=False)
+@click.option('--batch-size', default=1000, show_default=True, help='Rows per bulk insert.')
+@with_appcontext
+def import_availability(path, batch_size):
+    """Replace the availability_slots table with the contents of a CSV calendar."""
+    path = path or get_settings().AVAILABILITY_FILE
+    try:
+        df = pd.read_csv(path)
+        slot_starts = pd.to_datetime(df['date_slot'], format=DATE_SLOT_FORMAT)
+        patients = df['patient_to_attend'].astype('Int64')
+        versions = df['version'] if 'version' in df.columns else [0] * len(df)
+        rows = [
+            {
+                'slot_start': slot_start.to_pydatetime(),
+                'specialization': specialization,
+                'doctor_name': doctor_name,
+                'is_available': bool(is_available),
+                'patient_to_attend': None if pd.isna(patient) else int(patient),
+                'version': int(version),
+            }
+            for slot_start, specialization, doctor_name, is_available, patient, version in zip(
+                slot_starts, df['specialization'], df['doctor_name'], df['is_available'], patients, versions
+            )
+        ]
+
+        db.session.execute(db.delete(AvailabilitySlot))
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(db.insert(AvailabilitySlot), rows[start:start + batch_size])
+        db.session.commit()
+        click.echo(f'Successfully imported {len(rows)} availability slots from {path}.')
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f'Error importing availability: {str(e)}')
+
+@click.command('partition-availability')
+@click.argument('path', required=False)
+@click.option('--directory', help='Partition directory, AVAILABILITY_DIR by default.')
+def partition_availability(path, directory):
+    """Split a CSV calendar into monthly partitions."""
+    settings = get_settings()
+    path = path or settings.AVAILABILITY_FILE
+    directory = directory or settings.AVAILABILITY_DIR
+    try:
+        months = split_into_partitions(path, directory)
+        click.echo(f'Successfully wrote {len(months)} monthly partitions of {path} to {directory}.')
+    except Exception as e:
+        click.echo(f'Error partitioning availability: {str(e)}')
+
+@click.command('archive-availability')
+@click.argument('before', type=click.DateTime(formats=['%Y-%m']))
+@click.option('--directory', help='Partition directory, AVAILABILITY_DIR by default.')
+def archive_availability(before, directory):
+    """Archive the monthly partitions before BEFORE (YYYY-MM)."""
+    settings = get_settings()
+    try:
+        store = PartitionedAvailabilityStore(
+            directory or settings.AVAILABILITY_DIR, compact_every=settings.AVAILABILITY_COMPACT_EVERY
+        )
+        months = store.archive(before.date())
+        if months:
+            click.echo(f'Successfully archived partitions {", ".join(months)}.')
+        else:
+            click.echo('No partitions to archive.')
+    except Exception as e:
+        click.echo(f'Error archiving availability: {str(e)}')
+
+@click.command('clear-llm-cache')
+@with_appcontext
+def clear_llm_cache():
+    """Remove all cached LLM responses."""
+    try:
+        cache = get_llm_cache()
+        if cache is None:
+            click.echo('The LLM cache is disabled.')
+            return
+        entries = cache.stats()['entries']
+        cache.clear()
+        click.echo(f'Successfully removed {entries} cached LLM responses.')
+    except Exception as e:
+        click.echo(f'Error clearing the LLM cache: {str(e)}')
+
+@click.command('rebuild-graph')
+def rebuild_graph():
+    """Re-read the appointment prompts and have running servers rebuild their graph."""
+    try:
+        request_rebuild()
+        click.echo('The prompts compile; servers will rebuild the appointment graph on their next request.')
+    except Exception as e:
+        click.echo(f'Error rebuilding the appointment graph: {str(e)}')
+
 @click.command('visualize-graph')
 def visualize_graph():
     """Visualize the booking workflow graph."""
     try:
         click.echo("Creating workflow instance...")
-        workflow = BookingWorkflow()
+        workflow = get_booking_workflow()
         graph = workflow.graph
         
         click.echo("Creating output directory...")
@@ -156,7 +266,7 @@ def visualize_agent():
 
         click.echo("Generating visualization...")
         # Get PNG bytes
-        graph =  build_graph()
+        graph = get_graph()
         png_bytes = graph.get_graph().draw_mermaid_png()
 
         # Save to file
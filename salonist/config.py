@@ -34,7 +34,61 @@ class Settings(BaseSettings):
     # Database
     SQLALCHEMY_DATABASE_URI: str = Field(default="sqlite:///salonist.db", description="Database connection URL")
     SQLALCHEMY_TRACK_MODIFICATIONS: bool = Field(default=False, description="Track modifications")
-    
+
+    # Provider Settings
+    LLM_PROVIDER: str = Field(default="anthropic", description="Chat model provider (anthropic/fake)")
+    SEARCH_PROVIDER: str = Field(default="tavily", description="Web search provider (tavily/fake)")
+    FAKE_SCRIPT_FILE: Optional[str] = Field(default=None, description="JSON script of the fake providers' answers; the built-in one when unset")
+    FAKE_LLM_LATENCY_DISTRIBUTION: str = Field(default="constant", description="Latency distribution of the fake chat model (constant/uniform/normal/lognormal)")
+    FAKE_LLM_LATENCY_SECONDS: float = Field(default=0.0, description="Mean (median for lognormal) latency of the fake chat model")
+    FAKE_LLM_LATENCY_SPREAD: float = Field(default=0.0, description="Spread of the fake chat model's latency (seconds; sigma of the log for lognormal)")
+    FAKE_SEARCH_LATENCY_DISTRIBUTION: str = Field(default="constant", description="Latency distribution of the fake search (constant/uniform/normal/lognormal)")
+    FAKE_SEARCH_LATENCY_SECONDS: float = Field(default=0.0, description="Mean (median for lognormal) latency of the fake search")
+    FAKE_SEARCH_LATENCY_SPREAD: float = Field(default=0.0, description="Spread of the fake search's latency (seconds; sigma of the log for lognormal)")
+    FAKE_SEED: Optional[int] = Field(default=None, description="Seed of the fake latencies, for repeatable runs")
+
+    # Appointment Settings
+    AVAILABILITY_BACKEND: str = Field(default="csv", description="Where the appointment calendar is kept (csv/partitioned/database)")
+    AVAILABILITY_FILE: str = Field(default="availability.csv", description="CSV file holding the appointment calendar")
+    AVAILABILITY_DIR: str = Field(default="availability", description="Directory of monthly calendar partitions and their manifest")
+    AVAILABILITY_JOURNAL_FILE: str = Field(default="availability.journal", description="Append-only journal of bookings applied on top of the calendar")
+    AVAILABILITY_COMPACT_EVERY: int = Field(default=1000, description="Number of journal entries after which the calendar snapshot is rewritten")
+    AVAILABILITY_ANSWER_CACHE_SIZE: int = Field(default=1024, description="Number of rendered availability answers kept in memory")
+
+    # Graph Settings
+    GRAPH_RELOAD_FILE: str = Field(default="graph.reload", description="File touched by `flask rebuild-graph`; servers rebuild the appointment graph when it changes")
+
+    # Routing Settings
+    FAST_ROUTER_ENABLED: bool = Field(default=True, description="Route clear-cut booking and availability requests without the primary assistant's LLM call")
+
+    # Assistant Retry Settings
+    ASSISTANT_MAX_ATTEMPTS: int = Field(default=3, description="LLM calls an assistant makes before giving up on empty responses")
+    ASSISTANT_RETRY_BACKOFF_SECONDS: float = Field(default=0.5, description="Wait before the first retry, doubled for each further one")
+    ASSISTANT_RETRY_MAX_BACKOFF_SECONDS: float = Field(default=4, description="Longest wait between two retries, however many came before")
+    ASSISTANT_DEADLINE_SECONDS: float = Field(default=60, description="Time after which an assistant starts no further retries")
+    ASSISTANT_FALLBACK_MESSAGE: str = Field(default="Sorry, I couldn't come up with an answer. Could you rephrase your request?", description="Reply used when an assistant runs out of retries")
+
+    # Conversation History Settings
+    HISTORY_KEEP_TURNS: int = Field(default=6, description="Most recent conversation turns sent to the model verbatim; older ones are summarized")
+    HISTORY_TOKEN_BUDGET: int = Field(default=8000, description="Approximate token budget of the verbatim history; older turns are summarized to stay within it")
+    HISTORY_SLACK_TURNS: int = Field(default=4, description="Extra turns the history may grow by before it is summarized back to HISTORY_KEEP_TURNS, so the summary is updated once every this many turns")
+    BOOKING_MAX_CONVERSATIONS: int = Field(default=1000, description="Booking conversations kept in memory; the least recently active ones are forgotten beyond it")
+
+    # Prompt Caching Settings
+    PROMPT_CACHING_ENABLED: bool = Field(default=False, description="Mark system prompts and tool schemas for Anthropic prompt caching")
+
+    # Request Tracing Settings
+    REQUEST_TRACING_ENABLED: bool = Field(default=False, description="Let /api requests ask for a Chrome trace with the X-Trace header or ?trace=1")
+    TRACE_TOKEN: Optional[str] = Field(default=None, description="When set, only requests whose X-Trace header carries this token are traced")
+    TRACE_DIR: str = Field(default="traces", description="Directory the Chrome traces of traced requests are written to")
+    TRACE_MAX_FILES: int = Field(default=100, description="Number of traces kept in TRACE_DIR; older ones are deleted")
+
+    # LLM Cache Settings
+    LLM_CACHE_ENABLED: bool = Field(default=True, description="Reuse stored responses for identical LLM calls; on by default, set to false to always call the model")
+    LLM_CACHE_FILE: str = Field(default="llm_cache.db", description="SQLite file holding cached LLM responses")
+    LLM_CACHE_MAX_ENTRIES: int = Field(default=10000, description="Number of cached responses kept; the least recently used are evicted")
+    LLM_CACHE_TTL_SECONDS: Optional[float] = Field(default=86400, description="Age after which a cached response expires (unset to keep until evicted)")
+
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,138 @@
+"""Bounded conversation history for the graphs.
+
+`HistoryManager` runs at the start of each turn. Once the history grows past
+`keep_turns + slack_turns` turns, or past `token_budget`, it drops all but
+the last `keep_turns` turns (and, to stay within `token_budget`, further old
+turns) from the graph state, and folds what it dropped into a running
+summary kept in the state's `summary` field. The slack means the summarizing
+LLM call runs once every `slack_turns` turns rather than on every turn.
+`with_summary` puts that summary back in front of the messages sent to the
+model.
+
+A turn starts at a user message and runs up to the next one, so an AI
+message's tool calls and their ToolMessages always stay or go together.
+"""
+import json
+import logging
+from typing import List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage, RemoveMessage, SystemMessage
+from langgraph.constants import TAG_NOSTREAM
+
+SUMMARY_PROMPT = """You maintain the memory of a conversation between a user and an appointment assistant.
+Update the summary below with the new messages. Keep every detail needed to continue the conversation:
+names, id numbers, doctors, specializations, dates and times, and which appointments were checked, booked,
+rescheduled or cancelled. Answer with the updated summary only.
+
+Summary so far:
+{summary}
+
+New messages:
+{messages}"""
+
+
+def estimate_tokens(messages: Sequence[BaseMessage]) -> int:
+    """Rough token count (about four characters per token) of messages and their tool calls."""
+    chars = 0
+    for message in messages:
+        content = message.content
+        chars += len(content) if isinstance(content, str) else len(json.dumps(content))
+        for tool_call in getattr(message, "tool_calls", None) or []:
+            chars += len(tool_call["name"]) + len(json.dumps(tool_call["args"]))
+    return chars // 4
+
+
+def split_turns(messages: Sequence[BaseMessage]) -> List[List[BaseMessage]]:
+    """Group messages into turns, each starting at a user message."""
+    turns: List[List[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def with_summary(messages: Sequence[BaseMessage], summary: Optional[str]) -> List[BaseMessage]:
+    """The messages to send to the model: the summary of dropped turns, after any system prompt."""
+    messages = list(messages)
+    if not summary:
+        return messages
+    start = 0
+    while start < len(messages) and isinstance(messages[start], SystemMessage):
+        start += 1
+    note = HumanMessage(content=f"Summary of the earlier conversation:\n{summary}")
+    return messages[:start] + [note] + messages[start:]
+
+
+class HistoryManager:
+    """Graph node trimming the history to the last turns plus a running summary.
+
+    The history may grow `slack_turns` turns past `keep_turns` before it is cut
+    back, so consecutive turns don't each pay for a summarizing call.
+    The summarizing call is tagged so that streamed runs don't show it to the user.
+    """
+
+    def __init__(self, llm, keep_turns: int, token_budget: int, slack_turns: int = 0):
+        self.llm = llm
+        self.keep_turns = max(keep_turns, 1)
+        self.token_budget = token_budget
+        self.slack_turns = slack_turns
+
+    def _dropped(self, messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+        """The messages of the turns that no longer fit; leading system prompts always stay."""
+        start = 0
+        while start < len(messages) and isinstance(messages[start], SystemMessage):
+            start += 1
+        turns = split_turns(messages[start:])
+
+        def tokens(kept: List[List[BaseMessage]]) -> int:
+            return estimate_tokens(list(messages[:start]) + [m for turn in kept for m in turn])
+
+        if len(turns) <= self.keep_turns + self.slack_turns and tokens(turns) <= self.token_budget:
+            return []
+        keep = turns[-self.keep_turns:]
+        # Stay within the budget, but always keep the turn being answered
+        while len(keep) > 1 and tokens(keep) > self.token_budget:
+            keep = keep[1:]
+        drop = turns[:len(turns) - len(keep)]
+        return [message for turn in drop for message in turn]
+
+    def _summary_messages(self, summary: Optional[str], dropped: Sequence[BaseMessage]) -> List[BaseMessage]:
+        lines = []
+        for message in dropped:
+            content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+            for tool_call in getattr(message, "tool_calls", None) or []:
+                content += f" [calls {tool_call['name']} with {json.dumps(tool_call['args'])}]"
+            lines.append(f"{message.type}: {content}")
+        prompt = SUMMARY_PROMPT.format(summary=summary or "(none)", messages="\n".join(lines))
+        return [HumanMessage(content=prompt)]
+
+    @staticmethod
+    def _update(dropped: Sequence[BaseMessage], summary: str) -> dict:
+        logging.info(f'Folded {len(dropped)} old messages into the conversation summary')
+        return {
+            "messages": [RemoveMessage(id=message.id) for message in dropped],
+            "summary": summary,
+        }
+
+    @staticmethod
+    def _state(state):
+        if isinstance(state, dict):
+            return state["messages"], state.get("summary")
+        return state.messages, state.summary
+
+    def __call__(self, state) -> dict:
+        messages, summary = self._state(state)
+        dropped = self._dropped(messages)
+        if not dropped:
+            return {}
+        response = self.llm.invoke(self._summary_messages(summary, dropped), config={"tags": [TAG_NOSTREAM]})
+        return self._update(dropped, str(response.content))
+
+    async def acall(self, state) -> dict:
+        messages, summary = self._state(state)
+        dropped = self._dropped(messages)
+        if not dropped:
+            return {}
+        response = await self.llm.ainvoke(self._summary_messages(summary, dropped), config={"tags": [TAG_NOSTREAM]})
+        return self._update(dropped, str(response.content))
@@ -1,12 +1,12 @@
 from typing import Dict, Union, Any, TypedDict
 from langgraph.graph import StateGraph, END
-from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import HumanMessage, AIMessage
-from tavily import TavilyClient
-from pydantic.v1 import SecretStr
+from langchain_core.runnables import RunnableLambda
+import threading
 import time
 
-from ..config import settings
+from ..metrics import instrument
+from ..providers import get_chat_model, get_search_client
 
 class WorkflowState(TypedDict):
     messages: list[Union[HumanMessage, AIMessage]]
@@ -23,10 +23,9 @@ class SearchWorkflow:
     
     def __init__(self):
         """Initialize the workflow with required clients."""
-        self.llm = ChatAnthropic(
-            model_name="claude-3-5-sonnet-20240620",
-        )
-        self.tavily_client = TavilyClient(api_key=settings.TAVILY_API_KEY)
+        self.llm = get_chat_model("claude-3-5-sonnet-20240620")
+        self.tavily_client = get_search_client()
+        self.async_tavily_client = get_search_client(asynchronous=True)
         self.graph = self._create_graph()
     
     def _search(self, state: WorkflowState) -> WorkflowState:
@@ -39,16 +38,26 @@ class SearchWorkflow:
             Updated state with search results
         """
         # Set a breakpoint here to inspect the state
-        last_message = str(state["messages"][-1].content)
-        
-        search_result = self.tavily_client.search(
-            query=last_message,
-            search_depth="advanced",
-            include_answer=True,
-            include_raw_content=True,
-            max_results=5
-        )
-        
+        search_result = self.tavily_client.search(**self._search_params(state))
+        return self._with_search_results(state, search_result)
+
+    async def _asearch(self, state: WorkflowState) -> WorkflowState:
+        """Async version of `_search`."""
+        search_result = await self.async_tavily_client.search(**self._search_params(state))
+        return self._with_search_results(state, search_result)
+
+    @staticmethod
+    def _search_params(state: WorkflowState) -> Dict[str, Any]:
+        return {
+            "query": str(state["messages"][-1].content),
+            "search_depth": "advanced",
+            "include_answer": True,
+            "include_raw_content": True,
+            "max_results": 5,
+        }
+
+    @staticmethod
+    def _with_search_results(state: WorkflowState, search_result: Dict[str, Any]) -> WorkflowState:
         state["search_results"] = search_result.get("results", [])
         state["current_step"] = "analyze"
         
@@ -63,6 +72,16 @@ class SearchWorkflow:
         Returns:
             Updated state with AI response
         """
+        response = self.llm.invoke(self._analysis_messages(state))
+        return self._with_answer(state, response)
+
+    async def _aanalyze(self, state: WorkflowState) -> WorkflowState:
+        """Async version of `_analyze`."""
+        response = await self.llm.ainvoke(self._analysis_messages(state))
+        return self._with_answer(state, response)
+
+    @staticmethod
+    def _analysis_messages(state: WorkflowState) -> list[Union[HumanMessage, AIMessage]]:
         context = "\n\n".join([
             f"Title: {result['title']}\nContent: {result['content']}"
             for result in state["search_results"]
@@ -74,11 +93,13 @@ class SearchWorkflow:
 
 Provide a clear, concise answer based on the search results. If the search results don't contain enough information, say so."""
 
-        response = self.llm.invoke([
+        return [
             HumanMessage(content=system_message),
             state["messages"][-1]
-        ])
-        
+        ]
+
+    @staticmethod
+    def _with_answer(state: WorkflowState, response: AIMessage) -> WorkflowState:
         state["messages"].append(AIMessage(content=response.content))
         state["current_step"] = "end"
         
@@ -104,8 +125,8 @@ Provide a clear, concise answer based on the search results. If the search resul
         workflow = StateGraph(WorkflowState)
         
         # Add nodes
-        workflow.add_node("search", self._search)
-        workflow.add_node("analyze", self._analyze)
+        workflow.add_node("search", RunnableLambda(self._search, afunc=self._asearch))
+        workflow.add_node("analyze", RunnableLambda(self._analyze, afunc=self._aanalyze))
         
         # Add edges
         workflow.add_edge("search", "analyze")
@@ -114,7 +135,7 @@ Provide a clear, concise answer based on the search results. If the search resul
         # Set entry point
         workflow.set_entry_point("search")
         
-        return workflow.compile()
+        return instrument(workflow.compile(), "search")
     
     def run(self, query: str) -> tuple[str, float]:
         """Run the search workflow with a given query.
@@ -127,21 +148,48 @@ Provide a clear, concise answer based on the search results. If the search resul
         """
         start_time = time.time()
         
+        # Run the workflow
+        result = self.graph.invoke(self._initial_state(query))
+        return self._response(result, start_time)
+
+    async def arun(self, query: str) -> tuple[str, float]:
+        """Async version of `run`."""
+        start_time = time.time()
+        result = await self.graph.ainvoke(self._initial_state(query))
+        return self._response(result, start_time)
+
+    @staticmethod
+    def _initial_state(query: str) -> WorkflowState:
         # Create initial state as a dictionary
-        initial_state: WorkflowState = {
+        return {
             "messages": [HumanMessage(content=query)],
             "current_step": "search",
             "context": {},
             "search_results": []
         }
-        
-        # Run the workflow
-        result = self.graph.invoke(initial_state)
-        
+
+    @staticmethod
+    def _response(result: WorkflowState, start_time: float) -> tuple[str, float]:
         # Ensure we get a string response
         last_message = result["messages"][-1]
         if not isinstance(last_message, AIMessage):
             raise ValueError("Expected AI message as final response")
             
         processing_time = time.time() - start_time
-        return str(last_message.content), processing_time 
\ No newline at end of file
+        return str(last_message.content), processing_time
+
+
+_workflow = None
+_workflow_lock = threading.Lock()
+
+
+def get_search_workflow() -> SearchWorkflow:
+    """
+    Get the process-wide search workflow, creating it on first use
+    """
+    global _workflow
+    if _workflow is None:
+        with _workflow_lock:
+            if _workflow is None:
+                _workflow = SearchWorkflow()
+    return _workflow
@@ -0,0 +1,221 @@
+"""Persistent cache of LLM responses shared by every chat model in the process.
+
+LangChain consults the global cache (`set_llm_cache`) before each chat model
+call, so installing `SQLiteLLMCache` covers every `ChatAnthropic` instance,
+including ones bound to tools or structured output: the cache key hashes the
+model parameters LangChain passes as `llm_string` (model name, temperature,
+bound tools, ...) together with the serialized messages, minus the ids and
+metadata that differ between otherwise identical calls. Empty responses are
+not stored, and replayed responses report no token usage, so that the token
+metrics count only what was actually sent to the model.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.globals import set_llm_cache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+from salonist.metrics import record_llm_cache_evictions, record_llm_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+
+# Per-call details of serialized messages that say nothing about the conversation
+VOLATILE_MESSAGE_FIELDS = ("id", "response_metadata", "usage_metadata", "tool_call_id")
+
+
+def _canonical(value: Any) -> Any:
+    """The serialized messages without message, tool call and tool use ids or response metadata.
+
+    The graphs give every message a fresh UUID and the model fresh tool call
+    ids, so the same conversation would otherwise never hash the same twice.
+    """
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if value.get("lc") == 1 and value.get("type") == "constructor" and isinstance(value.get("kwargs"), dict):
+        kwargs = {key: item for key, item in value["kwargs"].items() if key not in VOLATILE_MESSAGE_FIELDS}
+        for field in ("tool_calls", "invalid_tool_calls"):
+            if isinstance(kwargs.get(field), list):
+                kwargs[field] = [
+                    {key: item for key, item in call.items() if key != "id"} if isinstance(call, dict) else call
+                    for call in kwargs[field]
+                ]
+        return {**value, "kwargs": _canonical(kwargs)}
+    # Anthropic content blocks
+    if value.get("type") == "tool_use":
+        value = {key: item for key, item in value.items() if key != "id"}
+    elif value.get("type") == "tool_result":
+        value = {key: item for key, item in value.items() if key != "tool_use_id"}
+    return {key: _canonical(item) for key, item in value.items()}
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Canonical hash of the model parameters and messages of a call."""
+    try:
+        # Re-dump with sorted keys so equal prompts hash equally whatever their key order
+        prompt = json.dumps(_canonical(json.loads(prompt)), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        pass
+    return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+def _is_empty(generation: Generation) -> bool:
+    """Whether a response has neither text nor tool calls, like the ones `Assistant` retries."""
+    message = getattr(generation, "message", None)
+    if message is None:
+        return not generation.text
+    if getattr(message, "tool_calls", None):
+        return False
+    content = message.content
+    if isinstance(content, list):
+        return not any(block if isinstance(block, str) else block.get("text") for block in content)
+    return not content
+
+
+def _without_usage(generation: Generation) -> Generation:
+    """A cached response with its token usage zeroed, since replaying it used no tokens."""
+    message = getattr(generation, "message", None)
+    if getattr(message, "usage_metadata", None):
+        generation.message = message.model_copy(
+            update={"usage_metadata": {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}}
+        )
+    return generation
+
+
+class SQLiteLLMCache(BaseCache):
+    """LLM response cache in a local SQLite file, with LRU and TTL eviction.
+
+    Entries older than `ttl` seconds are treated as misses and removed
+    (`ttl=None` keeps them until evicted). Once more than `max_entries` are
+    stored, the least recently used ones are evicted. Hits, misses and
+    evictions are counted for the life of the cache object, and in the
+    Prometheus metrics.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl: Optional[float] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and row[1] + self.ttl < now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self.evictions += 1
+                record_llm_cache_evictions(1)
+                row = None
+            if row is None:
+                self.misses += 1
+                record_llm_cache_lookup(hit=False)
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            record_llm_cache_lookup(hit=True)
+
+        try:
+            return [_without_usage(loads(generation)) for generation in json.loads(row[0])]
+        except Exception:
+            logger.warning('Discarding an unreadable LLM cache entry', exc_info=True)
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        # Empty answers are retried by the assistants; replaying them from the cache would defeat that
+        if not return_val or any(_is_empty(generation) for generation in return_val):
+            return
+        key = cache_key(prompt, llm_string)
+        response = json.dumps([dumps(generation) for generation in return_val])
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        evicted = 0
+        if self.ttl is not None:
+            evicted += self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,)
+            ).rowcount
+        excess = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            evicted += self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)",
+                (excess,),
+            ).rowcount
+        if evicted:
+            self.evictions += evicted
+            record_llm_cache_evictions(evicted)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def init_llm_cache(settings) -> Optional[SQLiteLLMCache]:
+    """
+    Install the process-wide LLM cache described by the settings, once
+    """
+    global _cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SQLiteLLMCache(
+                    settings.LLM_CACHE_FILE,
+                    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+                    ttl=settings.LLM_CACHE_TTL_SECONDS,
+                )
+                set_llm_cache(_cache)
+    return _cache
+
+
+def get_llm_cache() -> Optional[SQLiteLLMCache]:
+    """
+    Get the installed LLM cache, or None if caching is disabled
+    """
+    return _cache
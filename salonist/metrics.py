@@ -0,0 +1,243 @@
+"""Prometheus metrics of the graph runs, served on `/metrics`.
+
+`GraphMetrics` is a callback handler attached to each compiled graph
+(`instrument`), so every run of the graph, whether invoked or streamed, sync
+or async, records:
+
+- `salonist_node_duration_seconds`: wall time of each node
+- `salonist_llm_duration_seconds` and `salonist_llm_time_to_first_token_seconds`:
+  chat model calls (the first token is only seen when the run is streamed)
+- `salonist_llm_tokens`: input, output, cache read and cache creation tokens per call
+- `salonist_tool_duration_seconds`: tool executions
+
+`Assistant` records `salonist_assistant_attempts` (LLM attempts per answer),
+`salonist_assistant_calls_total`, `salonist_assistant_retries_total` (extra
+attempts after an empty response) and `salonist_assistant_fallbacks_total`
+itself. `salonist.prompt_cache` records `salonist_prompt_cache_calls_total`
+and `salonist_prompt_cache_tokens_total`, and `SQLiteLLMCache` records
+`salonist_llm_cache_hits_total`, `salonist_llm_cache_misses_total` and
+`salonist_llm_cache_evictions_total`.
+"""
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from flask import Response
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+from salonist.tracing import trace_callbacks
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+TOKEN_BUCKETS = (10, 50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+NODE_DURATION = Histogram(
+    "salonist_node_duration_seconds",
+    "Wall time of a graph node.",
+    ["graph", "node", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_DURATION = Histogram(
+    "salonist_llm_duration_seconds",
+    "Wall time of a chat model call.",
+    ["graph", "node", "model", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "salonist_llm_time_to_first_token_seconds",
+    "Time from the start of a streamed chat model call to its first token.",
+    ["graph", "node", "model"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Histogram(
+    "salonist_llm_tokens",
+    "Tokens of a chat model call, by kind (input, output, cache_read, cache_creation).",
+    ["graph", "node", "model", "kind"],
+    buckets=TOKEN_BUCKETS,
+)
+TOOL_DURATION = Histogram(
+    "salonist_tool_duration_seconds",
+    "Wall time of a tool execution.",
+    ["graph", "tool", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+ASSISTANT_ATTEMPTS = Histogram(
+    "salonist_assistant_attempts",
+    "LLM attempts an assistant needed for one answer.",
+    ["assistant"],
+    buckets=(1, 2, 3, 4, 5, 10),
+)
+ASSISTANT_CALLS = Counter(
+    "salonist_assistant_calls_total",
+    "Answers an assistant was asked for.",
+    ["assistant"],
+)
+ASSISTANT_RETRIES = Counter(
+    "salonist_assistant_retries_total",
+    "Extra LLM attempts an assistant made after empty responses.",
+    ["assistant"],
+)
+ASSISTANT_FALLBACKS = Counter(
+    "salonist_assistant_fallbacks_total",
+    "Answers replaced by the fallback message after every attempt came back empty.",
+    ["assistant"],
+)
+PROMPT_CACHE_CALLS = Counter(
+    "salonist_prompt_cache_calls_total",
+    "Chat model responses that reported their token usage.",
+)
+PROMPT_CACHE_TOKENS = Counter(
+    "salonist_prompt_cache_tokens_total",
+    "Prompt tokens of the chat model responses, by kind (input, cache_read, cache_creation).",
+    ["kind"],
+)
+
+LLM_CACHE_HITS = Counter(
+    "salonist_llm_cache_hits_total",
+    "Chat model calls answered from the LLM response cache.",
+)
+LLM_CACHE_MISSES = Counter(
+    "salonist_llm_cache_misses_total",
+    "Chat model calls the LLM response cache had no answer for.",
+)
+LLM_CACHE_EVICTIONS = Counter(
+    "salonist_llm_cache_evictions_total",
+    "Responses removed from the LLM response cache because they expired or were least recently used.",
+)
+
+
+class GraphMetrics(BaseCallbackHandler):
+    """Callback handler timing the nodes, model calls and tools of one graph."""
+
+    # Record in the calling thread or event loop, so timings aren't skewed by an executor
+    run_inline = True
+
+    def __init__(self, graph: str):
+        self.graph = graph
+        self._nodes: Dict[UUID, Tuple[str, float]] = {}
+        self._llm_runs: Dict[UUID, Dict[str, Any]] = {}
+        self._tools: Dict[UUID, Tuple[str, float]] = {}
+
+    # Nodes
+
+    def on_chain_start(self, serialized: Optional[Dict[str, Any]], inputs: Any, *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None,
+                       **kwargs: Any) -> None:
+        node = (metadata or {}).get("langgraph_node")
+        if node is None or kwargs.get("name") != node:
+            return
+        # A node's runnable may carry the node's name too (`Assistant.as_node`); time the outer run only
+        parent = self._nodes.get(parent_run_id)
+        if parent is not None and parent[0] == node:
+            return
+        self._nodes[run_id] = (node, time.perf_counter())
+
+    def _end_node(self, run_id: UUID, status: str) -> None:
+        run = self._nodes.pop(run_id, None)
+        if run is not None:
+            node, started = run
+            NODE_DURATION.labels(self.graph, node, status).observe(time.perf_counter() - started)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_node(run_id, "ok")
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_node(run_id, "error")
+
+    # Chat models
+
+    def on_chat_model_start(self, serialized: Optional[Dict[str, Any]], messages: List[List[BaseMessage]], *,
+                            run_id: UUID, metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        metadata = metadata or {}
+        self._llm_runs[run_id] = {
+            "node": metadata.get("langgraph_node", ""),
+            "model": metadata.get("ls_model_name") or (serialized or {}).get("name") or "unknown",
+            "started": time.perf_counter(),
+            "first_token": False,
+        }
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._llm_runs.get(run_id)
+        if run is not None and not run["first_token"]:
+            run["first_token"] = True
+            LLM_TIME_TO_FIRST_TOKEN.labels(self.graph, run["node"], run["model"]).observe(
+                time.perf_counter() - run["started"]
+            )
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._llm_runs.pop(run_id, None)
+        if run is None:
+            return
+        labels = (self.graph, run["node"], run["model"])
+        LLM_DURATION.labels(*labels, "ok").observe(time.perf_counter() - run["started"])
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if not usage:
+                    continue
+                details = usage.get("input_token_details") or {}
+                LLM_TOKENS.labels(*labels, "input").observe(usage.get("input_tokens") or 0)
+                LLM_TOKENS.labels(*labels, "output").observe(usage.get("output_tokens") or 0)
+                LLM_TOKENS.labels(*labels, "cache_read").observe(details.get("cache_read") or 0)
+                LLM_TOKENS.labels(*labels, "cache_creation").observe(details.get("cache_creation") or 0)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._llm_runs.pop(run_id, None)
+        if run is not None:
+            LLM_DURATION.labels(self.graph, run["node"], run["model"], "error").observe(
+                time.perf_counter() - run["started"]
+            )
+
+    # Tools
+
+    def on_tool_start(self, serialized: Optional[Dict[str, Any]], input_str: str, *, run_id: UUID,
+                      **kwargs: Any) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "unknown"
+        self._tools[run_id] = (name, time.perf_counter())
+
+    def _end_tool(self, run_id: UUID, status: str) -> None:
+        run = self._tools.pop(run_id, None)
+        if run is not None:
+            name, started = run
+            TOOL_DURATION.labels(self.graph, name, status).observe(time.perf_counter() - started)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_tool(run_id, "ok")
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_tool(run_id, "error")
+
+
+def instrument(graph, name: str):
+    """The compiled graph with a `GraphMetrics` handler, and the request tracer, attached to all of its runs."""
+    return graph.with_config(callbacks=[GraphMetrics(name), trace_callbacks])
+
+
+def record_assistant_attempts(assistant: str, attempts: int, fell_back: bool) -> None:
+    ASSISTANT_ATTEMPTS.labels(assistant).observe(attempts)
+    ASSISTANT_CALLS.labels(assistant).inc()
+    ASSISTANT_RETRIES.labels(assistant).inc(attempts - 1)
+    if fell_back:
+        ASSISTANT_FALLBACKS.labels(assistant).inc()
+
+
+def record_prompt_cache_usage(input_tokens: int, cache_read: int, cache_creation: int) -> None:
+    PROMPT_CACHE_CALLS.inc()
+    PROMPT_CACHE_TOKENS.labels("input").inc(input_tokens)
+    PROMPT_CACHE_TOKENS.labels("cache_read").inc(cache_read)
+    PROMPT_CACHE_TOKENS.labels("cache_creation").inc(cache_creation)
+
+
+def record_llm_cache_lookup(hit: bool) -> None:
+    (LLM_CACHE_HITS if hit else LLM_CACHE_MISSES).inc()
+
+
+def record_llm_cache_evictions(count: int) -> None:
+    LLM_CACHE_EVICTIONS.inc(count)
+
+
+def metrics_view() -> Response:
+    """The metrics in the Prometheus text format."""
+    return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
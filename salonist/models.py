@@ -56,4 +56,25 @@ class ServiceRequest(db.Model):
     package = db.relationship('Package')
     
     def __repr__(self):
-        return f'<ServiceRequest {self.user_name} - {self.service.name}>' 
\ No newline at end of file
+        return f'<ServiceRequest {self.user_name} - {self.service.name}>' 
+
+class AvailabilitySlot(db.Model):
+    """Half-hour slot in a doctor's appointment calendar."""
+    __tablename__ = 'availability_slots'
+    __table_args__ = (
+        db.UniqueConstraint('doctor_name', 'slot_start', name='uq_availability_slots_doctor_start'),
+        db.Index('ix_availability_slots_doctor_start_available', 'doctor_name', 'slot_start', 'is_available'),
+        db.Index('ix_availability_slots_specialization_start', 'specialization', 'slot_start'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    slot_start = db.Column(db.DateTime, nullable=False)
+    specialization = db.Column(db.String(50), nullable=False)
+    doctor_name = db.Column(db.String(100), nullable=False)
+    is_available = db.Column(db.Boolean, nullable=False, default=True)
+    patient_to_attend = db.Column(db.BigInteger, nullable=True)
+    # Bumped by the conditional updates of DatabaseAvailabilityStore for optimistic locking
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<AvailabilitySlot {self.doctor_name} {self.slot_start}>'
@@ -0,0 +1,60 @@
+"""Anthropic prompt caching for the static prefix of every assistant call.
+
+Requests are cached by prefix in the order tools, system prompt, messages.
+With `PROMPT_CACHING_ENABLED`, the last tool schema and the system prompt
+carry a `cache_control` breakpoint, so repeat calls read both from the
+provider's cache. Anthropic only caches prefixes of at least 1024 tokens
+(Sonnet); shorter ones are sent uncached, at no extra cost.
+
+`prompt_cache_usage` is attached as a callback to the chat models and
+counts the cache read and write tokens the responses report in the
+`salonist_prompt_cache_*` counters on `/metrics`.
+"""
+from typing import Any, Dict, List, Sequence
+
+from langchain_anthropic.chat_models import convert_to_anthropic_tool
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import SystemMessage
+from langchain_core.outputs import LLMResult
+
+from salonist.config import get_settings
+from salonist.metrics import record_prompt_cache_usage
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def prompt_caching_enabled() -> bool:
+    return get_settings().PROMPT_CACHING_ENABLED
+
+
+def cached_system_prompt(text: str) -> SystemMessage:
+    """A system message ending in a cache breakpoint."""
+    return SystemMessage(content=[{"type": "text", "text": text, "cache_control": CACHE_CONTROL}])
+
+
+def cached_tools(tools: Sequence[Any]) -> List[Dict[str, Any]]:
+    """The tools as Anthropic schemas, with a cache breakpoint after the last one."""
+    schemas = [dict(convert_to_anthropic_tool(tool)) for tool in tools]
+    if schemas:
+        schemas[-1]["cache_control"] = CACHE_CONTROL
+    return schemas
+
+
+class PromptCacheUsage(BaseCallbackHandler):
+    """Records the prompt cache tokens reported by Anthropic responses."""
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if not usage:
+                    continue
+                details = usage.get("input_token_details") or {}
+                record_prompt_cache_usage(
+                    usage.get("input_tokens") or 0,
+                    details.get("cache_read") or 0,
+                    details.get("cache_creation") or 0,
+                )
+
+
+prompt_cache_usage = PromptCacheUsage()
@@ -0,0 +1,93 @@
+"""Chat model and web search providers, chosen by the LLM_PROVIDER and SEARCH_PROVIDER settings.
+
+"anthropic" and "tavily" call the live APIs; "fake" selects the scripted
+offline stand-ins from `salonist.providers.fake`.
+"""
+from typing import Any
+
+from salonist.config import get_settings
+from salonist.providers.fake import (
+    AsyncFakeSearchClient,
+    FakeChatModel,
+    FakeSearchClient,
+    LatencyModel,
+    create_fake_search_tool,
+    load_script,
+)
+
+
+def _llm_latency(settings) -> LatencyModel:
+    return LatencyModel(
+        settings.FAKE_LLM_LATENCY_DISTRIBUTION,
+        settings.FAKE_LLM_LATENCY_SECONDS,
+        settings.FAKE_LLM_LATENCY_SPREAD,
+        settings.FAKE_SEED,
+    )
+
+
+def _search_latency(settings) -> LatencyModel:
+    return LatencyModel(
+        settings.FAKE_SEARCH_LATENCY_DISTRIBUTION,
+        settings.FAKE_SEARCH_LATENCY_SECONDS,
+        settings.FAKE_SEARCH_LATENCY_SPREAD,
+        settings.FAKE_SEED,
+    )
+
+
+def get_chat_model(model_name: str, **kwargs: Any):
+    """
+    A chat model for `model_name` from the configured provider
+    """
+    settings = get_settings()
+    if settings.LLM_PROVIDER == "fake":
+        # Never answered from the LLM cache, so runs keep the scripted latency
+        return FakeChatModel(
+            rules=load_script(settings.FAKE_SCRIPT_FILE)["chat"],
+            latency=_llm_latency(settings),
+            model_name=model_name,
+            cache=False,
+            **kwargs,
+        )
+    if settings.LLM_PROVIDER != "anthropic":
+        raise ValueError(f"Unknown LLM provider: {settings.LLM_PROVIDER}")
+
+    from langchain_anthropic import ChatAnthropic
+    return ChatAnthropic(model_name=model_name, **kwargs)  # type: ignore
+
+
+def get_search_client(asynchronous: bool = False):
+    """
+    A Tavily-compatible search client from the configured provider
+    """
+    settings = get_settings()
+    if settings.SEARCH_PROVIDER == "fake":
+        client_class = AsyncFakeSearchClient if asynchronous else FakeSearchClient
+        return client_class(load_script(settings.FAKE_SCRIPT_FILE)["search"], _search_latency(settings))
+    if settings.SEARCH_PROVIDER != "tavily":
+        raise ValueError(f"Unknown search provider: {settings.SEARCH_PROVIDER}")
+
+    from tavily import AsyncTavilyClient, TavilyClient
+    client_class = AsyncTavilyClient if asynchronous else TavilyClient
+    return client_class(api_key=settings.TAVILY_API_KEY)
+
+
+def get_search_tool(max_results: int = 5):
+    """
+    The web search tool for agents from the configured provider
+    """
+    if get_settings().SEARCH_PROVIDER == "fake":
+        return create_fake_search_tool(get_search_client())
+
+    from langchain_community.tools.tavily_search import TavilySearchResults
+    return TavilySearchResults(max_results=max_results)
+
+
+__all__ = [
+    "FakeChatModel",
+    "FakeSearchClient",
+    "AsyncFakeSearchClient",
+    "LatencyModel",
+    "get_chat_model",
+    "get_search_client",
+    "get_search_tool",
+]
@@ -0,0 +1,217 @@
+"""Scripted stand-ins for the Anthropic chat model and Tavily search.
+
+They let the graphs run offline and deterministically: in CI, for load
+tests, or to profile everything but the model. Both replay a script and
+wait a latency drawn from a `LatencyModel` before answering.
+
+A script is a JSON object with a "chat" and a "search" list of rules; the
+first rule whose "match" regex is found in the (lower-cased) query applies.
+
+A chat rule lists the "tool_calls" the conversation should make and the
+"content" of the final answer. For each model call, the fake makes the
+rule's calls to tools bound to that model that were not already made since
+the user's last message, and answers with "content" once none are left.
+With the appointment graph, for example, `ToGetInfo` is made by the
+primary assistant, `check_availability_by_doctor` by the info assistant,
+and the info assistant then answers.
+
+A search rule gives the "results" (title, url, content) and "answer" the
+fake search returns.
+"""
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field
+
+DEFAULT_SCRIPT: Dict[str, List[Dict[str, Any]]] = {
+    "chat": [
+        {
+            "match": r"availab|free|slot|earliest|soonest",
+            "tool_calls": [
+                {"name": "ToGetInfo", "args": {"desired_date": {"date": "07-08-2024"}, "request": "availability"}},
+                {"name": "check_availability_by_specialization",
+                 "args": {"desired_date": {"date": "07-08-2024"}, "specialization": "general_dentist"}},
+                {"name": "check_availability", "args": {"query": "tomorrow"}},
+                {"name": "tavily_search_results_json", "args": {"query": "dentist availability"}},
+            ],
+            "content": "Here are the available slots I found.",
+        },
+        {
+            "match": r"book|cancel|reschedul",
+            "tool_calls": [
+                {"name": "ToAppointmentBookingAssistant", "args": {"request": "appointment"}},
+            ],
+            "content": "Sure, which doctor, date, time and id number should I use for the appointment?",
+        },
+        {
+            "match": r"",
+            "tool_calls": [
+                {"name": "Router", "args": {"next": "FINISH"}},
+            ],
+            "content": "Hello! How can I help you with your appointment today?",
+        },
+    ],
+    "search": [
+        {
+            "match": r"",
+            "answer": "Regular check-ups every six months keep teeth healthy.",
+            "results": [
+                {"title": "Dental check-ups", "url": "https://example.com/check-ups",
+                 "content": "Dentists recommend a check-up and cleaning every six months."},
+                {"title": "Brushing and flossing", "url": "https://example.com/brushing",
+                 "content": "Brush twice a day for two minutes and floss once a day."},
+            ],
+        },
+    ],
+}
+
+
+def load_script(path: Optional[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """The script in the JSON file at `path`, or the built-in one."""
+    if not path:
+        return DEFAULT_SCRIPT
+    with open(path) as f:
+        script = json.load(f)
+    return {"chat": script.get("chat", DEFAULT_SCRIPT["chat"]), "search": script.get("search", DEFAULT_SCRIPT["search"])}
+
+
+def _match(rules: Sequence[Dict[str, Any]], text: str) -> Dict[str, Any]:
+    for rule in rules:
+        if re.search(rule.get("match", ""), text.lower()):
+            return rule
+    return {}
+
+
+@dataclass
+class LatencyModel:
+    """Random delay of a fake call.
+
+    `distribution` is one of:
+    - "constant": always `mean` seconds
+    - "uniform": between `mean - spread` and `mean + spread`
+    - "normal": normal around `mean` with standard deviation `spread`, cut at 0
+    - "lognormal": median `mean`, with `spread` the sigma of the log (a long tail)
+    """
+
+    distribution: str = "constant"
+    mean: float = 0.0
+    spread: float = 0.0
+    seed: Optional[int] = None
+
+    def __post_init__(self):
+        if self.distribution not in ("constant", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {self.distribution}")
+        self._random = random.Random(self.seed)
+
+    def sample(self) -> float:
+        if self.distribution == "uniform":
+            delay = self._random.uniform(self.mean - self.spread, self.mean + self.spread)
+        elif self.distribution == "normal":
+            delay = self._random.gauss(self.mean, self.spread)
+        elif self.distribution == "lognormal":
+            delay = self._random.lognormvariate(0, self.spread) * self.mean
+        else:
+            delay = self.mean
+        return max(delay, 0.0)
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model replaying the "chat" rules of a script."""
+
+    rules: List[Dict[str, Any]]
+    latency: Any = Field(default_factory=LatencyModel)  # LatencyModel
+    model_name: str = "fake"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-scripted"
+
+    def bind_tools(self, tools: Sequence[Any], *, tool_choice: Optional[Any] = None, **kwargs: Any):
+        # Anthropic-format schemas (prompt caching) are kept as they are
+        formatted = [tool if isinstance(tool, dict) and "name" in tool else convert_to_openai_tool(tool) for tool in tools]
+        return super().bind(tools=formatted, tool_choice=tool_choice, **kwargs)
+
+    @staticmethod
+    def _tool_names(tools: Optional[Sequence[Dict[str, Any]]]) -> List[str]:
+        return [schema["function"]["name"] if "function" in schema else schema["name"] for schema in tools or []]
+
+    def _respond(self, messages: List[BaseMessage], tools: Optional[Sequence[Dict[str, Any]]]) -> ChatResult:
+        # The user's last message and everything the models did about it since
+        start = max(
+            (i for i, m in enumerate(messages) if isinstance(m, HumanMessage) and not m.name),
+            default=0,
+        )
+        query = messages[start].content if messages else ""
+        rule = _match(self.rules, query if isinstance(query, str) else json.dumps(query))
+
+        made = {tc["name"] for m in messages[start:] if isinstance(m, AIMessage) for tc in m.tool_calls}
+        bound = self._tool_names(tools)
+        tool_calls = [
+            {"name": call["name"], "args": call.get("args", {}), "id": f"toolu_{uuid.uuid4().hex}"}
+            for call in rule.get("tool_calls", [])
+            if call["name"] in bound and call["name"] not in made
+        ]
+        message = AIMessage(content="" if tool_calls else rule.get("content", ""), tool_calls=tool_calls)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency.sample())
+        return self._respond(messages, kwargs.get("tools"))
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[Any] = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency.sample())
+        return self._respond(messages, kwargs.get("tools"))
+
+
+class FakeSearchClient:
+    """Search client replaying the "search" rules of a script, shaped like Tavily's responses."""
+
+    def __init__(self, rules: Sequence[Dict[str, Any]], latency: LatencyModel):
+        self.rules = rules
+        self.latency = latency
+
+    def _results(self, query: str, max_results: int = 5, **kwargs: Any) -> Dict[str, Any]:
+        rule = _match(self.rules, query)
+        results = [
+            {"score": 1.0, "raw_content": result.get("content"), **result}
+            for result in rule.get("results", [])[:max_results]
+        ]
+        return {"query": query, "answer": rule.get("answer"), "results": results}
+
+    def search(self, query: str, **kwargs: Any) -> Dict[str, Any]:
+        time.sleep(self.latency.sample())
+        return self._results(query, **kwargs)
+
+
+class AsyncFakeSearchClient(FakeSearchClient):
+    async def search(self, query: str, **kwargs: Any) -> Dict[str, Any]:
+        await asyncio.sleep(self.latency.sample())
+        return self._results(query, **kwargs)
+
+
+def create_fake_search_tool(client: FakeSearchClient):
+    """Stand-in for `TavilySearchResults`, under the same tool name."""
+
+    @tool("tavily_search_results_json")
+    def tavily_search_results_json(query: str) -> List[Dict[str, Any]]:
+        """A search engine. Useful for when you need to answer questions about current events. Input should be a search query."""
+        return [
+            {"title": result["title"], "url": result["url"], "content": result["content"]}
+            for result in client.search(query)["results"]
+        ]
+
+    return tavily_search_results_json
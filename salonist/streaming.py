@@ -0,0 +1,74 @@
+"""Server-sent events for streamed graph runs.
+
+The workflows stream their graphs with LangGraph's "messages" and "updates"
+modes and turn each chunk into `(event, data)` pairs:
+
+- `token`: a piece of an assistant reply, `{"node", "content"}`
+- `node`: a node finished, `{"node"}`
+- `route`: the conversation moved to another assistant, `{"to", "message"}`
+- `done`: the final response, in the shape the blocking endpoint returns
+- `error`: the run failed, `{"error"}`
+"""
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, Iterator, Tuple
+
+from langchain_core.messages import AIMessageChunk
+
+Event = Tuple[str, Dict[str, Any]]
+
+STREAM_MODES = ["messages", "updates"]
+
+# Keep proxies (nginx) from buffering the stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _text(content) -> str:
+    # Anthropic chunks carry a list of content blocks; only text blocks are shown to the user
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content if isinstance(block, dict) and block.get("type") == "text")
+
+
+def graph_events(mode: str, chunk: Any) -> Iterator[Event]:
+    """Translate one `(mode, chunk)` item of `graph.stream(..., stream_mode=STREAM_MODES)`."""
+    if mode == "messages":
+        message, metadata = chunk
+        if isinstance(message, AIMessageChunk):
+            text = _text(message.content)
+            if text:
+                yield "token", {"node": metadata.get("langgraph_node"), "content": text}
+        return
+
+    for node, update in chunk.items():
+        if node.startswith("__"):
+            continue
+        yield "node", {"node": node}
+        dialog_state = update.get("dialog_state") if isinstance(update, dict) else None
+        if dialog_state:
+            to = "primary_assistant" if dialog_state == "pop" else dialog_state
+            yield "route", {"to": to, "message": f"routing to {to}"}
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse(events: Iterator[Event]) -> Iterator[str]:
+    """Format events as SSE, ending the stream with an `error` event if the run fails."""
+    try:
+        for event, data in events:
+            yield format_sse(event, data)
+    except Exception as e:
+        logging.exception('Streaming the workflow failed')
+        yield format_sse("error", {"error": str(e)})
+
+
+async def asse(events: AsyncIterator[Event]) -> AsyncIterator[str]:
+    """Async version of `sse`."""
+    try:
+        async for event, data in events:
+            yield format_sse(event, data)
+    except Exception as e:
+        logging.exception('Streaming the workflow failed')
+        yield format_sse("error", {"error": str(e)})
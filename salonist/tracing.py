@@ -0,0 +1,375 @@
+"""Chrome trace-event export of single requests.
+
+Tracing is off unless `REQUEST_TRACING_ENABLED` is set. Then a request to
+an `/api/*` route sent with the `X-Trace: 1` header or the `?trace=1` query
+flag is traced; with `TRACE_TOKEN` set, only requests whose `X-Trace` header
+carries that token are. The trace records its graph steps (nodes, routing functions
+and the runnables inside them), chat model calls, tool executions and
+checkpoint reads and writes as nested spans and is written to a
+JSON file in `TRACE_DIR` when the request ends. The file's path is returned
+in the `X-Trace-File` response header; open it in chrome://tracing or
+https://ui.perfetto.dev. Only the newest `TRACE_MAX_FILES` traces are kept;
+they contain tool inputs such as patients' id numbers.
+
+The trace of the running request is kept in a context variable, so it
+follows the run into LangGraph's worker threads and tasks. `trace_callbacks`
+is attached to every compiled graph and `TracedCheckpointSaver` wraps their
+checkpointers; both do nothing when no trace is active.
+
+Spans that overlap without being nested, like parallel tool calls or a
+checkpoint write running while the next node starts, are put on separate
+rows ("threads") of the trace.
+"""
+import glob
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+from uuid import UUID
+
+from flask import Flask, Response, g, request
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.constants import TAG_HIDDEN
+
+from salonist.config import get_settings
+
+TRACE_HEADER = "X-Trace"
+TRACE_PARAM = "trace"
+TRACE_FILE_HEADER = "X-Trace-File"
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("salonist_trace", default=None)
+
+
+def wants_trace(headers: Mapping[str, str], params: Mapping[str, str]) -> bool:
+    """Whether a request asked to be traced, and may be."""
+    settings = get_settings()
+    if not settings.REQUEST_TRACING_ENABLED:
+        return False
+    if settings.TRACE_TOKEN:
+        # Only in the header, to keep the token out of URLs and access logs
+        return hmac.compare_digest(headers.get(TRACE_HEADER, ""), settings.TRACE_TOKEN)
+    flag = headers.get(TRACE_HEADER) or params.get(TRACE_PARAM) or ""
+    return flag.lower() in ("1", "true", "yes", "on")
+
+
+class Trace:
+    """The spans of one request, as Chrome trace events."""
+
+    def __init__(self, name: str, directory: str, max_files: int = 100):
+        self.name = name
+        self.directory = directory
+        self.max_files = max_files
+        safe_name = "".join(c if c.isalnum() else "-" for c in name).strip("-")
+        self.path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_name}-{uuid.uuid4().hex[:8]}.json")
+        self.pid = os.getpid()
+        self._started = time.perf_counter_ns()
+        self._events: List[Dict[str, Any]] = []
+        self._open: Dict[Any, Dict[str, Any]] = {}
+        # Open spans of each row, innermost last
+        self._rows: List[List[Any]] = []
+        self._lock = threading.Lock()
+
+    def _now(self) -> float:
+        return (time.perf_counter_ns() - self._started) / 1000  # microseconds
+
+    def _row(self, parent: Any) -> int:
+        # Under the parent when it is the innermost open span of its row, else on the first free row
+        parent_span = self._open.get(parent)
+        if parent_span is not None:
+            stack = self._rows[parent_span["tid"]]
+            if stack and stack[-1] == parent:
+                return parent_span["tid"]
+        for row, stack in enumerate(self._rows):
+            if not stack:
+                return row
+        self._rows.append([])
+        return len(self._rows) - 1
+
+    def begin(self, key: Any, name: str, category: str, parent: Any = None, args: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            row = self._row(parent)
+            self._rows[row].append(key)
+            self._open[key] = {
+                "name": name, "cat": category, "ph": "X", "ts": self._now(),
+                "pid": self.pid, "tid": row, "args": args or {},
+            }
+
+    def mark(self, key: Any, name: str) -> None:
+        """Note in an open span's args, once, how many milliseconds after its start `name` happened."""
+        with self._lock:
+            span = self._open.get(key)
+            if span is not None and name not in span["args"]:
+                span["args"][name] = (self._now() - span["ts"]) / 1000
+
+    def end(self, key: Any, args: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            span = self._open.pop(key, None)
+            if span is None:
+                return
+            span["dur"] = self._now() - span["ts"]
+            span["args"].update(args or {})
+            stack = self._rows[span["tid"]]
+            if key in stack:
+                stack.remove(key)
+            self._events.append(span)
+
+    @contextmanager
+    def span(self, name: str, category: str, parent: Any = None, **args: Any) -> Iterator[None]:
+        key = object()
+        self.begin(key, name, category, parent, args)
+        try:
+            yield
+        except BaseException as e:
+            self.end(key, {"error": repr(e)})
+            raise
+        self.end(key)
+
+    def to_chrome(self) -> Dict[str, Any]:
+        # Spans still open (e.g. an abandoned stream) end now
+        for key in list(self._open):
+            self.end(key, {"unfinished": True})
+        names = [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": row, "args": {"name": f"{self.name} #{row}"}}
+            for row in range(len(self._rows))
+        ]
+        return {"traceEvents": names + sorted(self._events, key=lambda e: e["ts"]), "displayTimeUnit": "ms"}
+
+    def write(self) -> str:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(self.to_chrome(), f, default=str)
+        logging.info(f'Wrote the trace of {self.name} to {self.path}')
+        self._rotate()
+        return self.path
+
+    def _rotate(self) -> None:
+        """Delete all but the newest `max_files` traces in the directory."""
+        paths = sorted(glob.glob(os.path.join(self.directory, "*.json")), key=os.path.getmtime, reverse=True)
+        for path in paths[self.max_files:]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # Rotated by a concurrent request
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def start_trace(name: str):
+    """Make a new trace of `name` the current one, with a root span for the whole request.
+
+    Returns the trace and the token `finish_trace` needs.
+    """
+    settings = get_settings()
+    trace = Trace(name, settings.TRACE_DIR, settings.TRACE_MAX_FILES)
+    trace.begin(trace, name, "request")
+    return trace, _current_trace.set(trace)
+
+
+def finish_trace(trace: Trace, token=None) -> str:
+    """End the request's root span and write the trace; given the token, also make it no longer current."""
+    trace.end(trace)
+    try:
+        return trace.write()
+    finally:
+        if token is not None:
+            _current_trace.reset(token)
+
+
+def trace_stream(chunks: Iterable[Any], trace: Trace) -> Iterator[Any]:
+    """Iterate a streamed response with `trace` current, finishing the trace when the stream ends."""
+    chunks = iter(chunks)
+    try:
+        while True:
+            token = _current_trace.set(trace)
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            finally:
+                _current_trace.reset(token)
+            yield chunk
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+        finish_trace(trace)
+
+
+@contextmanager
+def trace_span(name: str, category: str, **args: Any) -> Iterator[None]:
+    """A span of the current trace, under the request's root span; nothing when no trace is active."""
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    with trace.span(name, category, trace, **args):
+        yield
+
+
+class TraceCallbacks(BaseCallbackHandler):
+    """Callback handler adding the graph's runs to the current trace."""
+
+    # Record in the calling thread or event loop, where the current trace is visible
+    run_inline = True
+
+    @staticmethod
+    def _begin(run_id: UUID, parent_run_id: Optional[UUID], name: str, category: str, args: Dict[str, Any]) -> None:
+        trace = current_trace()
+        if trace is not None:
+            # Top-level runs hang under the request's root span
+            trace.begin(run_id, name, category, parent_run_id or trace, args)
+
+    @staticmethod
+    def _end(run_id: UUID, args: Optional[Dict[str, Any]] = None) -> None:
+        trace = current_trace()
+        if trace is not None:
+            trace.end(run_id, args)
+
+    def on_chain_start(self, serialized: Optional[Dict[str, Any]], inputs: Any, *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, tags: Optional[Sequence[str]] = None,
+                       metadata: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        # LangGraph's own plumbing (channel writes, ...) is tagged hidden
+        if TAG_HIDDEN in (tags or []):
+            return
+        metadata = metadata or {}
+        args = {key: metadata[key] for key in ("langgraph_node", "langgraph_step") if key in metadata}
+        self._begin(run_id, parent_run_id, kwargs.get("name") or "chain", "graph", args)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, {"error": repr(error)})
+
+    def on_chat_model_start(self, serialized: Optional[Dict[str, Any]], messages: Any, *, run_id: UUID,
+                            parent_run_id: Optional[UUID] = None, metadata: Optional[Dict[str, Any]] = None,
+                            **kwargs: Any) -> None:
+        model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name") or "chat_model"
+        self._begin(run_id, parent_run_id, model, "llm", {"messages": sum(len(batch) for batch in messages)})
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        trace = current_trace()
+        if trace is not None:
+            trace.mark(run_id, "first_token_ms")
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        args: Dict[str, Any] = {}
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    args.update(input_tokens=usage.get("input_tokens"), output_tokens=usage.get("output_tokens"))
+        self._end(run_id, args)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, {"error": repr(error)})
+
+    def on_tool_start(self, serialized: Optional[Dict[str, Any]], input_str: str, *, run_id: UUID,
+                      parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "tool"
+        self._begin(run_id, parent_run_id, name, "tool", {"input": input_str})
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, {"error": repr(error)})
+
+
+trace_callbacks = TraceCallbacks()
+
+
+class TracedCheckpointSaver(BaseCheckpointSaver):
+    """Checkpointer adding the reads and writes of `saver` to the current trace."""
+
+    def __init__(self, saver: BaseCheckpointSaver):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+
+    @property
+    def config_specs(self):
+        return self.saver.config_specs
+
+    def get_tuple(self, config):
+        with trace_span("checkpoint.get_tuple", "checkpoint"):
+            return self.saver.get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        return self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        with trace_span("checkpoint.put", "checkpoint", step=metadata.get("step")):
+            return self.saver.put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        with trace_span("checkpoint.put_writes", "checkpoint", writes=len(writes)):
+            return self.saver.put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id):
+        return self.saver.delete_thread(thread_id)
+
+    async def aget_tuple(self, config):
+        with trace_span("checkpoint.get_tuple", "checkpoint"):
+            return await self.saver.aget_tuple(config)
+
+    def alist(self, config, *, filter=None, before=None, limit=None):
+        return self.saver.alist(config, filter=filter, before=before, limit=limit)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        with trace_span("checkpoint.put", "checkpoint", step=metadata.get("step")):
+            return await self.saver.aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        with trace_span("checkpoint.put_writes", "checkpoint", writes=len(writes)):
+            return await self.saver.aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        return await self.saver.adelete_thread(thread_id)
+
+    def get_next_version(self, current, channel):
+        return self.saver.get_next_version(current, channel)
+
+
+def init_request_tracing(app: Flask):
+    """Trace the Flask app's `/api` requests that ask for it.
+
+    Flask tears the request down before a streamed response is sent, so the
+    trace of a stream is finished by the stream itself (`trace_stream`).
+    """
+    if not get_settings().REQUEST_TRACING_ENABLED:
+        return
+
+    @app.before_request
+    def start_request_trace():
+        # Under the ASGI app, its own middleware may already trace the request
+        if request.path.startswith('/api/') and current_trace() is None and wants_trace(request.headers, request.args):
+            g.trace = start_trace(f"{request.method} {request.path}")
+
+    @app.after_request
+    def add_trace_header(response: Response) -> Response:
+        if 'trace' in g:
+            trace, token = g.trace
+            response.headers[TRACE_FILE_HEADER] = trace.path
+            if response.is_streamed:
+                response.response = trace_stream(response.response, trace)
+                g.trace_streamed = True
+        return response
+
+    @app.teardown_request
+    def finish_request_trace(exc):
+        trace = g.pop('trace', None)
+        if trace is None:
+            return
+        if g.pop('trace_streamed', False):
+            _current_trace.reset(trace[1])
+        else:
+            finish_trace(*trace)
@@ -0,0 +1,27 @@
+"""Fixtures of the test suite; the offline environment is set up by the root conftest."""
+import pytest
+
+from salonist.app import create_app
+from salonist.appointment.availability import DatabaseAvailabilityStore
+from salonist.commands import import_availability
+from salonist.config import get_settings
+from salonist.database import db
+
+
+@pytest.fixture
+def database_app(calendar, tmp_path, monkeypatch):
+    """An app on a private SQLite database, filled with the calendar by `flask import-availability`."""
+    monkeypatch.setattr(get_settings(), "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'salonist.db'}")
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    result = app.test_cli_runner().invoke(import_availability, [calendar])
+    assert result.output.startswith("Successfully imported"), result.output
+    return app
+
+
+@pytest.fixture
+def database_store(database_app):
+    """A `DatabaseAvailabilityStore` on the calendar."""
+    with database_app.app_context():
+        return DatabaseAvailabilityStore(db.engine)
@@ -0,0 +1,65 @@
+from datetime import date
+
+import pytest
+
+from salonist.appointment.availability import AvailabilityStore
+from salonist.appointment.availability import store as store_module
+from salonist.appointment.tools.tools import (
+    render_availability_by_doctor,
+    render_availability_by_specialization,
+    render_earliest_availability,
+)
+
+RENDERS = (render_availability_by_doctor, render_availability_by_specialization, render_earliest_availability)
+DOCTOR = "kevin anderson"
+
+
+@pytest.fixture(autouse=True)
+def clear_answer_caches():
+    # The caches are module-global, so answers of one test would be served in the next
+    for render in RENDERS:
+        render.cache_clear()
+    yield
+    for render in RENDERS:
+        render.cache_clear()
+
+
+@pytest.fixture
+def served(monkeypatch):
+    def serve(store):
+        monkeypatch.setattr(store_module, "_store", store)
+        return store
+
+    return serve
+
+
+def _first_free(store):
+    (start, _), = store.earliest_available(date(2024, 8, 5), limit=1, doctor_name=DOCTOR)
+    return start
+
+
+def test_booking_invalidates_cached_answers(served, calendar):
+    store = served(AvailabilityStore(calendar))
+    start = _first_free(store)
+    day = start.strftime("%d-%m-%Y")
+
+    answer = render_availability_by_doctor(day, DOCTOR)
+    assert render_availability_by_doctor(day, DOCTOR) == answer
+    assert render_availability_by_doctor.cache_info().hits == 1
+
+    version = store.version
+    assert store.book(start, DOCTOR, 1234567)
+    assert store.version != version
+    assert render_availability_by_doctor(day, DOCTOR) != answer
+    assert render_availability_by_doctor.cache_info().misses == 2
+
+
+def test_stores_without_a_version_are_not_cached(served, database_store):
+    store = served(database_store)
+    assert store.version is None
+    start = _first_free(store)
+
+    answer = render_earliest_availability("05-08-2024", None, DOCTOR, None, 1)
+    assert store.book(start, DOCTOR, 1234567)
+    assert render_earliest_availability("05-08-2024", None, DOCTOR, None, 1) != answer
+    assert render_earliest_availability.cache_info().currsize == 0
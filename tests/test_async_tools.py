@@ -0,0 +1,43 @@
+import asyncio
+import threading
+
+from salonist.appointment import builder
+from salonist.appointment.tools import tools
+from salonist.booking.tool import tool as availability_tool
+
+
+class RecordingStore:
+    version = None
+
+    def __init__(self):
+        self.threads = []
+
+    def cancel(self, start, doctor_name, patient_to_attend):
+        self.threads.append(threading.get_ident())
+        return True
+
+
+def test_appointment_tools_run_in_a_worker_thread_when_awaited(monkeypatch):
+    store = RecordingStore()
+    monkeypatch.setattr(tools, "get_availability_store", lambda: store)
+    args = {"date": {"date": "2024-05-01 10:00"}, "id_number": {"id": 1234567}, "doctor_name": "john doe"}
+
+    assert tools.cancel_appointment.invoke(args) == "Succesfully cancelled"
+    assert asyncio.run(tools.cancel_appointment.ainvoke(args)) == "Succesfully cancelled"
+    assert store.threads[0] == threading.get_ident()
+    assert store.threads[1] != threading.get_ident()
+
+
+def test_availability_tool_awaits_the_same_answer():
+    assert asyncio.run(availability_tool.ainvoke("today")) == availability_tool.invoke("today")
+
+
+def test_async_graph_lock_is_created_lazily(monkeypatch):
+    monkeypatch.setattr(builder, "_async_graph_lock", None)
+
+    async def lock():
+        return builder._get_async_graph_lock()
+
+    created = asyncio.run(lock())
+    assert isinstance(created, asyncio.Lock)
+    assert builder._get_async_graph_lock() is created
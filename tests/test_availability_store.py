@@ -0,0 +1,230 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+
+from salonist.appointment.availability import AvailabilityStore, PartitionedAvailabilityStore
+from salonist.appointment.availability.partitioned import read_manifest, split_into_partitions
+
+
+@pytest.fixture
+def store(calendar):
+    return AvailabilityStore(calendar)
+
+
+def _free_slots(store, count):
+    return store.earliest_available(date(2024, 8, 5), limit=count)
+
+
+def test_partial_journal_line_is_ignored_and_repaired(calendar, store):
+    (first, first_doctor), (second, second_doctor) = _free_slots(store, 2)
+    assert store.book(first, first_doctor, 1234567)
+    # A crash halfway through an append leaves a line without its newline
+    with open(store.journal.path, "a") as f:
+        f.write('{"op": "book", "slot_start": "%s", "doctor_name": "%s"' % (second.isoformat(), second_doctor))
+
+    reader = AvailabilityStore(calendar)
+    assert not reader.get_slot(first, first_doctor).is_available
+    assert reader.get_slot(second, second_doctor).is_available
+
+    assert reader.book(second, second_doctor, 7654321)
+    with open(store.journal.path) as f:
+        assert [json.loads(line)["patient_to_attend"] for line in f] == [1234567, 7654321]
+    assert not AvailabilityStore(calendar).get_slot(second, second_doctor).is_available
+
+
+def test_replay_after_another_process_compacts_the_journal(calendar, store):
+    slots = _free_slots(store, 4)
+    writer = AvailabilityStore(calendar)
+    for start, doctor_name in slots[:3]:
+        assert writer.book(start, doctor_name, 1234567)
+    assert all(not store.get_slot(start, doctor_name).is_available for start, doctor_name in slots[:3])
+
+    # The journal is emptied and grows again, shorter than the offset `store` has read up to
+    writer.compact()
+    start, doctor_name = slots[3]
+    assert writer.book(start, doctor_name, 1234567)
+    assert writer.journal.size() < store._journal_offset
+
+    assert all(not store.get_slot(start, doctor_name).is_available for start, doctor_name in slots)
+    assert _free_slots(store, 1)[0] not in slots
+
+
+def test_concurrent_bookings_of_one_slot_have_a_single_winner(calendar, store):
+    (start, doctor_name), = _free_slots(store, 1)
+    # Two stores on the same files stand in for two server processes
+    stores = [store, AvailabilityStore(calendar)]
+    patients = list(range(1000000, 1000016))
+    ready = threading.Barrier(len(patients))
+
+    def book(patient):
+        ready.wait()
+        return stores[patient % 2].book(start, doctor_name, patient)
+
+    with ThreadPoolExecutor(len(patients)) as pool:
+        results = list(pool.map(book, patients))
+
+    assert results.count(True) == 1
+    winner = patients[results.index(True)]
+    for reader in (*stores, AvailabilityStore(calendar)):
+        assert reader.get_slot(start, doctor_name).patient_to_attend == winner
+    with open(store.journal.path) as f:
+        assert len(f.readlines()) == 1
+
+
+def test_book_many_books_every_slot_or_none(calendar, store):
+    (first, first_doctor), (second, second_doctor), (third, third_doctor) = _free_slots(store, 3)
+    assert store.book(third, third_doctor, 1111111)
+
+    assert store.book_many([
+        (first, first_doctor, 1234567),
+        (second, second_doctor, 7654321),
+        (third, third_doctor, 2222222),
+    ]) == ["skipped", "skipped", "unavailable"]
+    assert store.book_many([(first, first_doctor, 1234567), (first, first_doctor, 7654321)]) == ["skipped", "duplicate"]
+    assert store.get_slot(first, first_doctor).is_available
+    assert store.get_slot(second, second_doctor).is_available
+
+    assert store.book_many([(first, first_doctor, 1234567), (second, second_doctor, 7654321)]) == ["booked", "booked"]
+    reader = AvailabilityStore(calendar)
+    assert reader.get_slot(first, first_doctor).patient_to_attend == 1234567
+    assert reader.get_slot(second, second_doctor).patient_to_attend == 7654321
+    with open(store.journal.path) as f:
+        assert [json.loads(line)["op"] for line in f] == ["book", "batch"]
+
+
+@pytest.fixture
+def partitions(calendar, tmp_path):
+    directory = str(tmp_path / "partitions")
+    assert split_into_partitions(calendar, directory) == ["2024-08", "2024-09"]
+    return directory
+
+
+def _august_and_september_slots(store):
+    (august, august_doctor), = store.earliest_available(date(2024, 8, 30), date(2024, 8, 31), limit=1)
+    (september, september_doctor), = store.earliest_available(date(2024, 9, 2), limit=1)
+    return (august, august_doctor), (september, september_doctor)
+
+
+def _journal_lines(store, month):
+    with open(store._partitions[month].journal.path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_partitions_are_listed_in_the_manifest_and_routed_by_month(partitions):
+    store = PartitionedAvailabilityStore(partitions)
+    assert {month: entry["archived"] for month, entry in read_manifest(partitions).items()} == {
+        "2024-08": False, "2024-09": False,
+    }
+    slots = store.earliest_available(date(2024, 8, 30), limit=200)
+    assert {start.month for start, _ in slots} == {8, 9}
+    assert slots == sorted(slots)
+
+
+def test_cross_month_group_booking_with_an_unavailable_slot_books_nothing(partitions):
+    store = PartitionedAvailabilityStore(partitions)
+    (august, august_doctor), (september, september_doctor) = _august_and_september_slots(store)
+    assert store.book(september, september_doctor, 1111111)
+    version = store.version
+
+    assert store.book_many([
+        (august, august_doctor, 1234567),
+        (september, september_doctor, 1234567),
+    ]) == ["skipped", "unavailable"]
+    assert store.version == version
+    assert store.get_slot(august, august_doctor).is_available
+    assert not os.path.exists(store._partitions["2024-08"].journal.path)
+    assert PartitionedAvailabilityStore(partitions).get_slot(august, august_doctor).is_available
+
+
+def test_cross_month_group_booking_books_both_months(partitions):
+    store = PartitionedAvailabilityStore(partitions)
+    (august, august_doctor), (september, september_doctor) = _august_and_september_slots(store)
+    version = store.version
+
+    assert store.book_many([
+        (august, august_doctor, 1234567),
+        (september, september_doctor, 7654321),
+    ]) == ["booked", "booked"]
+    assert store.version != version
+    assert [event["op"] for event in _journal_lines(store, "2024-08")] == ["batch"]
+    assert [event["op"] for event in _journal_lines(store, "2024-09")] == ["batch"]
+    reader = PartitionedAvailabilityStore(partitions)
+    assert reader.get_slot(august, august_doctor).patient_to_attend == 1234567
+    assert reader.get_slot(september, september_doctor).patient_to_attend == 7654321
+
+
+def test_failed_journal_write_drops_the_other_months_part(partitions, monkeypatch):
+    store = PartitionedAvailabilityStore(partitions)
+    (august, august_doctor), (september, september_doctor) = _august_and_september_slots(store)
+
+    def full_disk(events):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(store._partitions["2024-09"].journal, "append", full_disk)
+    with pytest.raises(OSError):
+        store.book_many([(august, august_doctor, 1234567), (september, september_doctor, 1234567)])
+
+    assert os.path.getsize(store._partitions["2024-08"].journal.path) == 0
+    for reader in (store, PartitionedAvailabilityStore(partitions)):
+        assert reader.get_slot(august, august_doctor).is_available
+        assert reader.get_slot(september, september_doctor).is_available
+
+def test_concurrent_cross_month_group_bookings_have_a_single_winner(partitions):
+    stores = [PartitionedAvailabilityStore(partitions), PartitionedAvailabilityStore(partitions)]
+    (august, august_doctor), (september, september_doctor) = _august_and_september_slots(stores[0])
+    ready = threading.Barrier(8)
+
+    def book(patient):
+        ready.wait()
+        store = stores[patient % 2]
+        return store.book_many([(august, august_doctor, patient), (september, september_doctor, patient)])
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(book, range(1000000, 1000008)))
+
+    assert results.count(["booked", "booked"]) == 1
+    winner = 1000000 + results.index(["booked", "booked"])
+    reader = PartitionedAvailabilityStore(partitions)
+    assert reader.get_slot(august, august_doctor).patient_to_attend == winner
+    assert reader.get_slot(september, september_doctor).patient_to_attend == winner
+
+
+def test_cross_month_reschedule(partitions):
+    store = PartitionedAvailabilityStore(partitions)
+    (august, doctor_name), _ = _august_and_september_slots(store)
+    (september, _), = store.earliest_available(date(2024, 9, 2), limit=1, doctor_name=doctor_name)
+    assert store.book(august, doctor_name, 1234567)
+
+    assert store.reschedule(august, september, doctor_name, 7654321) == "not_booked"
+    version = store.version
+    assert store.reschedule(august, september, doctor_name, 1234567) == "rescheduled"
+    assert store.version != version
+    for reader in (store, PartitionedAvailabilityStore(partitions)):
+        assert reader.get_slot(august, doctor_name).is_available
+        assert reader.get_slot(september, doctor_name).patient_to_attend == 1234567
+    assert store.reschedule(september, august, doctor_name, 7654321) == "not_booked"
+
+
+def test_archive_stops_serving_old_months_and_survives_a_reload(partitions):
+    store = PartitionedAvailabilityStore(partitions)
+    (august, august_doctor), (september, september_doctor) = _august_and_september_slots(store)
+    assert store.book(september, september_doctor, 1234567)
+    version = store.version
+
+    assert store.archive(date(2024, 9, 1)) == ["2024-08"]
+    assert store.version != version
+    assert read_manifest(partitions)["2024-08"] == {
+        "month": "2024-08", "file": os.path.join("archive", "2024-08.csv"), "archived": True,
+    }
+    assert os.path.exists(os.path.join(partitions, "archive", "2024-08.csv"))
+
+    for reader in (store, PartitionedAvailabilityStore(partitions)):
+        assert reader.get_slot(august, august_doctor) is None
+        assert reader.available_times_for_doctor(august.date(), august_doctor) == []
+        assert not reader.book(august, august_doctor, 1234567)
+        assert reader.get_slot(september, september_doctor).patient_to_attend == 1234567
+    assert store.archive(date(2024, 9, 1)) == []
@@ -0,0 +1,80 @@
+import asyncio
+import uuid
+
+import pytest
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import SystemMessage
+
+from salonist.booking import workflow as booking_workflow
+from salonist.booking.prompts import BOOKING_SYSTEM_PROMPT
+from salonist.config import get_settings
+from salonist.providers import FakeChatModel, LatencyModel
+from salonist.providers.fake import DEFAULT_SCRIPT
+
+
+class ModelInputs(BaseCallbackHandler):
+    def __init__(self):
+        self.calls = []
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.calls.extend(messages)
+
+
+@pytest.fixture
+def model_inputs(monkeypatch):
+    inputs = ModelInputs()
+
+    def recorded_chat_model(model_name, callbacks=(), **kwargs):
+        return FakeChatModel(rules=DEFAULT_SCRIPT["chat"], latency=LatencyModel(), model_name=model_name,
+                             callbacks=[*callbacks, inputs], **kwargs)
+
+    monkeypatch.setattr(booking_workflow, "get_chat_model", recorded_chat_model)
+    return inputs
+
+
+def _system_messages(messages):
+    return [message for message in messages if isinstance(message, SystemMessage)
+            and message.content == BOOKING_SYSTEM_PROMPT]
+
+
+def test_system_prompt_is_sent_with_every_call_but_not_remembered(model_inputs):
+    workflow = booking_workflow.BookingWorkflow()
+    thread_id = str(uuid.uuid4())
+
+    workflow.run("any availability tomorrow?", thread_id)
+    workflow.run("and the day after?", thread_id)
+
+    assert model_inputs.calls
+    for messages in model_inputs.calls:
+        assert len(_system_messages(messages)) == 1
+        assert messages[0].content == BOOKING_SYSTEM_PROMPT
+    state = workflow.graph.get_state({"configurable": {"thread_id": thread_id}}).values
+    assert not _system_messages(state["messages"])
+
+
+def test_concurrent_first_requests_send_a_single_system_prompt(model_inputs):
+    workflow = booking_workflow.BookingWorkflow()
+    thread_id = str(uuid.uuid4())
+
+    async def both():
+        await asyncio.gather(workflow.arun("any availability tomorrow?", thread_id),
+                             workflow.arun("any availability tomorrow?", thread_id))
+
+    asyncio.run(both())
+
+    for messages in model_inputs.calls:
+        assert len(_system_messages(messages)) == 1
+
+
+def test_memory_keeps_only_the_most_recent_conversations(model_inputs, monkeypatch):
+    monkeypatch.setattr(get_settings(), "BOOKING_MAX_CONVERSATIONS", 2)
+    workflow = booking_workflow.BookingWorkflow()
+    threads = [str(uuid.uuid4()) for _ in range(3)]
+
+    for thread_id in threads:
+        workflow.run("any availability tomorrow?", thread_id)
+
+    assert set(workflow.memory.storage) == set(threads[1:])
+    assert all(key[0] in threads[1:] for key in workflow.memory.writes)
+    assert all(key[0] in threads[1:] for key in workflow.memory.blobs)
+    assert not workflow.graph.get_state({"configurable": {"thread_id": threads[0]}}).values
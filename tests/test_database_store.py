@@ -0,0 +1,79 @@
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from salonist.appointment.availability import SlotConflictError
+from salonist.commands import import_availability
+from salonist.database import db
+from salonist.models import AvailabilitySlot
+
+DOCTOR = "john doe"
+
+
+def _free_starts(store, count):
+    return [start for start, _ in store.earliest_available(date(2024, 8, 5), limit=count, doctor_name=DOCTOR)]
+
+
+def _slot_count(app):
+    with app.app_context():
+        return db.session.query(AvailabilitySlot).count()
+
+
+def test_import_copies_the_calendar(database_app, database_store, calendar):
+    assert _slot_count(database_app) == len(pd.read_csv(calendar))
+    booked = database_store.get_slot(datetime(2024, 8, 5, 8, 30), DOCTOR)
+    assert not booked.is_available and booked.patient_to_attend == 1000082
+    assert database_store.get_slot(datetime(2024, 8, 5, 8, 0), DOCTOR).is_available
+    assert booked.version == 0
+
+
+def test_import_rejects_duplicate_slots(database_app, calendar, tmp_path):
+    df = pd.read_csv(calendar)
+    duplicated = tmp_path / "duplicated.csv"
+    pd.concat([df, df.head(1)]).to_csv(duplicated, index=False)
+
+    result = database_app.test_cli_runner().invoke(import_availability, [str(duplicated)])
+    assert result.output.startswith("Error importing availability")
+    assert "UNIQUE constraint failed" in result.output
+    # The table is replaced in one transaction, so the earlier import is kept
+    assert _slot_count(database_app) == len(df)
+
+
+def test_book_is_a_conditional_update(database_store):
+    start, = _free_starts(database_store, 1)
+    assert database_store.book(start, DOCTOR, 1234567)
+    assert not database_store.book(start, DOCTOR, 7654321)
+
+    slot = database_store.get_slot(start, DOCTOR)
+    assert slot.patient_to_attend == 1234567 and slot.version == 1
+    with pytest.raises(SlotConflictError):
+        database_store.cancel(start, DOCTOR, 1234567, expected_version=0)
+    assert database_store.cancel(start, DOCTOR, 1234567, expected_version=1)
+    assert database_store.get_slot(start, DOCTOR).version == 2
+
+
+def test_book_many_rolls_back_when_a_slot_is_taken(database_store):
+    first, second, third = _free_starts(database_store, 3)
+    assert database_store.book(third, DOCTOR, 1111111)
+
+    results = database_store.book_many([
+        (first, DOCTOR, 1234567), (second, DOCTOR, 1234567), (third, DOCTOR, 1234567), (first, DOCTOR, 1234567),
+    ])
+    assert results == ["skipped", "skipped", "unavailable", "duplicate"]
+    for start in (first, second):
+        slot = database_store.get_slot(start, DOCTOR)
+        assert slot.is_available and slot.version == 0
+
+    assert database_store.book_many([(first, DOCTOR, 1234567), (second, DOCTOR, 1234567)]) == ["booked", "booked"]
+    assert not database_store.get_slot(first, DOCTOR).is_available
+
+
+def test_reschedule_rolls_back_the_claimed_slot(database_store):
+    old, new = _free_starts(database_store, 2)
+    assert database_store.book(old, DOCTOR, 7654321)
+
+    # The new slot is claimed first, then released again when the booking isn't found
+    assert database_store.reschedule(old, new, DOCTOR, 1234567) == "not_booked"
+    slot = database_store.get_slot(new, DOCTOR)
+    assert slot.is_available and slot.patient_to_attend is None and slot.version == 0
@@ -0,0 +1,49 @@
+from datetime import date
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from salonist.appointment.utils.helper import fast_route, route_fast_path
+from salonist.appointment.utils.intent import classify_intent
+
+
+def _route(query):
+    state = {"messages": [HumanMessage(query)], "dialog_state": []}
+    update = fast_route(state)
+    return update, route_fast_path({**state, "messages": state["messages"] + update.get("messages", [])})
+
+
+def test_availability_question_with_a_date_is_fast_routed():
+    update, route = _route("Is Dr. Anderson available on 2024-08-07?")
+    tool_call = update["messages"][0].tool_calls[0]
+    assert tool_call["name"] == "ToGetInfo"
+    assert tool_call["args"]["desired_date"] == {"date": "07-08-2024"}
+    assert tool_call["args"]["doctor_name"] == "kevin anderson"
+    assert route == "enter_get_info"
+
+
+def test_booking_with_every_argument_is_fast_routed():
+    update, _ = _route("Please book me with john doe on 2024-08-07 at 10:30, my id is 1234567")
+    tool_call = update["messages"][0].tool_calls[0]
+    assert tool_call["name"] == "ToAppointmentBookingAssistant"
+    assert tool_call["args"]["date"] == {"date": "2024-08-07 10:30"}
+    assert tool_call["args"]["identification_number"] == {"id": 1234567}
+    assert tool_call["args"]["doctor_number"] == "john doe"
+
+
+@pytest.mark.parametrize("query", [
+    "Is there any orthodontist availability?",  # no date
+    "Please book me with john doe on 2024-08-07, my id is 1234567",  # no time
+    "Please book me with john doe on 2024-08-07 at 10:30",  # no id
+    "Please book me on 2024-08-07 at 10:30, my id is 1234567",  # no doctor
+])
+def test_missing_required_arguments_fall_back_to_the_primary_assistant(query):
+    update, route = _route(query)
+    assert update == {}
+    assert route == "primary_assistant"
+
+
+def test_dates_are_only_extracted_with_their_year():
+    assert classify_intent("any availability with john doe on may 5th 2025?").date == date(2025, 5, 5)
+    assert classify_intent("any availability with john doe on 5th of may, 2025?").date == date(2025, 5, 5)
+    assert classify_intent("any availability with john doe on may 5th?").date is None
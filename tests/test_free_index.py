@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from salonist.appointment.availability.free_index import FreeSlotIndex
+
+
+def _index():
+    index = FreeSlotIndex({"ana": "dentist", "ben": "dentist", "cleo": "orthodontist"})
+    for hour in (8, 9, 10, 11):
+        for doctor in index.doctors:
+            index.add(doctor, datetime(2024, 5, 1, hour))
+    return index
+
+
+def test_window_is_half_open():
+    slots = _index().earliest(datetime(2024, 5, 1, 9), datetime(2024, 5, 1, 11), limit=10, doctor_name="ana")
+    assert slots == [(datetime(2024, 5, 1, 9), "ana"), (datetime(2024, 5, 1, 10), "ana")]
+
+
+def test_earliest_merges_doctors_in_start_order():
+    slots = _index().earliest(datetime(2024, 5, 1, 10), limit=4, specialization="dentist")
+    assert slots == [
+        (datetime(2024, 5, 1, 10), "ana"), (datetime(2024, 5, 1, 10), "ben"),
+        (datetime(2024, 5, 1, 11), "ana"), (datetime(2024, 5, 1, 11), "ben"),
+    ]
+
+
+def test_doctor_name_and_specialization_both_filter():
+    index = _index()
+    start = datetime(2024, 5, 1)
+    assert index.earliest(start, doctor_name="cleo", specialization="dentist") == []
+    assert index.earliest(start, limit=1, doctor_name="cleo", specialization="orthodontist") == [
+        (datetime(2024, 5, 1, 8), "cleo")
+    ]
+    assert index.earliest(start, doctor_name="nobody") == []
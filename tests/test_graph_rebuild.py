@@ -0,0 +1,28 @@
+import pytest
+
+from salonist.app import create_app
+from salonist.appointment import builder
+from salonist.config import get_settings
+
+
+@pytest.fixture
+def reload_file(monkeypatch, tmp_path):
+    path = tmp_path / "graph.reload"
+    monkeypatch.setattr(get_settings(), "GRAPH_RELOAD_FILE", str(path))
+    return path
+
+
+def test_graph_is_rebuilt_once_after_a_rebuild_request(reload_file):
+    graph = builder.get_graph()
+    assert builder.get_graph() is graph
+
+    builder.request_rebuild()
+    assert reload_file.exists()
+    rebuilt = builder.get_graph()
+    assert rebuilt is not graph
+    assert builder.get_graph() is rebuilt
+
+
+def test_rebuild_is_not_exposed_over_http():
+    client = create_app().test_client()
+    assert client.post("/api/multi-agent/rebuild").status_code == 404
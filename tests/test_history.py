@@ -0,0 +1,89 @@
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+
+from salonist.history import HistoryManager, estimate_tokens, split_turns, with_summary
+
+
+class SummaryLLM:
+    """Stands in for the chat model, counting the summarizing calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages, config=None):
+        self.calls += 1
+        return AIMessage(content=f"summary {self.calls}")
+
+
+def _turn(i, tool_call=False):
+    messages = [HumanMessage(content=f"question {i}", id=f"h{i}")]
+    if tool_call:
+        messages.append(AIMessage(content="", id=f"c{i}", tool_calls=[{"name": "check_availability", "args": {"day": i}, "id": f"t{i}"}]))
+        messages.append(ToolMessage(content="free", tool_call_id=f"t{i}", id=f"r{i}"))
+    messages.append(AIMessage(content=f"answer {i}", id=f"a{i}"))
+    return messages
+
+
+def _apply(messages, update):
+    removed = {message.id for message in update.get("messages", []) if isinstance(message, RemoveMessage)}
+    return [message for message in messages if message.id not in removed]
+
+
+def test_split_turns_starts_a_turn_at_each_user_message():
+    messages = _turn(1) + _turn(2, tool_call=True)
+    turns = split_turns(messages)
+    assert [[message.id for message in turn] for turn in turns] == [["h1", "a1"], ["h2", "c2", "r2", "a2"]]
+    assert split_turns([AIMessage(content="hi")])[0][0].content == "hi"
+
+
+def test_tool_calls_and_their_results_are_dropped_together():
+    messages = [SystemMessage(content="prompt", id="s")]
+    for i in range(4):
+        messages += _turn(i, tool_call=True)
+    update = HistoryManager(SummaryLLM(), keep_turns=2, token_budget=10_000)(
+        {"messages": messages, "summary": None})
+
+    kept = _apply(messages, update)
+    assert [message.id for message in kept] == ["s", "h2", "c2", "r2", "a2", "h3", "c3", "r3", "a3"]
+    assert update["summary"] == "summary 1"
+
+
+def test_old_turns_are_dropped_to_stay_within_the_token_budget():
+    messages = []
+    for i in range(3):
+        messages += [HumanMessage(content="x" * 400, id=f"h{i}"), AIMessage(content="y" * 400, id=f"a{i}")]
+    manager = HistoryManager(SummaryLLM(), keep_turns=3, token_budget=250)
+
+    kept = _apply(messages, manager({"messages": messages, "summary": None}))
+    assert [message.id for message in kept] == ["h2", "a2"]
+    assert estimate_tokens(kept) <= 250
+
+
+def test_the_last_turn_is_kept_even_over_the_budget():
+    messages = [HumanMessage(content="x" * 4000, id="h0"), AIMessage(content="y", id="a0")]
+    assert HistoryManager(SummaryLLM(), keep_turns=1, token_budget=10)({"messages": messages, "summary": None}) == {}
+
+
+def test_history_is_summarized_once_every_slack_turns():
+    llm = SummaryLLM()
+    manager = HistoryManager(llm, keep_turns=2, token_budget=10_000, slack_turns=3)
+    messages, summary = [], None
+    for i in range(11):
+        messages += _turn(i)
+        update = manager({"messages": messages, "summary": summary})
+        messages = _apply(messages, update)
+        summary = update.get("summary", summary)
+        assert len(split_turns(messages)) <= 5
+
+    # Cut back to 2 turns on the 6th and the 10th turn
+    assert llm.calls == 2
+    assert len(split_turns(messages)) == 3
+    assert summary == "summary 2"
+
+
+def test_summary_goes_after_the_system_prompt():
+    messages = [SystemMessage(content="prompt")] + _turn(1)
+    sent = with_summary(messages, "booked with Dr. Adams")
+    assert isinstance(sent[0], SystemMessage)
+    assert isinstance(sent[1], HumanMessage) and "booked with Dr. Adams" in sent[1].content
+    assert sent[2:] == messages[1:]
+    assert with_summary(messages, None) == messages
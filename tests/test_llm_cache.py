@@ -0,0 +1,96 @@
+import uuid
+
+import pytest
+from langchain_core.globals import set_llm_cache
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration
+from prometheus_client import REGISTRY
+
+from salonist.booking import workflow as booking_workflow
+from salonist.llm_cache import SQLiteLLMCache, cache_key
+from salonist.providers import FakeChatModel, LatencyModel
+from salonist.providers.fake import DEFAULT_SCRIPT
+
+
+def _sample(name):
+    return REGISTRY.get_sample_value(name) or 0
+
+
+@pytest.fixture
+def llm_cache(tmp_path):
+    cache = SQLiteLLMCache(str(tmp_path / "llm_cache.db"))
+    set_llm_cache(cache)
+    yield cache
+    set_llm_cache(None)
+
+
+def _conversation(tool_call_id: str):
+    return [
+        HumanMessage(content="any availability tomorrow?", id=str(uuid.uuid4())),
+        AIMessage(
+            content="",
+            id=str(uuid.uuid4()),
+            tool_calls=[{"name": "check_availability", "args": {"query": "tomorrow"}, "id": tool_call_id}],
+            response_metadata={"stop_reason": "tool_use"},
+            usage_metadata={"input_tokens": 10, "output_tokens": 5, "total_tokens": 15},
+        ),
+        ToolMessage(content="Available slots: 09:00", tool_call_id=tool_call_id, id=str(uuid.uuid4())),
+    ]
+
+
+def test_cache_key_ignores_message_and_tool_call_ids():
+    assert cache_key(dumps(_conversation("toolu_1")), "llm") == cache_key(dumps(_conversation("toolu_2")), "llm")
+
+
+def test_cache_key_depends_on_content():
+    other = _conversation("toolu_1")
+    other[0] = HumanMessage(content="any availability next week?")
+    assert cache_key(dumps(_conversation("toolu_1")), "llm") != cache_key(dumps(other), "llm")
+
+
+def test_empty_responses_are_not_stored(llm_cache):
+    llm_cache.update("prompt", "llm", [ChatGeneration(message=AIMessage(content=""))])
+    llm_cache.update("prompt", "llm", [ChatGeneration(message=AIMessage(content=[{"type": "text", "text": ""}]))])
+    assert llm_cache.lookup("prompt", "llm") is None
+    assert llm_cache.stats()["entries"] == 0
+
+
+def test_cached_responses_report_no_token_usage(llm_cache):
+    message = AIMessage(content="09:00 is free", usage_metadata={"input_tokens": 10, "output_tokens": 5, "total_tokens": 15})
+    llm_cache.update("prompt", "llm", [ChatGeneration(message=message)])
+
+    generation, = llm_cache.lookup("prompt", "llm")
+    assert generation.message.content == "09:00 is free"
+    assert generation.message.usage_metadata == {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+
+
+def test_lookups_and_evictions_are_exported(tmp_path):
+    cache = SQLiteLLMCache(str(tmp_path / "llm_cache.db"), max_entries=1)
+    before = {name: _sample(f"salonist_llm_cache_{name}_total") for name in ("hits", "misses", "evictions")}
+
+    assert cache.lookup("first", "llm") is None
+    cache.update("first", "llm", [ChatGeneration(message=AIMessage(content="one"))])
+    cache.update("second", "llm", [ChatGeneration(message=AIMessage(content="two"))])
+    assert cache.lookup("second", "llm") is not None
+
+    assert _sample("salonist_llm_cache_hits_total") - before["hits"] == 1
+    assert _sample("salonist_llm_cache_misses_total") - before["misses"] == 1
+    assert _sample("salonist_llm_cache_evictions_total") - before["evictions"] == 1
+
+
+def test_second_identical_graph_run_hits_the_cache(llm_cache, monkeypatch):
+    def cached_chat_model(model_name, **kwargs):
+        return FakeChatModel(rules=DEFAULT_SCRIPT["chat"], latency=LatencyModel(), model_name=model_name, **kwargs)
+
+    monkeypatch.setattr(booking_workflow, "get_chat_model", cached_chat_model)
+    workflow = booking_workflow.BookingWorkflow()
+
+    first, _ = workflow.run("any availability tomorrow?", str(uuid.uuid4()))
+    calls = llm_cache.misses
+    assert calls > 1 and llm_cache.hits == 0  # a tool call, then the answer
+
+    second, _ = workflow.run("any availability tomorrow?", str(uuid.uuid4()))
+    assert second == first
+    assert llm_cache.hits == calls
+    assert llm_cache.misses == calls
@@ -0,0 +1,51 @@
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.runnables import RunnableLambda
+from prometheus_client import REGISTRY
+
+from salonist.app import create_app
+from salonist.appointment.base import Assistant, RetryPolicy
+from salonist.prompt_cache import prompt_cache_usage
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def _assistant(name, replies):
+    replies = iter(replies)
+    return Assistant(RunnableLambda(lambda state: next(replies)), name=name,
+                     policy=RetryPolicy(max_attempts=3, backoff=0))
+
+
+def test_assistant_retries_and_fallbacks_are_counted():
+    state = {"messages": [HumanMessage("hello")]}
+    _assistant("retrying", [AIMessage(""), AIMessage("hi")])(state, {})
+    _assistant("retrying", [AIMessage(""), AIMessage(""), AIMessage("")])(state, {})
+
+    assert _sample("salonist_assistant_calls_total", assistant="retrying") == 2
+    assert _sample("salonist_assistant_retries_total", assistant="retrying") == 3
+    assert _sample("salonist_assistant_fallbacks_total", assistant="retrying") == 1
+
+
+def test_stats_routes_are_replaced_by_metrics():
+    client = create_app().test_client()
+    assert client.get("/api/multi-agent/retry-stats").status_code == 404
+    assert client.get("/api/multi-agent/prompt-cache-stats").status_code == 404
+    assert b"salonist_assistant_retries_total" in client.get("/metrics").data
+
+
+def test_prompt_cache_usage_is_counted():
+    before = {kind: _sample("salonist_prompt_cache_tokens_total", kind=kind)
+              for kind in ("input", "cache_read", "cache_creation")}
+    calls = _sample("salonist_prompt_cache_calls_total")
+    message = AIMessage("hi", usage_metadata={
+        "input_tokens": 1200, "output_tokens": 10, "total_tokens": 1210,
+        "input_token_details": {"cache_read": 1000, "cache_creation": 150},
+    })
+    prompt_cache_usage.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]))
+
+    assert _sample("salonist_prompt_cache_calls_total") == calls + 1
+    assert _sample("salonist_prompt_cache_tokens_total", kind="input") == before["input"] + 1200
+    assert _sample("salonist_prompt_cache_tokens_total", kind="cache_read") == before["cache_read"] + 1000
+    assert _sample("salonist_prompt_cache_tokens_total", kind="cache_creation") == before["cache_creation"] + 150
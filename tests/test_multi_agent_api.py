@@ -0,0 +1,50 @@
+import json
+
+import pytest
+from starlette.testclient import TestClient
+
+from salonist.app import create_app
+from salonist.asgi import create_asgi_app
+
+QUERY = "Is Dr. Anderson available on 2024-08-07?"
+
+
+def _done(body: str) -> dict:
+    event, data = body.strip().split("\n\n")[-1].split("\n")
+    assert event == "event: done"
+    return json.loads(data[len("data: "):])
+
+
+@pytest.fixture(scope="module")
+def asgi_client():
+    with TestClient(create_asgi_app()) as client:
+        yield client
+
+
+def test_thread_id_is_echoed_back():
+    client = create_app().test_client()
+    response = client.post("/api/multi-agent", json={"query": QUERY, "thread_id": "conversation-1"})
+    assert response.status_code == 200
+    assert response.get_json()["thread_id"] == "conversation-1"
+
+
+def test_conversations_get_their_own_thread_id():
+    client = create_app().test_client()
+    first = client.post("/api/multi-agent", json={"query": QUERY}).get_json()["thread_id"]
+    second = client.post("/api/multi-agent", json={"query": QUERY}).get_json()["thread_id"]
+    assert first and second and first != second
+
+
+def test_stream_ends_with_the_thread_id():
+    client = create_app().test_client()
+    response = client.post("/api/multi-agent/stream", json={"query": QUERY, "thread_id": "conversation-2"})
+    assert _done(response.get_data(as_text=True))["thread_id"] == "conversation-2"
+
+
+def test_async_routes_echo_the_thread_id(asgi_client):
+    response = asgi_client.post("/api/multi-agent", json={"query": QUERY, "thread_id": "conversation-3"})
+    assert response.json()["thread_id"] == "conversation-3"
+
+    response = asgi_client.post("/api/multi-agent/stream", json={"query": QUERY, "thread_id": "conversation-4"})
+    assert _done(response.text)["thread_id"] == "conversation-4"
+    assert _done(asgi_client.post("/api/multi-agent/stream", json={"query": QUERY}).text)["thread_id"]
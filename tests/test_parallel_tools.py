@@ -0,0 +1,59 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import tool
+
+from salonist.appointment.utils.helper import create_entry_node, create_tool_node_with_fallback, pop_dialog_state
+
+
+@tool
+def double(number: int) -> int:
+    """Double a number."""
+    return number * 2
+
+
+def _call(name, args, call_id):
+    return {"name": name, "args": args, "id": call_id}
+
+
+def _state(*tool_calls):
+    return {"messages": [HumanMessage("hi"), AIMessage(content="", tool_calls=list(tool_calls))], "dialog_state": []}
+
+
+def _answered(messages):
+    return [message.tool_call_id for message in messages if isinstance(message, ToolMessage)]
+
+
+def test_parallel_transfers_are_all_answered():
+    state = _state(
+        _call("ToGetInfo", {"request": "availability"}, "transfer_1"),
+        _call("ToAppointmentBookingAssistant", {"request": "booking"}, "transfer_2"),
+    )
+    update = create_entry_node("Get Info Assistant", "get_info")(state)
+
+    assert _answered(update["messages"]) == ["transfer_1", "transfer_2"]
+    assert "Not started" in update["messages"][1].content
+    assert update["dialog_state"] == "get_info"
+
+
+def test_parallel_tool_calls_each_get_their_tool_message():
+    state = _state(_call("double", {"number": 2}, "a"), _call("double", {"number": 5}, "b"),
+                   _call("missing_tool", {}, "c"))
+    node = create_tool_node_with_fallback([double])
+
+    for update in (node.invoke(state), asyncio.run(node.ainvoke(state))):
+        messages = {message.tool_call_id: message for message in update["messages"]}
+        assert set(messages) == {"a", "b", "c"}
+        assert messages["a"].content == "4" and messages["b"].content == "10"
+        assert messages["c"].status == "error"
+
+
+def test_escalation_next_to_tool_calls_is_answered_when_leaving_the_skill():
+    state = _state(_call("double", {"number": 2}, "a"), _call("CompleteOrEscalate", {"reason": "done"}, "esc"))
+    tool_messages = create_tool_node_with_fallback([double]).invoke(state)["messages"]
+    assert _answered(tool_messages) == ["a"]
+
+    state["messages"] += tool_messages
+    update = pop_dialog_state(state)
+    assert _answered(update["messages"]) == ["esc"]
+    assert update["dialog_state"] == "pop"
@@ -0,0 +1,96 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+
+from salonist.appointment.availability import AvailabilityStore, SlotConflictError
+
+DOCTOR = "kevin anderson"
+PATIENT = 1234567
+
+
+@pytest.fixture(params=["csv", "database"])
+def store(request, calendar):
+    if request.param == "csv":
+        return AvailabilityStore(calendar)
+    return request.getfixturevalue("database_store")
+
+
+def _free_starts(store, count):
+    return [start for start, _ in store.earliest_available(date(2024, 8, 5), limit=count, doctor_name=DOCTOR)]
+
+
+def _patient(store, start):
+    return store.get_slot(start, DOCTOR).patient_to_attend
+
+
+def test_reschedule_moves_the_booking(store):
+    old, new = _free_starts(store, 2)
+    assert store.book(old, DOCTOR, PATIENT)
+
+    assert store.reschedule(old, new, DOCTOR, PATIENT) == "rescheduled"
+    assert store.get_slot(old, DOCTOR).is_available
+    assert not store.get_slot(new, DOCTOR).is_available
+    assert _patient(store, new) == PATIENT
+
+
+def test_old_slot_is_kept_when_the_new_one_is_taken(store):
+    old, new = _free_starts(store, 2)
+    assert store.book(old, DOCTOR, PATIENT)
+    assert store.book(new, DOCTOR, 7654321)
+    version = store.get_slot(old, DOCTOR).version
+
+    assert store.reschedule(old, new, DOCTOR, PATIENT) == "unavailable"
+    assert _patient(store, old) == PATIENT
+    assert store.get_slot(old, DOCTOR).version == version
+    assert _patient(store, new) == 7654321
+
+
+def test_reschedule_without_a_booking_leaves_both_slots(store):
+    old, new = _free_starts(store, 2)
+    assert store.book(old, DOCTOR, 7654321)
+
+    assert store.reschedule(old, new, DOCTOR, PATIENT) == "not_booked"
+    assert _patient(store, old) == 7654321
+    assert store.get_slot(new, DOCTOR).is_available
+
+
+def test_reschedule_of_a_changed_booking_conflicts(store):
+    old, new = _free_starts(store, 2)
+    assert store.book(old, DOCTOR, PATIENT)
+    seen = store.get_slot(old, DOCTOR).version
+    # Cancelled and booked again since the caller read it
+    assert store.cancel(old, DOCTOR, PATIENT)
+    assert store.book(old, DOCTOR, PATIENT)
+
+    with pytest.raises(SlotConflictError):
+        store.reschedule(old, new, DOCTOR, PATIENT, expected_version=seen)
+    assert _patient(store, old) == PATIENT
+    assert store.get_slot(new, DOCTOR).is_available
+
+    current = store.get_slot(old, DOCTOR).version
+    assert store.reschedule(old, new, DOCTOR, PATIENT, expected_version=current) == "rescheduled"
+
+
+def test_concurrent_reschedules_into_one_slot_have_a_single_winner(store):
+    *olds, target = _free_starts(store, 5)
+    patients = list(range(1000000, 1000000 + len(olds)))
+    for old, patient in zip(olds, patients):
+        assert store.book(old, DOCTOR, patient)
+    ready = threading.Barrier(len(patients))
+
+    def reschedule(i):
+        ready.wait()
+        return store.reschedule(olds[i], target, DOCTOR, patients[i])
+
+    with ThreadPoolExecutor(len(patients)) as pool:
+        results = list(pool.map(reschedule, range(len(patients))))
+
+    assert sorted(results) == ["rescheduled"] + ["unavailable"] * (len(patients) - 1)
+    winner = results.index("rescheduled")
+    assert _patient(store, target) == patients[winner]
+    assert store.get_slot(olds[winner], DOCTOR).is_available
+    for i, old in enumerate(olds):
+        if i != winner:
+            assert _patient(store, old) == patients[i]
@@ -0,0 +1,45 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from salonist.appointment.availability.bitmap import SlotBitmap
+from salonist.appointment.availability.timeslots import parse_date_slots
+
+
+@pytest.fixture
+def frame(calendar):
+    df = pd.read_csv(calendar)
+    df["date"], df["minute"] = parse_date_slots(df["date_slot"])
+    return df
+
+
+def _expected_free(df, day, doctor_name):
+    rows = df[(df["date"] == day) & (df["doctor_name"] == doctor_name) & df["is_available"]]
+    return sorted(rows["minute"].tolist())
+
+
+def test_bitmap_matches_the_calendar(frame):
+    bitmap = SlotBitmap.from_frame(frame)
+    for (day, doctor_name), _ in frame.groupby(["date", "doctor_name"]):
+        assert bitmap.free_minutes(day, doctor_name).tolist() == _expected_free(frame, day, doctor_name)
+
+    day = frame["date"].iloc[0]
+    by_doctor = bitmap.free_minutes_by_doctor(day, "general_dentist")
+    for doctor_name, minutes in by_doctor.items():
+        assert minutes.tolist() == _expected_free(frame, day, doctor_name)
+    assert bitmap.free_minutes(date(1999, 1, 1), "john doe").tolist() == []
+
+
+def test_setting_a_slot_updates_every_query(frame):
+    bitmap = SlotBitmap.from_frame(frame)
+    free = frame[frame["is_available"]].iloc[0]
+    day, minute, doctor_name = free["date"], int(free["minute"]), free["doctor_name"]
+
+    bitmap.set(day, minute, doctor_name, False)
+    assert minute not in bitmap.free_minutes(day, doctor_name).tolist()
+    assert doctor_name not in bitmap.doctors_free_at(minute, [day]).get(day, [])
+
+    bitmap.set(day, minute, doctor_name, True)
+    assert minute in bitmap.free_minutes(day, doctor_name).tolist()
+    assert doctor_name in bitmap.doctors_free_at(minute, [day], free["specialization"])[day]
@@ -0,0 +1,25 @@
+from datetime import date, datetime
+
+import pandas as pd
+
+from salonist.appointment.availability.timeslots import (
+    format_am_pm, format_clock, format_date_slots, parse_date_slot, parse_date_slots, slot_start
+)
+
+
+def test_calendar_slots_round_trip(calendar):
+    values = pd.read_csv(calendar)["date_slot"]
+    days, minutes = parse_date_slots(values)
+
+    assert format_date_slots(days, minutes).tolist() == values.tolist()
+    for value, day, minute in list(zip(values, days, minutes))[:50]:
+        assert slot_start(day, minute) == parse_date_slot(value)
+
+
+def test_slot_values():
+    days, minutes = parse_date_slots(pd.Series(["05-08-2024 8.00", "31-12-2024 17.30"]))
+    assert days.tolist() == [date(2024, 8, 5), date(2024, 12, 31)]
+    assert minutes.tolist() == [480, 1050]
+    assert parse_date_slot("05-08-2024 8.30") == datetime(2024, 8, 5, 8, 30)
+    assert format_clock([480, 1050]) == ["8.00", "17.30"]
+    assert format_am_pm([0, 480, 720, 1050]) == ["12:00 AM", "8:00 AM", "12:00 PM", "5:30 PM"]
@@ -0,0 +1,13 @@
+import pytest
+from pydantic import ValidationError
+
+from salonist.appointment.models.tools import IdentificationNumberModel
+
+
+def test_identification_number_pattern_is_published_and_enforced():
+    assert IdentificationNumberModel.model_json_schema()["properties"]["id"]["pattern"] == r"^\d{7,8}$"
+    assert IdentificationNumberModel(id=1234567).id == 1234567
+    assert IdentificationNumberModel(id="12345678").id == 12345678
+    for invalid in (123456, 123456789):
+        with pytest.raises(ValidationError):
+            IdentificationNumberModel(id=invalid)
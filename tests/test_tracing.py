@@ -0,0 +1,51 @@
+import json
+import os
+
+import pytest
+
+from salonist.app import create_app
+from salonist.config import get_settings
+from salonist.tracing import TRACE_FILE_HEADER, Trace
+
+QUERY = {"query": "hello"}
+
+
+@pytest.fixture
+def tracing(monkeypatch, tmp_path):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "REQUEST_TRACING_ENABLED", True)
+    monkeypatch.setattr(settings, "TRACE_DIR", str(tmp_path / "traces"))
+    return settings
+
+
+def test_tracing_is_off_by_default():
+    client = create_app().test_client()
+    response = client.post("/api/booking?trace=1", json=QUERY)
+    assert response.status_code == 200
+    assert TRACE_FILE_HEADER not in response.headers
+
+
+def test_traced_request_writes_a_chrome_trace(tracing):
+    client = create_app().test_client()
+    response = client.post("/api/booking?trace=1", json=QUERY)
+    with open(response.headers[TRACE_FILE_HEADER]) as f:
+        events = json.load(f)["traceEvents"]
+    categories = {event.get("cat") for event in events}
+    assert {"request", "graph", "llm", "checkpoint"} <= categories
+
+
+def test_trace_token_is_required_when_set(tracing, monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_TOKEN", "s3cret")
+    client = create_app().test_client()
+    assert TRACE_FILE_HEADER not in client.post("/api/booking?trace=1", json=QUERY).headers
+    assert TRACE_FILE_HEADER not in client.post("/api/booking", json=QUERY, headers={"X-Trace": "1"}).headers
+    assert TRACE_FILE_HEADER in client.post("/api/booking", json=QUERY, headers={"X-Trace": "s3cret"}).headers
+
+
+def test_only_the_newest_traces_are_kept(tmp_path):
+    for i in range(5):
+        trace = Trace(f"request {i}", str(tmp_path), max_files=3)
+        trace.write()
+        os.utime(trace.path, (i, i))
+    Trace("last", str(tmp_path), max_files=3).write()
+    assert len(os.listdir(tmp_path)) == 3